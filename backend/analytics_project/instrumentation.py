@@ -0,0 +1,246 @@
+"""
+Per-route request instrumentation.
+
+InstrumentationMiddleware times every request and, through a database
+execute wrapper, counts its queries and the time spent in them. Results are
+aggregated per route (the URL name, e.g. ``campaign-dashboard-stats``) into
+histograms of wall time, query count, DB time and response size, which
+``metrics`` serves in the Prometheus text format. Responses carry a
+``Server-Timing`` header with the same breakdown for the browser's network
+panel.
+
+Queries slower than ``SLOW_QUERY_MS`` are sampled (``SLOW_QUERY_SAMPLE_RATE``),
+logged to ``analytics.slow_queries`` with their SQL and kept in a small ring
+buffer served by ``slow_queries``.
+
+The state lives in the worker process: with several workers each one is
+scraped (or reports) separately.
+"""
+import logging
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse, JsonResponse
+
+
+logger = logging.getLogger('analytics.slow_queries')
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+SLOW_QUERY_BUFFER = 100
+MAX_SQL_LENGTH = 2000
+
+_current = ContextVar('instrumentation_request', default=None)
+
+
+class Histogram:
+    """Cumulative Prometheus histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, help_text, labels, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, label_values, value):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [0] * (len(self.buckets) + 2)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for label_values, series in sorted(self.series.items()):
+            labels = _labels(self.labels, label_values)
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {series[-1]}')
+            lines.append(f'{self.name}_sum{{{labels}}} {round(series[-2], 6)}')
+            lines.append(f'{self.name}_count{{{labels}}} {series[-1]}')
+        return lines
+
+
+class Counter:
+
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.series = {}
+
+    def inc(self, label_values, amount=1):
+        self.series[label_values] = self.series.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        for label_values, value in sorted(self.series.items()):
+            lines.append(f'{self.name}{{{_labels(self.labels, label_values)}}} {value}')
+        return lines
+
+
+def _labels(names, values):
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values)
+    return ','.join(f'{name}="{value}"' for name, value in zip(names, escaped))
+
+
+class Registry:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = Counter('http_requests_total', 'Requests served.', ('route', 'method', 'status'))
+        self.duration = Histogram('http_request_duration_seconds', 'Wall time to the response.',
+                                  ('route', 'method'), DURATION_BUCKETS)
+        self.queries = Histogram('http_request_db_queries', 'Database queries per request.',
+                                 ('route', 'method'), QUERY_BUCKETS)
+        self.db_time = Histogram('http_request_db_seconds', 'Time spent in database queries per request.',
+                                 ('route', 'method'), DURATION_BUCKETS)
+        self.size = Histogram('http_response_size_bytes', 'Response body size (streamed bodies excluded).',
+                              ('route', 'method'), SIZE_BUCKETS)
+        self.slow = Counter('db_slow_queries_total', 'Queries slower than SLOW_QUERY_MS.', ('route',))
+        self.slow_samples = deque(maxlen=SLOW_QUERY_BUFFER)
+
+    def record(self, route, method, status, stats, duration, size):
+        labels = (route, method)
+        with self.lock:
+            self.requests.inc((route, method, status))
+            self.duration.observe(labels, duration)
+            self.queries.observe(labels, stats.queries)
+            self.db_time.observe(labels, stats.db_time)
+            if size is not None:
+                self.size.observe(labels, size)
+            if stats.slow_count:
+                self.slow.inc((route,), stats.slow_count)
+            self.slow_samples.extend(
+                {'route': route, 'ms': round(elapsed * 1000, 2), 'sql': sql} for sql, elapsed in stats.slow
+            )
+
+    def render(self):
+        with self.lock:
+            lines = []
+            for metric in (self.requests, self.duration, self.queries, self.db_time, self.size, self.slow):
+                lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        self.__init__()
+
+
+registry = Registry()
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_time', 'slow', 'slow_count')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.slow = []
+        self.slow_count = 0
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper; only does work while a request is being instrumented."""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        stats.queries += 1
+        stats.db_time += elapsed
+        if elapsed * 1000 >= settings.SLOW_QUERY_MS:
+            stats.slow_count += 1
+            if random.random() < settings.SLOW_QUERY_SAMPLE_RATE:
+                stats.slow.append((sql[:MAX_SQL_LENGTH], elapsed))
+
+
+def install_query_wrapper(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class InstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        connection_created.connect(install_query_wrapper, dispatch_uid='instrumentation')
+        for connection in connections.all(initialized_only=True):
+            install_query_wrapper(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats, time.perf_counter() - started)
+
+    def finish(self, request, response, stats, duration):
+        match = request.resolver_match
+        route = (match.url_name or match.view_name) if match else 'unmatched'
+        size = None if response.streaming else len(response.content)
+        registry.record(route, request.method, response.status_code, stats, duration, size)
+        for sql, elapsed in stats.slow:
+            logger.warning('Slow query (%.1f ms) on %s: %s', elapsed * 1000, route, sql)
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = (
+                f'app;dur={duration * 1000:.1f}, '
+                f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"'
+            )
+            response['Timing-Allow-Origin'] = '*'
+        return response
+
+
+def _check_token(request):
+    # Internal endpoints: token-protected, or open only in DEBUG when no token is set.
+    token = settings.METRICS_TOKEN
+    if token:
+        if request.headers.get('Authorization') != f'Bearer {token}':
+            raise Http404
+    elif not settings.DEBUG:
+        raise Http404
+
+
+def metrics(request):
+    _check_token(request)
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def slow_queries(request):
+    _check_token(request)
+    with registry.lock:
+        samples = list(registry.slow_samples)
+    return JsonResponse({'slow_query_ms': settings.SLOW_QUERY_MS, 'samples': samples[::-1]})
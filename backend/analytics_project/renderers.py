@@ -0,0 +1,32 @@
+"""
+JSON rendering through orjson when it is installed.
+
+FastJSONRenderer produces the same bytes as DRF's JSONRenderer for API data
+(compact separators, UTF-8, U+2028/U+2029 escaped) but encodes several times
+faster. Types orjson does not handle the way DRF does (datetimes, Decimals,
+lazy strings, querysets...) are passed to DRF's own encoder. Without orjson,
+or when indented output is requested, it is the stock JSONRenderer.
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # optional dependency; fall back to the stdlib encoder
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or \
+                self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS,
+        )
+        # Escaped by JSONRenderer too: valid JSON, but not valid JavaScript.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -0,0 +1,70 @@
+"""
+Read-replica routing for the read-only analytics actions.
+
+With ``DB_REPLICA_HOST`` set, settings add a ``replica`` database alias and
+install ReplicaRouter. Views wrapped in ``use_replica`` then read the
+campaigns app's models from the replica; all writes, and reads anywhere
+else, go to ``default``. The flag is a ContextVar, so it covers exactly the
+wrapped view: a concurrent request in the same thread or event loop is not
+affected, and ``sync_to_async`` carries it into the async ORM's threads.
+
+Replicas lag slightly behind the primary, so only views that tolerate
+reading a moment-old snapshot should use it. Other apps (sessions, the
+database cache, jobs) always use the primary.
+"""
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+
+
+REPLICA = 'replica'
+REPLICA_APPS = ('campaigns',)
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+@contextmanager
+def replica_reads():
+    """Route reads of REPLICA_APPS models to the replica inside the block."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def use_replica(view):
+    """Run a view (function, method or coroutine function) inside ``replica_reads()``."""
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            with replica_reads():
+                return await view(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and model._meta.app_label in REPLICA_APPS:
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica follows the primary's schema through replication.
+        return db != REPLICA
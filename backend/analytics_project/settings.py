@@ -23,9 +23,11 @@ INSTALLED_APPS = [
     'corsheaders',
     'campaigns',
     'social_api',
+    'jobs',
 ]
 
 MIDDLEWARE = [
+    'analytics_project.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -58,6 +60,19 @@ TEMPLATES = [
 WSGI_APPLICATION = 'analytics_project.wsgi.application'
 
 # Database - PostgreSQL (Railway or Supabase)
+# Connections are kept open for DB_CONN_MAX_AGE seconds (0 closes them after
+# every request) and health-checked before reuse. DB_POOL=True uses psycopg 3's
+# connection pool instead, DB_POOL_MIN_SIZE to DB_POOL_MAX_SIZE connections per
+# worker process, waiting up to DB_POOL_TIMEOUT seconds for a free one.
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+DATABASE_OPTIONS = {}
+if DB_POOL:
+    DATABASE_OPTIONS['pool'] = {
+        'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+        'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+        'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),
+    }
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -66,9 +81,37 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD', default=''),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='5432'),
+        # The pool keeps its own connections; Django rejects persistent ones alongside it.
+        'CONN_MAX_AGE': 0 if DB_POOL else config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+        'OPTIONS': DATABASE_OPTIONS,
+    }
+}
+
+# Read replica (optional) - the read-only analytics actions read from it
+# (analytics_project.routers); everything else uses the primary
+DB_REPLICA_HOST = config('DB_REPLICA_HOST', default='')
+if DB_REPLICA_HOST:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': DB_REPLICA_HOST,
+        'PORT': config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['analytics_project.routers.ReplicaRouter']
+
+# Cache - local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend (e.g. django.core.cache.backends.redis.RedisCache) when running several workers.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='analytics'),
     }
 }
 
+# Seconds a cached analytics response is kept; writes invalidate it sooner.
+ANALYTICS_CACHE_TIMEOUT = config('ANALYTICS_CACHE_TIMEOUT', default=300, cast=int)
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -95,10 +138,40 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'analytics_project.renderers.FastJSONRenderer',
     ]
 }
 
+# Background jobs (jobs app) - worker threads per run_jobs process, idle poll
+# interval, first retry delay (doubled per attempt) and running-job timeout in
+# seconds, and the directory export jobs write their files to
+JOB_WORKERS = config('JOB_WORKERS', default=2, cast=int)
+JOB_POLL_INTERVAL = config('JOB_POLL_INTERVAL', default=1.0, cast=float)
+JOB_RETRY_DELAY = config('JOB_RETRY_DELAY', default=10, cast=int)
+JOB_TIMEOUT = config('JOB_TIMEOUT', default=900, cast=int)
+JOB_OUTPUT_DIR = config('JOB_OUTPUT_DIR', default=str(BASE_DIR / 'job_output'))
+
+# Serialize campaign and metric list reads straight from values() rows
+VALUES_SERIALIZERS = config('VALUES_SERIALIZERS', default=True, cast=bool)
+
+# Answer /api/metrics/query/ from in-memory NumPy columns (campaigns.columnar)
+# when NumPy is installed, and fully reload them after this many seconds
+COLUMNAR_ANALYTICS = config('COLUMNAR_ANALYTICS', default=True, cast=bool)
+COLUMNAR_MAX_AGE = config('COLUMNAR_MAX_AGE', default=3600, cast=int)
+
+# Trending topics (social_api) - upstream URL, fresh/stale cache windows and timeout in seconds
+TRENDING_TOPICS_URL = config('TRENDING_TOPICS_URL', default='https://www.reddit.com/r/popular/hot.json')
+TRENDING_TOPICS_TTL = config('TRENDING_TOPICS_TTL', default=60, cast=int)
+TRENDING_TOPICS_STALE_TTL = config('TRENDING_TOPICS_STALE_TTL', default=600, cast=int)
+TRENDING_TOPICS_TIMEOUT = config('TRENDING_TOPICS_TIMEOUT', default=10, cast=float)
+
+# Request instrumentation - slow query threshold (ms) and sampling rate, the
+# Server-Timing header, and the bearer token for /internal/ (open in DEBUG if unset)
+SLOW_QUERY_MS = config('SLOW_QUERY_MS', default=200, cast=float)
+SLOW_QUERY_SAMPLE_RATE = config('SLOW_QUERY_SAMPLE_RATE', default=1.0, cast=float)
+SERVER_TIMING = config('SERVER_TIMING', default=True, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
 # Supabase Configuration (Optional)
 SUPABASE_URL = config('SUPABASE_URL', default='')
 SUPABASE_KEY = config('SUPABASE_KEY', default='')
@@ -0,0 +1,47 @@
+"""
+Settings profile for API-only workers.
+
+Serves the JSON API (and the /internal/ endpoints) without the admin,
+sessions, messages, static files or the middleware that supports them, so
+workers import less at start-up and every request passes through fewer
+layers. Select it per process, e.g.
+``DJANGO_SETTINGS_MODULE=analytics_project.settings_api gunicorn analytics_project.wsgi``,
+and keep running migrations and collectstatic with the full settings.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, MIDDLEWARE, REST_FRAMEWORK, TEMPLATES
+
+# Only the admin and the browsable pages use these; the API is stateless JSON.
+UNUSED_APPS = (
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+)
+UNUSED_MIDDLEWARE = (
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    # DRF views are CSRF-exempt and the async views only answer GET.
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+)
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in UNUSED_APPS]
+MIDDLEWARE = [name for name in MIDDLEWARE if name not in UNUSED_MIDDLEWARE]
+ROOT_URLCONF = 'analytics_project.urls_api'
+
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'OPTIONS': {'context_processors': ['django.template.context_processors.request']},
+}]
+
+# No users without django.contrib.auth: skip DRF's authentication entirely.
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_AUTHENTICATION_CLASSES': [],
+    'UNAUTHENTICATED_USER': None,
+}
@@ -15,10 +15,11 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path
+
+from . import urls_api
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/', include('campaigns.urls')),
-    path('api/', include('social_api.urls')),
+    *urls_api.urlpatterns,
 ]
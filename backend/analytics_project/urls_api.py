@@ -0,0 +1,15 @@
+"""
+URL configuration for API-only workers (settings_api): the API and the
+internal endpoints, without the admin. urls.py adds the admin on top.
+"""
+from django.urls import path, include
+
+from . import instrumentation
+
+urlpatterns = [
+    path('api/', include('campaigns.urls')),
+    path('api/', include('social_api.urls')),
+    path('api/', include('jobs.urls')),
+    path('internal/metrics/', instrumentation.metrics, name='internal-metrics'),
+    path('internal/slow-queries/', instrumentation.slow_queries, name='internal-slow-queries'),
+]
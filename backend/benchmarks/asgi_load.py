@@ -0,0 +1,113 @@
+"""
+Requests per second and latency percentiles, WSGI vs ASGI.
+
+Starts gunicorn (threaded sync workers) on the WSGI app and uvicorn on the
+ASGI app, then drives each with the same number of concurrent clients for a
+fixed time: the DRF actions over WSGI and their /api/async/ twins over ASGI.
+Unlike the other benchmarks this one serves the configured database, so
+point it at a seeded development database. ``--no-cache`` swaps in the dummy
+cache backend so every request reaches the database or upstream.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.harness import percentile, print_table
+
+
+PATHS = [
+    'campaigns/dashboard_stats/',
+    'campaigns/platform_performance/',
+    'campaigns/timeseries/?interval=week',
+    'campaigns/active/',
+]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start(command, port, env):
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    sys.exit(f'Server did not start: {" ".join(command)}')
+
+
+async def drive(base_url, paths, concurrency, duration):
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + duration
+
+    async def client_loop(client, offset):
+        nonlocal errors
+        index = offset
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            response = await client.get(base_url + paths[index % len(paths)])
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += response.status_code >= 400
+            index += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        await asyncio.gather(*(client_loop(client, i) for i in range(concurrency)))
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / duration, 1),
+        'p50_ms': round(percentile(latencies, 0.5), 1),
+        'p99_ms': round(percentile(latencies, 0.99), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--threads', type=int, default=8, help='Threads per gunicorn worker.')
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--trending', action='store_true', help='Include the trending topics endpoint.')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.no_cache:
+        env['CACHE_BACKEND'] = 'django.core.cache.backends.dummy.DummyCache'
+    paths = PATHS + (['social-api/fetch_trending_topics/'] if args.trending else [])
+    servers = [
+        ('wsgi', '/api/', ['gunicorn', 'analytics_project.wsgi', '--workers', str(args.workers),
+                           '--threads', str(args.threads)], '--bind', lambda port: f'127.0.0.1:{port}'),
+        ('asgi', '/api/async/', ['uvicorn', 'analytics_project.asgi:application', '--workers',
+                                 str(args.workers), '--log-level', 'warning'], '--port', str),
+    ]
+    rows = []
+    for name, prefix, command, port_flag, port_value in servers:
+        port = free_port()
+        process = start(command + [port_flag, port_value(port)], port, env)
+        try:
+            result = asyncio.run(drive(f'http://127.0.0.1:{port}{prefix}', paths,
+                                       args.concurrency, args.duration))
+        finally:
+            process.terminate()
+            process.wait()
+        rows.append({'server': name, 'concurrency': args.concurrency, **result})
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Hit ratio and invalidation correctness of the analytics response cache.
+
+Runs a mixed workload of cached reads with an occasional pause/resume write.
+After every write the next read must reflect it, and a read repeated with
+the response's ETag must return 304 until the next write.
+"""
+import argparse
+import random
+import sys
+from datetime import date
+
+from benchmarks.harness import benchmark_database, print_table
+
+from django.core.cache import cache
+from django.test import Client
+
+from campaigns.models import Campaign, Metric
+
+
+READS = [
+    '/api/campaigns/dashboard_stats/',
+    '/api/campaigns/platform_performance/',
+    '/api/campaigns/active/',
+    '/api/campaigns/timeseries/?interval=week',
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--write-ratio', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with benchmark_database():
+        cache.clear()
+        platforms = ['facebook', 'instagram', 'twitter', 'linkedin', 'tiktok']
+        campaigns = [
+            Campaign.objects.create(name=f'Campaign {i}', platform=platforms[i % 5],
+                                    status='active', start_date=date(2024, 1, 1))
+            for i in range(20)
+        ]
+        for campaign in campaigns:
+            Metric.objects.create(campaign=campaign, date=date(2024, 1, 1), impressions=1000, clicks=50)
+
+        client = Client()
+        counts = {'HIT': 0, 'MISS': 0, 'writes': 0, 'not_modified': 0}
+        stale = 0
+        for _ in range(args.requests):
+            if rng.random() < args.write_ratio:
+                campaign = rng.choice(campaigns)
+                client.post(f'/api/campaigns/{campaign.pk}/{rng.choice(["pause", "resume"])}/')
+                counts['writes'] += 1
+                active = Campaign.objects.filter(status='active').count()
+                if client.get('/api/campaigns/dashboard_stats/').json()['active_campaigns'] != active:
+                    stale += 1
+                continue
+            url = rng.choice(READS)
+            response = client.get(url)
+            counts[response['X-Cache']] += 1
+            if client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304:
+                counts['not_modified'] += 1
+
+        reads = counts['HIT'] + counts['MISS']
+        print_table([{**counts, 'hit_ratio': round(counts['HIT'] / reads, 3), 'stale_reads': stale}])
+        if stale:
+            sys.exit(f'{stale} reads returned data older than the preceding write.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Query count and payload size of the campaign list.
+
+Seeds 1,000 campaigns x 365 daily metrics and requests the first list page
+in compact form, with the default metrics window and with a full year.
+"""
+from datetime import date, timedelta
+
+from benchmarks.harness import benchmark_database, measure, print_table
+
+from django.test import Client
+
+from campaigns.models import Campaign, Metric
+
+
+CAMPAIGNS = 1000
+DAYS = 365
+
+
+def seed():
+    platforms = ['facebook', 'instagram', 'twitter', 'linkedin', 'tiktok']
+    campaigns = Campaign.objects.bulk_create([
+        Campaign(name=f'Campaign {i}', platform=platforms[i % len(platforms)],
+                 status='active', start_date=date(2024, 1, 1), description='x' * 200)
+        for i in range(CAMPAIGNS)
+    ])
+    first_day = date(2024, 1, 1)
+    for campaign in Campaign.objects.all():
+        Metric.objects.bulk_create([
+            Metric(campaign=campaign, date=first_day + timedelta(days=day), impressions=1000 + day,
+                   clicks=30, engagements=20, conversions=3, spend='12.50')
+            for day in range(DAYS)
+        ])
+    return campaigns
+
+
+def main():
+    with benchmark_database():
+        seed()
+        client = Client()
+        rows = []
+        for label, query in [
+            ('compact', ''),
+            ('metrics (default limit)', '?include_metrics=true'),
+            ('metrics (full year)', f'?include_metrics=true&metrics_limit={DAYS}'),
+        ]:
+            response, stats = measure(lambda: client.get(f'/api/campaigns/{query}'))
+            rows.append({'variant': label, 'status': response.status_code,
+                         'bytes': len(response.content), **stats})
+        print(f'GET /api/campaigns/ with {CAMPAIGNS} campaigns x {DAYS} metrics')
+        print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Request latency with and without database connection reuse.
+
+Starts gunicorn (threaded sync workers, as in the Procfile) once per
+connection mode and drives cheap endpoints with concurrent clients for a
+fixed time:
+
+- ``no-reuse``: DB_CONN_MAX_AGE=0, a new connection for every request
+- ``persistent``: DB_CONN_MAX_AGE=60 with health checks
+- ``pool``: DB_POOL=True, psycopg 3's connection pool
+
+Like asgi_load it serves the configured database, so point it at a seeded
+PostgreSQL development database (``python load_sample_data.py``). The dummy
+cache backend is used so every request reaches the database.
+"""
+import argparse
+import asyncio
+import os
+
+from benchmarks.asgi_load import drive, free_port, start
+from benchmarks.harness import print_table
+
+
+PATHS = [
+    'campaigns/active/',
+    'campaigns/dashboard_stats/',
+]
+
+MODES = {
+    'no-reuse': {'DB_POOL': 'False', 'DB_CONN_MAX_AGE': '0'},
+    'persistent': {'DB_POOL': 'False', 'DB_CONN_MAX_AGE': '60', 'DB_CONN_HEALTH_CHECKS': 'True'},
+    'pool': {'DB_POOL': 'True'},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--threads', type=int, default=8, help='Threads per gunicorn worker.')
+    parser.add_argument('--modes', default=','.join(MODES), help='Comma-separated subset of the modes.')
+    args = parser.parse_args()
+
+    rows = []
+    for mode in args.modes.split(','):
+        env = {**os.environ, **MODES[mode], 'CACHE_BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+        if mode == 'pool':
+            # One pooled connection per thread, so requests never queue for one.
+            env.setdefault('DB_POOL_MAX_SIZE', str(args.threads))
+        port = free_port()
+        process = start(['gunicorn', 'analytics_project.wsgi', '--workers', str(args.workers),
+                         '--threads', str(args.threads), '--bind', f'127.0.0.1:{port}'], port, env)
+        try:
+            result = asyncio.run(drive(f'http://127.0.0.1:{port}/api/', PATHS, args.concurrency, args.duration))
+        finally:
+            process.terminate()
+            process.wait()
+        rows.append({'mode': mode, 'concurrency': args.concurrency, **result})
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Peak memory of the streaming metric export.
+
+Seeds ``--rows`` metric rows, streams /api/metrics/export/ in both formats
+and tracks the peak Python allocation while the body is consumed. Exits
+with an error when the peak exceeds ``--max-peak-mb``; the bound does not
+depend on the row count because rows are never accumulated.
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from benchmarks.harness import benchmark_database, print_table
+
+from django.test import Client
+
+from campaigns.models import Campaign, Metric
+
+
+def seed(rows, campaigns=1000, batch=20000):
+    campaign_ids = [campaign.pk for campaign in Campaign.objects.bulk_create([
+        Campaign(name=f'Campaign {i}', platform='facebook', start_date=date(2020, 1, 1))
+        for i in range(campaigns)
+    ])]
+    first_day = date(2020, 1, 1)
+    pending = []
+    for index in range(rows):
+        day, campaign = divmod(index, campaigns)
+        pending.append(Metric(campaign_id=campaign_ids[campaign], date=first_day + timedelta(days=day),
+                              impressions=1000, clicks=30, engagements=20, conversions=2, spend='9.99'))
+        if len(pending) == batch:
+            Metric.objects.bulk_create(pending)
+            pending = []
+    Metric.objects.bulk_create(pending)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--max-peak-mb', type=float, default=32.0)
+    args = parser.parse_args()
+
+    with benchmark_database():
+        seed(args.rows)
+        client = Client()
+        results = []
+        for output in ('csv', 'ndjson'):
+            tracemalloc.start()
+            started = time.perf_counter()
+            response = client.get(f'/api/metrics/export/?output={output}')
+            size = lines = 0
+            for chunk in response.streaming_content:
+                size += len(chunk)
+                lines += 1
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results.append({'output': output, 'lines': lines, 'mb': round(size / 2 ** 20, 1),
+                            'seconds': round(elapsed, 2), 'peak_mb': round(peak / 2 ** 20, 2)})
+        print(f'GET /api/metrics/export/ with {args.rows} rows')
+        print_table(results)
+
+    over = [row for row in results if row['peak_mb'] > args.max_peak_mb]
+    if over:
+        sys.exit(f'Peak memory above {args.max_peak_mb} MB: {over}')
+
+
+if __name__ == '__main__':
+    main()
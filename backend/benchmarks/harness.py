@@ -0,0 +1,65 @@
+"""
+Shared helpers for the benchmark scripts in this package.
+
+Benchmarks run against a throwaway test database created from the configured
+DATABASES settings, so they never touch real data. Run them from the backend
+directory, e.g. ``python -m benchmarks.campaign_list``.
+"""
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'analytics_project.settings')
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import (  # noqa: E402
+    CaptureQueriesContext, setup_databases, setup_test_environment, teardown_databases,
+)
+
+
+@contextmanager
+def benchmark_database():
+    """Create a test database for the duration of the block."""
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure(func, repeat=5):
+    """Call ``func`` ``repeat`` times; return the last result with timing and query stats."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            result = func()
+            timings.append((time.perf_counter() - started) * 1000)
+    return result, {
+        'queries': len(queries),
+        'p50_ms': round(statistics.median(timings), 2),
+        'p99_ms': round(percentile(timings, 0.99), 2),
+    }
+
+
+def print_table(rows):
+    """Print a list of dicts as an aligned text table."""
+    if not rows:
+        return
+    columns = list(rows[0])
+    widths = {column: max(len(column), *(len(str(row[column])) for row in rows)) for column in columns}
+    print('  '.join(column.ljust(widths[column]) for column in columns))
+    for row in rows:
+        print('  '.join(str(row[column]).ljust(widths[column]) for column in columns))
@@ -0,0 +1,76 @@
+"""
+Throughput of bulk metric ingestion in rows per second.
+
+Ingests the same synthetic dataset as JSON Lines and CSV through the ingest
+endpoint, first as inserts and then again as updates of the same rows.
+"""
+import argparse
+import csv
+import io
+import json
+import time
+from datetime import date, timedelta
+
+from benchmarks.harness import benchmark_database, print_table
+
+from django.test import Client
+
+from campaigns.models import Campaign
+
+
+def dataset(rows, campaign_ids):
+    first_day = date(2024, 1, 1)
+    days = -(-rows // len(campaign_ids))
+    for day in range(days):
+        for campaign_id in campaign_ids:
+            yield {'campaign': campaign_id, 'date': (first_day + timedelta(days=day)).isoformat(),
+                   'impressions': 1000 + day, 'clicks': 40, 'engagements': 25,
+                   'conversions': 4, 'spend': '18.75'}
+
+
+def encode(records, fmt):
+    if fmt == 'jsonl':
+        return '\n'.join(json.dumps(record) for record in records)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(records[0]))
+    writer.writeheader()
+    writer.writerows(records)
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--campaigns', type=int, default=100)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    with benchmark_database():
+        campaigns = Campaign.objects.bulk_create([
+            Campaign(name=f'Campaign {i}', platform='instagram', start_date=date(2024, 1, 1))
+            for i in range(args.campaigns)
+        ])
+        records = list(dataset(args.rows, [campaign.pk for campaign in campaigns]))[:args.rows]
+        client = Client()
+        results = []
+        for fmt, content_type in [('jsonl', 'application/x-ndjson'), ('csv', 'text/csv')]:
+            body = encode(records, fmt)
+            for phase in ('insert', 'update'):
+                started = time.perf_counter()
+                response = client.post(f'/api/metrics/ingest/?chunk_size={args.chunk_size}',
+                                       body, content_type=content_type)
+                elapsed = time.perf_counter() - started
+                totals = response.json()['totals']
+                results.append({'format': fmt, 'phase': phase, 'rows': totals['received'],
+                                'inserted': totals['inserted'], 'updated': totals['updated'],
+                                'seconds': round(elapsed, 2),
+                                'rows_per_s': int(totals['received'] / elapsed)})
+            # Start the next format from an empty table.
+            for campaign in campaigns:
+                campaign.metrics.all().delete()
+        print(f'POST /api/metrics/ingest/ with chunk_size={args.chunk_size}')
+        print_table(results)
+
+
+if __name__ == '__main__':
+    main()
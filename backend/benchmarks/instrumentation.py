@@ -0,0 +1,106 @@
+"""
+Overhead of the request instrumentation middleware.
+
+Serves a mix of routes with and without InstrumentationMiddleware,
+interleaved so both see the same conditions, and times a batch of trivial
+queries through the execute wrapper with and without an instrumented
+request. Exits with status 1 when the overhead exceeds the budget:
+
+- at most 0.25 ms added to the median request
+- at most 10 microseconds added per database query
+"""
+import statistics
+import sys
+import time
+
+from benchmarks.harness import benchmark_database, print_table
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client, override_settings
+
+from analytics_project import instrumentation
+from campaigns import datasets
+
+
+REQUEST_BUDGET_MS = 0.25
+QUERY_BUDGET_US = 10.0
+ROUTES = [
+    '/api/campaigns/',
+    '/api/campaigns/dashboard_stats/',
+    '/api/campaigns/platform_performance/',
+    '/api/campaigns/timeseries/?interval=week',
+    '/api/metrics/',
+]
+ROUNDS = 200
+QUERIES = 20000
+MIDDLEWARE = 'analytics_project.instrumentation.InstrumentationMiddleware'
+
+
+def request_overhead():
+    # A test client builds its middleware chain on its first request.
+    clients = {True: Client(), False: Client()}
+    without = [name for name in settings.MIDDLEWARE if name != MIDDLEWARE]
+    with override_settings(MIDDLEWARE=without):
+        clients[False].get(ROUTES[0])
+    clients[True].get(ROUTES[0])
+    samples = {True: {url: [] for url in ROUTES}, False: {url: [] for url in ROUTES}}
+    for _ in range(ROUNDS):
+        for enabled, client in clients.items():
+            for url in ROUTES:
+                started = time.perf_counter()
+                client.get(url)
+                samples[enabled][url].append((time.perf_counter() - started) * 1000)
+    return [
+        {'route': url,
+         'off_p50_ms': round(statistics.median(samples[False][url]), 3),
+         'on_p50_ms': round(statistics.median(samples[True][url]), 3),
+         'overhead_ms': round(statistics.median(samples[True][url]) - statistics.median(samples[False][url]), 3)}
+        for url in ROUTES
+    ]
+
+
+def query_overhead():
+    connection.ensure_connection()
+    instrumentation.install_query_wrapper(connection)
+
+    def run():
+        with connection.cursor() as cursor:
+            started = time.perf_counter()
+            for _ in range(QUERIES):
+                cursor.execute('SELECT 1')
+            return (time.perf_counter() - started) / QUERIES * 1e6
+
+    connection.execute_wrappers.remove(instrumentation.record_query)
+    bare = min(run() for _ in range(3))
+    instrumentation.install_query_wrapper(connection)
+    token = instrumentation._current.set(instrumentation.RequestStats())
+    try:
+        wrapped = min(run() for _ in range(3))
+    finally:
+        instrumentation._current.reset(token)
+    return bare, wrapped
+
+
+def main():
+    with benchmark_database(), override_settings(
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+    ):
+        datasets.generate(100, 60)
+        rows = request_overhead()
+        bare, wrapped = query_overhead()
+
+    print(f'Request overhead over {ROUNDS} interleaved rounds')
+    print_table(rows)
+    request_overhead_ms = statistics.median(row['overhead_ms'] for row in rows)
+    query_overhead_us = wrapped - bare
+    print(f'\nMedian request overhead: {request_overhead_ms:.3f} ms (budget {REQUEST_BUDGET_MS} ms)')
+    print(f'Per-query overhead: {query_overhead_us:.2f} us ({bare:.2f} -> {wrapped:.2f} us; '
+          f'budget {QUERY_BUDGET_US} us)')
+    if request_overhead_ms > REQUEST_BUDGET_MS or query_overhead_us > QUERY_BUDGET_US:
+        print('Instrumentation overhead is over budget.')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Campaign leaderboards: bounded top-K vs sorting every campaign.
+
+Generates a seeded dataset (50,000 campaigns by default) and builds top-10
+boards by CTR, overall and per platform, all-time and over the last 30 days.
+Each board is built twice: with campaigns.leaderboard (ORDER BY ... LIMIT in
+the database, or a streaming heap per platform) and naively, by fetching
+every scored campaign and sorting the list in Python. Both must rank the
+same campaigns. Reports latency and peak Python memory.
+"""
+import argparse
+import tracemalloc
+from datetime import date, timedelta
+
+from benchmarks.harness import benchmark_database, measure, print_table
+
+from django.http import QueryDict
+
+from campaigns import datasets, leaderboard
+
+
+END_DATE = date(2024, 12, 31)
+
+
+def naive(params):
+    board = leaderboard.parse_board(params)
+    rows, columns = leaderboard.scored_rows(params, board['kpi'], board['min_impressions'],
+                                            board['date_from'], board['date_to'])
+    rows = sorted(rows, key=lambda row: (-row['score'], row[columns['id']]))
+    if not board['per_platform']:
+        return [row[columns['id']] for row in rows[:board['limit']]]
+    boards = {}
+    for row in rows:
+        top = boards.setdefault(row[columns['platform']], [])
+        if len(top) < board['limit']:
+            top.append(row[columns['id']])
+    return dict(sorted(boards.items()))
+
+
+def bounded(params):
+    response = leaderboard.leaderboard(params)
+    if 'results' in response:
+        return [row['id'] for row in response['results']]
+    return {platform: [row['id'] for row in top] for platform, top in response['platforms'].items()}
+
+
+def peak_kb(func, params):
+    tracemalloc.start()
+    try:
+        func(params)
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--campaigns', type=int, default=50_000)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    recent = (END_DATE - timedelta(days=29)).isoformat()
+    boards = {
+        'overall': 'kpi=ctr&min_impressions=1000',
+        'per platform': 'kpi=ctr&min_impressions=1000&per_platform=true',
+        'overall, 30 days': f'kpi=ctr&min_impressions=1000&date_from={recent}&date_to={END_DATE}',
+        'per platform, 30 days': f'kpi=ctr&min_impressions=1000&per_platform=true'
+                                 f'&date_from={recent}&date_to={END_DATE}',
+    }
+    with benchmark_database():
+        datasets.generate(args.campaigns, args.days, end_date=END_DATE)
+        rows = []
+        for name, query in boards.items():
+            params = QueryDict(query)
+            expected, sorted_stats = measure(lambda: naive(params), args.repeat)
+            result, topk_stats = measure(lambda: bounded(params), args.repeat)
+            assert result == expected, f'{name}: rankings differ'
+            rows.append({
+                'board': name,
+                'sort_all_ms': sorted_stats['p50_ms'],
+                'top_k_ms': topk_stats['p50_ms'],
+                'sort_all_kb': peak_kb(naive, params),
+                'top_k_kb': peak_kb(bounded, params),
+            })
+        print(f'Top 10 of {args.campaigns} campaigns by CTR')
+        print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Per-page latency of offset vs keyset pagination of the campaign list.
+
+Seeds 100,000 campaigns and fetches pages 1 to 10,000 (10 rows each) with
+DRF's PageNumberPagination, which runs OFFSET plus COUNT(*), and with the
+keyset CampaignPagination, whose cursor for page N is built from the last
+row of page N - 1 exactly as a client following ``next`` links would get it.
+"""
+from datetime import date
+
+from benchmarks.harness import benchmark_database, measure, print_table
+
+from rest_framework.pagination import Cursor, PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from campaigns.models import Campaign
+from campaigns.pagination import CampaignPagination
+
+
+CAMPAIGNS = 100_000
+PAGE_SIZE = 10
+PAGES = [1, 10, 100, 1000, 10_000]
+
+
+def seed():
+    platforms = ['facebook', 'instagram', 'twitter', 'linkedin', 'tiktok']
+    Campaign.objects.bulk_create([
+        Campaign(name=f'Campaign {i}', platform=platforms[i % len(platforms)],
+                 status='active', start_date=date(2024, 1, 1))
+        for i in range(CAMPAIGNS)
+    ], batch_size=5000)
+
+
+def offset_page(factory, page):
+    request = Request(factory.get('/api/campaigns/', {'page': page}))
+    paginator = PageNumberPagination()
+    paginator.page_size = PAGE_SIZE
+    return paginator.paginate_queryset(Campaign.objects.order_by('-created_at', '-id'), request)
+
+
+def cursor_for(page):
+    if page == 1:
+        return {}
+    paginator = CampaignPagination()
+    paginator.base_url = '/api/campaigns/'
+    ordering = paginator.ordering
+    previous = Campaign.objects.order_by(*ordering)[(page - 1) * PAGE_SIZE - 1]
+    position = paginator._get_position_from_instance(previous, ordering)
+    url = paginator.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+    return {'cursor': url.split('cursor=', 1)[1]}
+
+
+def keyset_page(factory, params):
+    request = Request(factory.get('/api/campaigns/', {'page_size': PAGE_SIZE, **params}))
+    return CampaignPagination().paginate_queryset(Campaign.objects.all(), request)
+
+
+def main():
+    with benchmark_database():
+        seed()
+        factory = APIRequestFactory()
+        rows = []
+        for page in PAGES:
+            offset_rows, offset_stats = measure(lambda: offset_page(factory, page))
+            params = cursor_for(page)
+            keyset_rows, keyset_stats = measure(lambda: keyset_page(factory, params))
+            assert [row.pk for row in offset_rows] == [row.pk for row in keyset_rows]
+            rows.append({
+                'page': page,
+                'offset_p50_ms': offset_stats['p50_ms'],
+                'offset_queries': offset_stats['queries'],
+                'keyset_p50_ms': keyset_stats['p50_ms'],
+                'keyset_p99_ms': keyset_stats['p99_ms'],
+                'keyset_queries': keyset_stats['queries'],
+            })
+        print(f'Campaign list pages of {PAGE_SIZE} over {CAMPAIGNS} campaigns')
+        print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Serialization throughput of campaign lists: ModelSerializer vs values serializers.
+
+Generates a seeded dataset (10,000 campaigns by default) and turns all of
+it into JSON bytes, compact and with a window of nested metrics, for each
+combination of serializer (CampaignSerializer over prefetched instances or
+CampaignValuesSerializer over values() rows) and renderer (DRF's
+JSONRenderer or FastJSONRenderer, which uses orjson when installed). Times
+include the queries; every variant produces the same bytes.
+"""
+import argparse
+from datetime import date
+
+from benchmarks.harness import benchmark_database, measure, print_table
+
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from analytics_project import renderers
+from campaigns import datasets
+from campaigns.models import Campaign, Metric
+from campaigns.serializers import CampaignSerializer, CampaignValuesSerializer
+
+
+END_DATE = date(2024, 12, 31)
+
+
+def model_serializer(include_metrics, limit):
+    queryset = Campaign.objects.all()
+    if include_metrics:
+        queryset = queryset.prefetch_related(
+            Prefetch('metrics', queryset=Metric.objects.all()[:limit], to_attr='metric_window'))
+    return CampaignSerializer(queryset, many=True, context={'include_metrics': include_metrics}).data
+
+
+def values_serializer(include_metrics, limit):
+    serializer = CampaignValuesSerializer({'include_metrics': include_metrics, 'metrics_limit': limit})
+    return serializer.serialize(serializer.values(Campaign.objects.all()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--campaigns', type=int, default=10_000)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--metrics-limit', type=int, default=7)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    variants = [
+        ('ModelSerializer', 'JSONRenderer', model_serializer, JSONRenderer),
+        ('ModelSerializer', 'FastJSONRenderer', model_serializer, renderers.FastJSONRenderer),
+        ('values', 'JSONRenderer', values_serializer, JSONRenderer),
+        ('values', 'FastJSONRenderer', values_serializer, renderers.FastJSONRenderer),
+    ]
+    with benchmark_database():
+        datasets.generate(args.campaigns, args.days, end_date=END_DATE)
+        rows = []
+        for include_metrics in (False, True):
+            expected = None
+            for serializer_name, renderer_name, serialize, renderer in variants:
+                def run():
+                    return renderer().render(serialize(include_metrics, args.metrics_limit))
+                content, stats = measure(run, args.repeat)
+                if expected is None:
+                    expected = content
+                assert content == expected, f'{serializer_name} + {renderer_name} output differs'
+                rows.append({
+                    'metrics': args.metrics_limit if include_metrics else 0,
+                    'serializer': serializer_name,
+                    'renderer': renderer_name,
+                    'queries': stats['queries'],
+                    'p50_ms': stats['p50_ms'],
+                    'campaigns_per_s': round(args.campaigns / stats['p50_ms'] * 1000),
+                    'bytes': len(content),
+                })
+        encoder = 'orjson' if renderers.orjson is not None else 'stdlib (orjson not installed)'
+        print(f'{args.campaigns} campaigns serialized to JSON; FastJSONRenderer uses {encoder}')
+        print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
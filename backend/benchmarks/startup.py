@@ -0,0 +1,207 @@
+"""
+Worker start-up cost of each settings profile, checked against a baseline.
+
+For the full settings and the API worker profile (settings_api), starts
+fresh interpreters that load the WSGI application and serve one request,
+and reports:
+
+- ``import_ms``: import time from ``python -X importtime``, from the
+  script's first import to the first response (interpreter start-up and
+  site packages excluded)
+- ``modules``: modules loaded once the first response is served
+- ``first_response_ms``: wall time from the script's start to its first
+  response, without ``-X importtime``
+- ``middleware_us``: per-request cost of the middleware stack, the median
+  request through the application minus one through a handler without
+  middleware, on the same DB-free route
+
+Results are compared with ``benchmarks/startup_baseline.json``. A profile
+fails when it loads more modules than the baseline, or when its import
+time, time to first response or middleware cost grows beyond the
+tolerances; any failure exits with status 1. Like the suite's, the timing
+baseline is machine-specific:
+
+    python -m benchmarks.startup --update-baseline
+    python -m benchmarks.startup
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.harness import print_table
+
+import django
+
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+BASELINE = Path(__file__).with_name('startup_baseline.json')
+PROFILES = {
+    'full': 'analytics_project.settings',
+    'api': 'analytics_project.settings_api',
+}
+# The DRF API root: served by every profile without touching the database.
+PATH = '/api/'
+MARKER = '-- application imports --'
+
+CHILD = f'''
+import io, json, statistics, sys, time
+started = time.perf_counter()
+sys.stderr.write({MARKER!r} + '\\n')
+sys.stderr.flush()
+from django.core.wsgi import get_wsgi_application
+
+application = get_wsgi_application()
+
+
+def request(handler, path):
+    statuses = []
+    environ = {{
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80', 'HTTP_HOST': 'localhost', 'wsgi.input': io.BytesIO(),
+        'wsgi.url_scheme': 'http', 'wsgi.errors': sys.stderr,
+    }}
+    b''.join(handler(environ, lambda status, headers: statuses.append(status)))
+    return int(statuses[0].split()[0])
+
+
+path, rounds = sys.argv[1], int(sys.argv[2])
+status = request(application, path)
+first_response_ms = (time.perf_counter() - started) * 1000
+modules = len(sys.modules)
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+
+middleware = settings.MIDDLEWARE
+settings.MIDDLEWARE = []
+bare = WSGIHandler()
+settings.MIDDLEWARE = middleware
+samples = {{application: [], bare: []}}
+for _ in range(rounds):
+    for handler, timings in samples.items():
+        request_started = time.perf_counter()
+        request(handler, path)
+        timings.append((time.perf_counter() - request_started) * 1e6)
+print(json.dumps({{
+    'status': status,
+    'first_response_ms': first_response_ms,
+    'modules': modules,
+    'middleware_us': statistics.median(samples[application]) - statistics.median(samples[bare]),
+}}))
+'''
+
+
+def run_child(settings_module, rounds, importtime=False):
+    command = [sys.executable, *(['-X', 'importtime'] if importtime else []), '-c', CHILD, PATH, str(rounds)]
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings_module}
+    result = subprocess.run(command, cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    if result.returncode:
+        sys.exit(f'{settings_module} failed to start:\n{result.stderr[-2000:]}')
+    return json.loads(result.stdout), result.stderr
+
+
+def top_level_imports(stderr):
+    """{module: cumulative microseconds} for the imports after the marker, top level only."""
+    imports = {}
+    for line in stderr.split(MARKER, 1)[1].splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('  ') and cumulative.strip().isdigit():
+            imports[name.strip()] = int(cumulative)
+    return imports
+
+
+def measure_profile(settings_module, runs, rounds):
+    timed = [run_child(settings_module, rounds)[0] for _ in range(runs)]
+    imported = [top_level_imports(run_child(settings_module, 1, importtime=True)[1]) for _ in range(runs)]
+    totals = [sum(imports.values()) / 1000 for imports in imported]
+    heaviest = sorted(imported[-1].items(), key=lambda item: item[1], reverse=True)
+    return {
+        'status': timed[-1]['status'],
+        'import_ms': round(statistics.median(totals), 1),
+        'modules': timed[-1]['modules'],
+        'first_response_ms': round(statistics.median(run['first_response_ms'] for run in timed), 1),
+        'middleware_us': round(statistics.median(run['middleware_us'] for run in timed), 1),
+    }, heaviest
+
+
+def grew(current, previous, tolerance, floor):
+    return current > max(previous * (1 + tolerance), previous + floor)
+
+
+def compare(results, baseline, args):
+    regressions = []
+    for name, current in results['profiles'].items():
+        previous = baseline['profiles'].get(name)
+        if previous is None:
+            continue
+        problems = []
+        if current['status'] != previous['status']:
+            problems.append(f"status {previous['status']} -> {current['status']}")
+        if current['modules'] > previous['modules']:
+            problems.append(f"modules {previous['modules']} -> {current['modules']}")
+        for key, unit in (('import_ms', 'ms'), ('first_response_ms', 'ms')):
+            if grew(current[key], previous[key], args.time_tolerance, args.time_floor_ms):
+                problems.append(f'{key} {previous[key]} -> {current[key]} {unit}')
+        if grew(current['middleware_us'], previous['middleware_us'],
+                args.middleware_tolerance, args.middleware_floor_us):
+            problems.append(f"middleware {previous['middleware_us']} -> {current['middleware_us']} us")
+        if problems:
+            regressions.append({'profile': name, 'regression': '; '.join(problems)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=7, help='Interpreters started per profile and mode.')
+    parser.add_argument('--rounds', type=int, default=500, help='Requests per handler for the middleware cost.')
+    parser.add_argument('--top', type=int, default=8, help='Heaviest top-level imports to list per profile.')
+    parser.add_argument('--baseline', default=str(BASELINE))
+    parser.add_argument('--update-baseline', action='store_true', help='Store these results as the baseline.')
+    parser.add_argument('--time-tolerance', type=float, default=0.25,
+                        help='Allowed import and first-response time growth as a fraction (default 0.25).')
+    parser.add_argument('--time-floor-ms', type=float, default=20.0,
+                        help='Ignore time growth below this many ms (default 20).')
+    parser.add_argument('--middleware-tolerance', type=float, default=0.5,
+                        help='Allowed middleware cost growth as a fraction (default 0.5).')
+    parser.add_argument('--middleware-floor-us', type=float, default=20.0,
+                        help='Ignore middleware cost growth below this many us (default 20).')
+    args = parser.parse_args()
+
+    results = {
+        'meta': {'python': platform.python_version(), 'django': django.get_version(), 'path': PATH},
+        'profiles': {},
+    }
+    for name, settings_module in PROFILES.items():
+        results['profiles'][name], heaviest = measure_profile(settings_module, args.runs, args.rounds)
+        if args.top:
+            print(f'Heaviest imports, {name} ({settings_module})')
+            print_table([{'module': module, 'cumulative_ms': round(us / 1000, 1)}
+                         for module, us in heaviest[:args.top]])
+            print()
+    print_table([{'profile': name, **stats} for name, stats in results['profiles'].items()])
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        baseline_path.write_text(json.dumps(results, indent=2) + '\n')
+        print(f'Baseline written to {baseline_path}.')
+        return
+    if not baseline_path.exists():
+        print(f'No baseline at {baseline_path}; run with --update-baseline to create one.')
+        return
+    regressions = compare(results, json.loads(baseline_path.read_text()), args)
+    if regressions:
+        print('\nREGRESSIONS')
+        print_table(regressions)
+        sys.exit(1)
+    print('\nNo regressions against the baseline.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,287 @@
+"""
+Benchmark every API route in-process and compare against a stored baseline.
+
+Generates a seeded dataset (campaigns.datasets) in a throwaway database and
+drives each CampaignViewSet, MetricViewSet, SocialAPIViewSet and JobViewSet
+route, plus the async variants, through the Django test client. The response cache is
+disabled so every request reaches the database, and the trending-topics
+upstream is a local stub. For each route it records latency percentiles,
+the query count and the peak memory allocated while serving one request.
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --update-baseline
+
+Results are compared with ``benchmarks/baseline.json``: a route fails when
+it issues more queries than the baseline, or when its p95 latency or peak
+memory grows beyond the tolerances. Any failure exits with status 1.
+Latency baselines are machine-specific; regenerate the baseline with
+``--update-baseline`` on the machine that runs the comparison.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import date, timedelta
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+from benchmarks.harness import benchmark_database, percentile, print_table
+from benchmarks.trending import StubHandler, Upstream
+
+import django
+from asgiref.sync import async_to_sync
+from django.db import connection, reset_queries
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from campaigns import datasets
+from campaigns.models import Campaign
+from social_api import services
+
+
+BASELINE = Path(__file__).with_name('baseline.json')
+END_DATE = date(2024, 12, 31)
+CAMPAIGN = {'name': 'Benchmark campaign', 'platform': 'instagram', 'status': 'active',
+            'start_date': '2024-06-01', 'budget': '2500.00'}
+
+# (route name, method, path, body). {campaign} is a campaign with metrics,
+# {scratch} a campaign created for that single request, {recent} a date
+# 30 days before the end of the dataset, {end} its last date; a '{bulk}' body value is the ids of
+# the first BULK_CAMPAIGNS campaigns. Routes that add campaigns or metrics in
+# bulk come last so they do not change the data the other routes read.
+ROUTES = [
+    ('campaign-list', 'get', '/api/campaigns/', None),
+    ('campaign-list-metrics', 'get', '/api/campaigns/?include_metrics=true', None),
+    ('campaign-list-search', 'get', '/api/campaigns/?search=summer', None),
+    ('campaign-list-ordering', 'get', '/api/campaigns/?ordering=name&count=true', None),
+    ('campaign-create', 'post', '/api/campaigns/', CAMPAIGN),
+    ('campaign-retrieve', 'get', '/api/campaigns/{campaign}/', None),
+    ('campaign-update', 'put', '/api/campaigns/{scratch}/', CAMPAIGN),
+    ('campaign-partial-update', 'patch', '/api/campaigns/{scratch}/', {'budget': '3000.00'}),
+    ('campaign-destroy', 'delete', '/api/campaigns/{scratch}/', None),
+    ('campaign-active', 'get', '/api/campaigns/active/', None),
+    ('campaign-pause', 'post', '/api/campaigns/{campaign}/pause/', None),
+    ('campaign-resume', 'post', '/api/campaigns/{campaign}/resume/', None),
+    ('campaign-duplicate', 'post', '/api/campaigns/{campaign}/duplicate/', None),
+    ('campaign-export', 'get', '/api/campaigns/export/?output=csv', None),
+    ('campaign-timeseries', 'get', '/api/campaigns/timeseries/?interval=week', None),
+    ('campaign-timeseries-filtered', 'get',
+     '/api/campaigns/timeseries/?interval=day&status=active&date_from={recent}', None),
+    ('campaign-detail-timeseries', 'get', '/api/campaigns/{campaign}/timeseries/?interval=day', None),
+    ('campaign-dashboard-stats', 'get', '/api/campaigns/dashboard_stats/', None),
+    ('campaign-platform-performance', 'get', '/api/campaigns/platform_performance/', None),
+    ('campaign-dashboard-stats-compare', 'get',
+     '/api/campaigns/dashboard_stats/?date_from={recent}&date_to={end}&compare=true', None),
+    ('campaign-platform-performance-compare', 'get',
+     '/api/campaigns/platform_performance/?date_from={recent}&date_to={end}&compare=true', None),
+    ('campaign-leaderboard', 'get', '/api/campaigns/leaderboard/?kpi=ctr&min_impressions=1000', None),
+    ('campaign-leaderboard-platforms', 'get',
+     '/api/campaigns/leaderboard/?kpi=roi&per_platform=true&date_from={recent}&date_to={end}', None),
+    ('metric-list', 'get', '/api/metrics/?date_from={recent}', None),
+    ('metric-query', 'get', '/api/metrics/query/?group_by=platform,week', None),
+    ('metric-query-filtered', 'get',
+     '/api/metrics/query/?group_by=campaign&status=active&date_from={recent}&kpis=total_clicks,cpc', None),
+    ('metric-ingest', 'post', '/api/metrics/ingest/', 'ingest'),
+    ('metric-export', 'get', '/api/metrics/export/?output=ndjson&date_from={recent}', None),
+    ('metric-ingest-async', 'post', '/api/metrics/ingest/?async=true', 'ingest'),
+    ('metric-export-async', 'post', '/api/metrics/export/?output=csv', None),
+    ('job-list', 'get', '/api/jobs/', None),
+    ('social-trending-topics', 'get', '/api/social-api/fetch_trending_topics/', None),
+    ('async-active', 'aget', '/api/async/campaigns/active/', None),
+    ('async-dashboard-stats', 'aget', '/api/async/campaigns/dashboard_stats/', None),
+    ('async-platform-performance', 'aget', '/api/async/campaigns/platform_performance/', None),
+    ('async-timeseries', 'aget', '/api/async/campaigns/timeseries/?interval=week', None),
+    ('async-trending-topics', 'aget', '/api/async/social-api/fetch_trending_topics/', None),
+    ('campaign-bulk-pause', 'post', '/api/campaigns/bulk_pause/', {'ids': '{bulk}'}),
+    ('campaign-bulk-resume', 'post', '/api/campaigns/bulk_resume/', {'filter': {'platform': 'instagram'}}),
+    ('campaign-bulk-duplicate', 'post', '/api/campaigns/bulk_duplicate/',
+     {'ids': '{bulk}', 'include_metrics': True}),
+]
+BULK_CAMPAIGNS = 20
+
+
+class Runner:
+
+    def __init__(self, campaign_id, recent, bulk_ids):
+        self.client = Client()
+        self.async_client = AsyncClient()
+        self.context = {'campaign': campaign_id, 'recent': recent, 'end': END_DATE.isoformat()}
+        self.bodies = {'{bulk}': bulk_ids}
+        self.ingest_body = '\n'.join(
+            json.dumps({'campaign': campaign_id, 'date': (END_DATE - timedelta(days=day)).isoformat(),
+                        'impressions': 1000, 'clicks': 40, 'engagements': 25, 'conversions': 4,
+                        'spend': '18.75'})
+            for day in range(100)
+        )
+
+    def request(self, method, path, body):
+        """Prepare then send one request; return a callable that sends it and its response."""
+        if '{scratch}' in path:
+            scratch = Campaign.objects.create(name='Scratch', platform='tiktok', start_date=END_DATE)
+            path = path.replace('{scratch}', str(scratch.pk))
+        path = path.format(**self.context)
+        if method == 'aget':
+            return lambda: async_to_sync(self.async_client.get)(path)
+        if body == 'ingest':
+            return lambda: self.client.post(path, self.ingest_body, content_type='application/x-ndjson')
+        if body:
+            body = {key: self.bodies.get(value, value) if isinstance(value, str) else value
+                    for key, value in body.items()}
+        kwargs = {'data': json.dumps(body), 'content_type': 'application/json'} if body else {}
+        return lambda: getattr(self.client, method)(path, **kwargs)
+
+    def send(self, send):
+        response = send()
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        return response.status_code, size
+
+    def run(self, route, repeat, warmup):
+        name, method, path, body = route
+        timings = []
+        for iteration in range(warmup + repeat):
+            send = self.request(method, path, body)
+            # The query log is a bounded deque; start empty so counts stay exact.
+            reset_queries()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                status, size = self.send(send)
+                elapsed = (time.perf_counter() - started) * 1000
+            query_count = len(queries)
+            if iteration >= warmup:
+                timings.append(elapsed)
+
+        # Memory is measured on a separate request; tracing slows everything down.
+        send = self.request(method, path, body)
+        tracemalloc.start()
+        try:
+            self.send(send)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'status': status,
+            'bytes': size,
+            'queries': query_count,
+            'p50_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'p99_ms': round(percentile(timings, 0.99), 2),
+            'peak_kb': round(peak / 1024, 1),
+        }
+
+
+def start_upstream():
+    Upstream.delay = 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    services._service = services.TrendingTopicsService(f'http://127.0.0.1:{server.server_port}/')
+    return server
+
+
+def compare(results, baseline, args):
+    """Return a list of regression rows; raise SystemExit if the runs are not comparable."""
+    if baseline['meta']['dataset'] != results['meta']['dataset'] or \
+            baseline['meta']['vendor'] != results['meta']['vendor']:
+        sys.exit('The baseline was recorded with a different dataset or database; '
+                 'rerun with --update-baseline.')
+    regressions = []
+    for name, current in results['routes'].items():
+        previous = baseline['routes'].get(name)
+        if previous is None:
+            continue
+        problems = []
+        if current['status'] != previous['status']:
+            problems.append(f"status {previous['status']} -> {current['status']}")
+        if current['queries'] > previous['queries']:
+            problems.append(f"queries {previous['queries']} -> {current['queries']}")
+        if current['p95_ms'] > max(previous['p95_ms'] * (1 + args.latency_tolerance),
+                                   previous['p95_ms'] + args.latency_floor_ms):
+            problems.append(f"p95 {previous['p95_ms']} -> {current['p95_ms']} ms")
+        if current['peak_kb'] > max(previous['peak_kb'] * (1 + args.memory_tolerance),
+                                    previous['peak_kb'] + args.memory_floor_kb):
+            problems.append(f"memory {previous['peak_kb']} -> {current['peak_kb']} KB")
+        if problems:
+            regressions.append({'route': name, 'regression': '; '.join(problems)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--campaigns', type=int, default=200)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--only', help='Comma-separated route names to run.')
+    parser.add_argument('--output', help='Write the results to this JSON file.')
+    parser.add_argument('--baseline', default=str(BASELINE))
+    parser.add_argument('--update-baseline', action='store_true', help='Store these results as the baseline.')
+    parser.add_argument('--latency-tolerance', type=float, default=0.5,
+                        help='Allowed p95 growth as a fraction (default 0.5).')
+    parser.add_argument('--latency-floor-ms', type=float, default=2.0,
+                        help='Ignore p95 growth below this many ms (default 2).')
+    parser.add_argument('--memory-tolerance', type=float, default=0.25,
+                        help='Allowed peak memory growth as a fraction (default 0.25).')
+    parser.add_argument('--memory-floor-kb', type=float, default=64.0,
+                        help='Ignore memory growth below this many KB (default 64).')
+    args = parser.parse_args()
+
+    routes = ROUTES
+    if args.only:
+        names = set(args.only.split(','))
+        routes = [route for route in ROUTES if route[0] in names]
+
+    server = start_upstream()
+    try:
+        with benchmark_database(), override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+        ):
+            created = datasets.generate(args.campaigns, args.days, seed=args.seed, end_date=END_DATE)
+            campaign = Campaign.objects.filter(metrics__isnull=False).order_by('pk').first()
+            bulk_ids = list(Campaign.objects.order_by('pk').values_list('pk', flat=True)[:BULK_CAMPAIGNS])
+            runner = Runner(campaign.pk, (END_DATE - timedelta(days=30)).isoformat(), bulk_ids)
+            results = {
+                'meta': {
+                    'dataset': {'campaigns': args.campaigns, 'days': args.days, 'seed': args.seed,
+                                'metrics': created['metrics']},
+                    'vendor': connection.vendor,
+                    'repeat': args.repeat,
+                    'python': platform.python_version(),
+                    'django': django.get_version(),
+                },
+                'routes': {route[0]: runner.run(route, args.repeat, args.warmup) for route in routes},
+            }
+    finally:
+        server.shutdown()
+
+    print(f"{len(routes)} routes over {args.campaigns} campaigns x {args.days} days "
+          f"({created['metrics']} metrics, {connection.vendor})")
+    print_table([{'route': name, **stats} for name, stats in results['routes'].items()])
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + '\n')
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        baseline_path.write_text(json.dumps(results, indent=2) + '\n')
+        print(f'Baseline written to {baseline_path}.')
+        return
+    if not baseline_path.exists():
+        print(f'No baseline at {baseline_path}; run with --update-baseline to create one.')
+        return
+    regressions = compare(results, json.loads(baseline_path.read_text()), args)
+    if regressions:
+        print('\nREGRESSIONS')
+        print_table(regressions)
+        sys.exit(1)
+    print('\nNo regressions against the baseline.')
+
+
+if __name__ == '__main__':
+    main()
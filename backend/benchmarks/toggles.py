@@ -0,0 +1,186 @@
+"""
+Pause/resume throughput, and lost updates under contention.
+
+Generates campaigns with metric history, then:
+
+1. Toggles campaigns between paused and active one at a time, through the
+   old read-modify-write path (load the campaign, ``save()`` every column,
+   serialize it with its nested metrics, as pause/resume used to) and
+   through campaigns.transitions, directly and via the HTTP actions, and
+   reports toggles per second.
+2. Runs a storm: threads pause and resume a few shared campaigns while
+   another thread adds metric rows to them, which increments the campaign
+   totals. Afterwards the totals must match the metrics, and on each
+   campaign the successful pauses and resumes must alternate (their counts
+   differ by the final status). The old path goes through the same storm
+   for comparison; its drift is reported but does not fail the run.
+
+Exits with status 1 when a transition loses an update. Run it against
+PostgreSQL for real row-level concurrency; SQLite serializes the writers
+(locked writes are retried).
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from datetime import date, timedelta
+
+from benchmarks.harness import benchmark_database, print_table
+from benchmarks.totals import retry
+
+from django.db import connection
+from django.test import Client, override_settings
+
+from campaigns import datasets, totals, transitions
+from campaigns.models import Campaign, Metric
+from campaigns.serializers import CampaignSerializer, CampaignStatusSerializer
+
+
+FIRST_DAY = date(2025, 1, 1)
+TARGETS = (Campaign.PAUSED, Campaign.ACTIVE)
+
+
+def legacy_toggle(pk, target):
+    """Pause/resume as it was: every column written back, full serializer."""
+    campaign = Campaign.objects.get(pk=pk)
+    campaign.status = target
+    campaign.save()
+    CampaignSerializer(campaign).data
+    return transitions.UPDATED
+
+
+def transition_toggle(pk, target):
+    try:
+        campaign, outcome = transitions.transition(pk, target)
+    except transitions.TransitionNotAllowed:
+        return transitions.NOT_ALLOWED
+    CampaignStatusSerializer(campaign).data
+    return outcome
+
+
+def throughput(toggle, campaign_ids, count):
+    Campaign.objects.filter(pk__in=campaign_ids).update(status=Campaign.ACTIVE)
+    started = time.perf_counter()
+    for number in range(count):
+        # Each campaign alternates: paused on its first turn, active on the next.
+        toggle(campaign_ids[number % len(campaign_ids)], TARGETS[number // len(campaign_ids) % 2])
+    return count / (time.perf_counter() - started)
+
+
+def http_toggle(client):
+    def toggle(pk, target):
+        action = 'pause' if target == Campaign.PAUSED else 'resume'
+        return client.post(f'/api/campaigns/{pk}/{action}/')
+    return toggle
+
+
+def storm(toggle, campaign_ids, threads, toggles, metric_rows):
+    """Toggle shared campaigns from ``threads`` threads while metric rows arrive; returns the pause/resume successes."""
+    Campaign.objects.filter(pk__in=campaign_ids).update(status=Campaign.ACTIVE)
+    succeeded = {pk: {target: 0 for target in TARGETS} for pk in campaign_ids}
+    lock = threading.Lock()
+
+    def toggler(number):
+        rng = random.Random(number)
+        try:
+            for _ in range(toggles):
+                pk, target = rng.choice(campaign_ids), rng.choice(TARGETS)
+                if retry(lambda: toggle(pk, target)) == transitions.UPDATED:
+                    with lock:
+                        succeeded[pk][target] += 1
+        finally:
+            connection.close()
+
+    def metric_writer():
+        rng = random.Random(-1)
+        try:
+            for number in range(metric_rows):
+                metric = Metric(campaign_id=campaign_ids[number % len(campaign_ids)],
+                                date=FIRST_DAY + timedelta(days=number // len(campaign_ids)),
+                                impressions=rng.randint(0, 10000), clicks=rng.randint(0, 300),
+                                engagements=rng.randint(0, 500), conversions=rng.randint(0, 30), spend='9.99')
+                retry(metric.save)
+        finally:
+            connection.close()
+
+    workers = [threading.Thread(target=toggler, args=(number,)) for number in range(threads)]
+    workers.append(threading.Thread(target=metric_writer))
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return succeeded
+
+
+def alternation_errors(succeeded):
+    """Campaigns whose successful pauses and resumes did not strictly alternate from active."""
+    final = dict(Campaign.objects.filter(pk__in=succeeded).values_list('pk', 'status'))
+    return [
+        pk for pk, counts in succeeded.items()
+        if counts[Campaign.PAUSED] - counts[Campaign.ACTIVE] != (final[pk] == Campaign.PAUSED)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--campaigns', type=int, default=50)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--toggles', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--storm-campaigns', type=int, default=4)
+    parser.add_argument('--storm-toggles', type=int, default=200, help='Toggles per thread.')
+    parser.add_argument('--metric-rows', type=int, default=400)
+    args = parser.parse_args()
+
+    with benchmark_database(), override_settings(
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+    ):
+        datasets.generate(args.campaigns, args.days)
+        campaign_ids = list(Campaign.objects.order_by('pk').values_list('pk', flat=True))
+        client = Client()
+        rows = [
+            {'path': path, 'toggles_per_s': round(throughput(toggle, campaign_ids, args.toggles), 1)}
+            for path, toggle in (
+                ('save() + full serializer (old)', legacy_toggle),
+                ('transitions + slim serializer', transition_toggle),
+                ('POST pause/resume', http_toggle(client)),
+            )
+        ]
+        print(f'Sequential toggles over {args.campaigns} campaigns with {args.days} days of metrics '
+              f'({connection.vendor})')
+        print_table(rows)
+
+        results = []
+        failed = False
+        for name, toggle in (('transitions', transition_toggle), ('save() (old)', legacy_toggle)):
+            shared = [
+                Campaign.objects.create(name=f'Contended {name} {number}', platform='tiktok',
+                                        status=Campaign.ACTIVE, start_date=FIRST_DAY).pk
+                for number in range(args.storm_campaigns)
+            ]
+            started = time.perf_counter()
+            succeeded = storm(toggle, shared, args.threads, args.storm_toggles, args.metric_rows)
+            elapsed = time.perf_counter() - started
+            drifted = totals.reconcile(shared, dry_run=True)
+            # The old path reports every toggle as applied, so only the transitions can be checked for order.
+            out_of_order = alternation_errors(succeeded) if toggle is transition_toggle else []
+            results.append({
+                'path': name,
+                'toggles_per_s': round(args.threads * args.storm_toggles / elapsed, 1),
+                'applied': sum(sum(counts.values()) for counts in succeeded.values()),
+                'drifted_totals': drifted,
+                'out_of_order': len(out_of_order) if toggle is transition_toggle else '-',
+            })
+            failed |= toggle is transition_toggle and bool(drifted or out_of_order)
+        print(f'\nStorm: {args.threads} threads x {args.storm_toggles} toggles on {args.storm_campaigns} campaigns '
+              f'while {args.metric_rows} metric rows arrive')
+        print_table(results)
+    if failed:
+        print('\nTransitions lost updates.')
+        sys.exit(1)
+    print('\nNo lost updates.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Parallel metric writers against the campaign totals.
+
+Threads insert, edit and delete metric rows of a handful of shared campaigns
+through the ORM (and so the signal handlers), while another thread ingests
+batches, which reconciles the campaigns it touched. Afterwards the totals
+must match a fresh recomputation exactly; the script exits with status 1 on
+any drift. Run it against PostgreSQL for real row-level concurrency; SQLite
+serializes the writers (locked writes are retried).
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from datetime import date, timedelta
+
+from benchmarks.harness import benchmark_database, print_table
+
+from django.db import OperationalError, connection, transaction
+
+from campaigns import ingest, totals
+from campaigns.models import Campaign, Metric
+
+
+FIRST_DAY = date(2024, 1, 1)
+
+
+def retry(func):
+    """Run ``func`` in a transaction, retrying while SQLite reports the database as locked."""
+    while True:
+        try:
+            with transaction.atomic():
+                return func()
+        except OperationalError as exc:
+            if 'locked' not in str(exc):
+                raise
+            time.sleep(0.001)
+
+
+def writer(number, campaign_ids, operations, day_range):
+    rng = random.Random(number)
+    own = []
+    try:
+        for _ in range(operations):
+            choice = rng.random()
+            if own and choice < 0.15:
+                metric = own.pop(rng.randrange(len(own)))
+                retry(lambda: Metric.objects.filter(pk=metric.pk).delete())
+            elif own and choice < 0.3:
+                metric = rng.choice(own)
+                metric.impressions = rng.randint(0, 10000)
+                metric.spend = f'{rng.randint(0, 5000) / 100:.2f}'
+                retry(metric.save)
+            else:
+                # Each writer owns a slice of dates, so inserts never collide on (campaign, date).
+                day = FIRST_DAY + timedelta(days=number * day_range + rng.randrange(day_range))
+                campaign_id = rng.choice(campaign_ids)
+                if any(m.campaign_id == campaign_id and m.date == day for m in own):
+                    continue
+                fields = dict(campaign_id=campaign_id, date=day, impressions=rng.randint(0, 10000),
+                              clicks=rng.randint(0, 300), engagements=rng.randint(0, 500),
+                              conversions=rng.randint(0, 30), spend=f'{rng.randint(0, 5000) / 100:.2f}')
+                # A fresh instance per attempt: a rolled-back insert's pk may be reused by another writer.
+                own.append(retry(lambda: Metric.objects.create(**fields)))
+    finally:
+        connection.close()
+
+
+def ingester(campaign_ids, batches, day_range, writers):
+    rng = random.Random(-1)
+    try:
+        for _ in range(batches):
+            lines = [json.dumps({
+                'campaign': rng.choice(campaign_ids),
+                'date': (FIRST_DAY + timedelta(days=writers * day_range + rng.randrange(day_range))).isoformat(),
+                'impressions': rng.randint(0, 10000), 'clicks': rng.randint(0, 300),
+                'engagements': rng.randint(0, 500), 'conversions': rng.randint(0, 30), 'spend': '9.99',
+            }) for _ in range(50)]
+            retry(lambda: list(ingest.ingest(lines)))
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--campaigns', type=int, default=5)
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--operations', type=int, default=300)
+    parser.add_argument('--ingest-batches', type=int, default=20)
+    args = parser.parse_args()
+    day_range = args.operations
+
+    with benchmark_database():
+        campaign_ids = [
+            Campaign.objects.create(name=f'Contended {i}', platform='tiktok', start_date=FIRST_DAY).pk
+            for i in range(args.campaigns)
+        ]
+        threads = [
+            threading.Thread(target=writer, args=(number, campaign_ids, args.operations, day_range))
+            for number in range(args.writers)
+        ]
+        threads.append(threading.Thread(
+            target=ingester, args=(campaign_ids, args.ingest_batches, day_range, args.writers)))
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        drifted = totals.reconcile(dry_run=True)
+        rows = list(Campaign.objects.order_by('pk').values('id', 'impressions', 'engagements', 'spend',
+                                                            'engagement_rate'))
+        print(f'{args.writers} writers x {args.operations} operations and {args.ingest_batches} ingest '
+              f'batches on {args.campaigns} campaigns in {elapsed:.2f} s ({connection.vendor}); '
+              f'{Metric.objects.count()} metric rows')
+        print_table(rows)
+        if drifted:
+            print(f'\n{drifted} campaigns drifted from their metrics.')
+            sys.exit(1)
+        print('\nTotals match the metrics.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Behaviour of the trending-topics service against a local stub upstream.
+
+Starts a stub HTTP server that stands in for Reddit and checks that
+concurrent cold callers share one upstream request, that expired data is
+served stale while a single background refresh runs, and that a failing
+upstream trips the circuit breaker so later calls stop reaching it.
+"""
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.harness import print_table
+
+from social_api.services import CircuitBreaker, TrendingTopicsService, TrendingTopicsUnavailable
+
+
+class Upstream:
+    delay = 0.2
+    failing = False
+    hits = 0
+    lock = threading.Lock()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        with Upstream.lock:
+            Upstream.hits += 1
+        time.sleep(Upstream.delay)
+        if Upstream.failing:
+            self.send_response(500)
+            self.end_headers()
+            return
+        body = json.dumps({'data': {'children': [
+            {'data': {'title': f'Topic {i}', 'ups': 100 - i, 'num_comments': i,
+                      'subreddit': 'popular', 'url': f'https://example.com/{i}'}}
+            for i in range(25)
+        ]}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def timed_calls(service, callers):
+    def call():
+        started = time.perf_counter()
+        try:
+            service.get()
+            ok = True
+        except TrendingTopicsUnavailable:
+            ok = False
+        return ok, (time.perf_counter() - started) * 1000
+
+    with ThreadPoolExecutor(callers) as pool:
+        results = list(pool.map(lambda _: call(), range(callers)))
+    return sum(ok for ok, _ in results), max(ms for _, ms in results)
+
+
+def main():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}/r/popular/hot.json'
+    service = TrendingTopicsService(url, ttl=0.5, stale_ttl=1.5, timeout=2,
+                                    breaker=CircuitBreaker(threshold=3, backoff=60))
+    rows = []
+
+    def step(name, callers, expected_hits):
+        before = Upstream.hits
+        ok, slowest = timed_calls(service, callers)
+        time.sleep(Upstream.delay * 2)  # let any background refresh land
+        hits = Upstream.hits - before
+        rows.append({'step': name, 'callers': callers, 'succeeded': ok,
+                     'slowest_ms': round(slowest), 'upstream_hits': hits,
+                     'expected_hits': expected_hits, 'breaker': service.breaker.state})
+        return hits == expected_hits
+
+    checks = [step('cold cache, concurrent callers', 50, 1)]
+    checks.append(step('fresh cache', 50, 0))
+    time.sleep(0.6)
+    checks.append(step('stale: serve + one refresh', 50, 1))
+    Upstream.failing = True
+    time.sleep(1.6)
+    for attempt in range(3):
+        checks.append(step(f'upstream failing #{attempt + 1}', 5, 1))
+        time.sleep(0.1)
+    checks.append(step('circuit open', 50, 0))
+    server.shutdown()
+
+    print_table(rows)
+    if not all(checks):
+        sys.exit('Upstream hit counts differ from the expected values.')
+
+
+if __name__ == '__main__':
+    main()
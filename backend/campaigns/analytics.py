@@ -0,0 +1,308 @@
+import asyncio
+
+from django.db.models import Count, Q, Sum
+
+from .models import Campaign, DailyRollup, Metric
+
+
+METRIC = 'metric'
+CAMPAIGN = 'campaign'
+
+# How each source's columns are reached from the model a query starts from.
+# Campaign queries LEFT JOIN their metrics, so metric sums stay correct while
+# campaign counts must be distinct (a campaign repeats once per metric row).
+# DailyRollup rows carry the metric columns under the same names.
+SOURCE_PREFIXES = {
+    Campaign: {CAMPAIGN: '', METRIC: 'metrics__'},
+    Metric: {METRIC: '', CAMPAIGN: 'campaign__'},
+    DailyRollup: {METRIC: ''},
+}
+
+
+class KPI:
+    """
+    A dashboard figure, defined once and computable from any supported model.
+
+    Aggregate KPIs wrap ``aggregate(field)`` over ``source`` columns, optionally
+    restricted by ``filter`` and converted with ``output`` when given. Derived
+    KPIs pass the values of the KPIs named in ``depends`` to ``formula`` and
+    are rounded to two decimals.
+    """
+
+    def __init__(self, name, aggregate=None, field=None, source=METRIC, distinct=False,
+                 filter=None, output=None, formula=None, depends=()):
+        self.name = name
+        self.aggregate = aggregate
+        self.field = field
+        self.source = source
+        self.distinct = distinct
+        self.filter = filter or {}
+        self.output = output
+        self.formula = formula
+        self.depends = tuple(depends)
+
+    @property
+    def is_derived(self):
+        return self.formula is not None
+
+    def expression(self, model, dates=None):
+        """The aggregate over ``model`` rows; metric KPIs can be limited to a (first, last) ``dates`` range."""
+        prefixes = SOURCE_PREFIXES.get(model, {})
+        if self.source not in prefixes:
+            raise ValueError(f"KPI '{self.name}' cannot be computed from {model.__name__} rows.")
+        prefix = prefixes[self.source]
+        conditions = {prefix + key: value for key, value in self.filter.items()}
+        if dates is not None and self.source == METRIC:
+            conditions[prefix + 'date__range'] = dates
+        condition = Q(**conditions) if conditions else None
+        return self.aggregate(prefix + self.field, distinct=self.distinct, filter=condition)
+
+
+KPIS = {}
+
+
+def register(kpi):
+    KPIS[kpi.name] = kpi
+    return kpi
+
+
+def percent(numerator, denominator):
+    return (numerator / denominator * 100) if denominator > 0 else 0
+
+
+register(KPI('total_campaigns', Count, 'id', source=CAMPAIGN, distinct=True))
+register(KPI('active_campaigns', Count, 'id', source=CAMPAIGN, distinct=True, filter={'status': 'active'}))
+register(KPI('total_impressions', Sum, 'impressions'))
+register(KPI('total_clicks', Sum, 'clicks'))
+register(KPI('total_engagements', Sum, 'engagements'))
+register(KPI('total_conversions', Sum, 'conversions'))
+register(KPI('total_spend', Sum, 'spend', output=float))
+register(KPI('ctr', formula=percent, depends=('total_clicks', 'total_impressions')))
+register(KPI('engagement_rate', formula=percent, depends=('total_engagements', 'total_impressions')))
+register(KPI('conversion_rate', formula=percent, depends=('total_conversions', 'total_clicks')))
+register(KPI('cpc', formula=lambda spend, clicks: (spend / clicks) if clicks > 0 else 0,
+             depends=('total_spend', 'total_clicks')))
+register(KPI('roi', formula=lambda conversions, spend: ((conversions * 100 - spend) / spend * 100) if spend > 0 else 0,
+             depends=('total_conversions', 'total_spend')))
+
+
+# Response key -> KPI name for the analytics endpoints.
+DASHBOARD_KPIS = {
+    'total_campaigns': 'total_campaigns',
+    'active_campaigns': 'active_campaigns',
+    'total_impressions': 'total_impressions',
+    'total_clicks': 'total_clicks',
+    'total_engagements': 'total_engagements',
+    'total_conversions': 'total_conversions',
+    'total_spend': 'total_spend',
+    'avg_ctr': 'ctr',
+    'avg_engagement_rate': 'engagement_rate',
+    'conversion_rate': 'conversion_rate',
+    'roi': 'roi',
+}
+
+PLATFORM_KPIS = {
+    'campaigns_count': 'total_campaigns',
+    'total_impressions': 'total_impressions',
+    'total_clicks': 'total_clicks',
+    'total_engagements': 'total_engagements',
+    'total_conversions': 'total_conversions',
+    'total_spend': 'total_spend',
+    'ctr': 'ctr',
+    'engagement_rate': 'engagement_rate',
+    'conversion_rate': 'conversion_rate',
+    'cpc': 'cpc',
+}
+
+
+def resolve(names):
+    """Map response keys to KPIs; ``names`` is a list of KPI names or a key -> name mapping."""
+    if not isinstance(names, dict):
+        names = {name: name for name in names}
+    try:
+        return {key: KPIS[name] for key, name in names.items()}
+    except KeyError as exc:
+        raise ValueError(f'Unknown KPI {exc.args[0]!r}.') from None
+
+
+def aggregate_names(kpis):
+    """Names of the aggregate KPIs the given KPIs need, in dependency order."""
+    needed = []
+
+    def visit(kpi):
+        if kpi.is_derived:
+            for dependency in kpi.depends:
+                visit(KPIS[dependency])
+        elif kpi.name not in needed:
+            needed.append(kpi.name)
+
+    for kpi in kpis:
+        visit(kpi)
+    return needed
+
+
+def expressions(model, names):
+    return {name: KPIS[name].expression(model) for name in names}
+
+
+def evaluate(raw, requested):
+    """Turn raw aggregate values into the requested response keys."""
+    values = {name: value or 0 for name, value in raw.items()}
+
+    def value_of(kpi):
+        if kpi.name not in values:
+            values[kpi.name] = (
+                kpi.formula(*[value_of(KPIS[name]) for name in kpi.depends]) if kpi.is_derived else 0
+            )
+        return values[kpi.name]
+
+    result = {}
+    for key, kpi in requested.items():
+        value = value_of(kpi)
+        if kpi.is_derived:
+            value = round(float(value), 2)
+        elif kpi.output:
+            value = kpi.output(value)
+        result[key] = value
+    return result
+
+
+def period_alias(period, name):
+    return f'{period}_{name}'
+
+
+def period_values(raw, period):
+    """One period's raw aggregates under their KPI names; period-independent ones are shared."""
+    values = {name: value for name, value in raw.items() if name in KPIS}
+    values.update({name: raw[period_alias(period, name)] for name in KPIS if period_alias(period, name) in raw})
+    return values
+
+
+def _period_aggregates(source, names, periods):
+    """
+    Aggregate the metric KPIs once per period (``Sum(..., filter=Q(date__range=...))``),
+    so a single scan of ``source`` covers every period.
+    """
+    aggregates = {}
+    for name in names:
+        kpi = KPIS[name]
+        if kpi.source != METRIC:
+            aggregates[name] = kpi.expression(source.model)
+            continue
+        for period, dates in periods.items():
+            aggregates[period_alias(period, name)] = kpi.expression(source.model, dates)
+    if all(KPIS[name].source == METRIC for name in names):
+        # Only read the compared dates; the per-period filters split them.
+        prefix = SOURCE_PREFIXES[source.model][METRIC]
+        source = source.filter(**{
+            f'{prefix}date__gte': min(first for first, _ in periods.values()),
+            f'{prefix}date__lte': max(last for _, last in periods.values()),
+        })
+    return source, aggregates
+
+
+def _plan(queryset, names, metrics, periods=None):
+    """Resolve ``names`` and pair each source queryset with the aggregate expressions it computes."""
+    requested = resolve(names)
+    needed = aggregate_names(requested.values())
+    if metrics is None:
+        sources = [(queryset, needed)]
+    else:
+        sources = [
+            (queryset, [name for name in needed if KPIS[name].source != METRIC]),
+            (metrics, [name for name in needed if KPIS[name].source == METRIC]),
+        ]
+    plan = [
+        _period_aggregates(source, source_names, periods) if periods
+        else (source, expressions(source.model, source_names))
+        for source, source_names in sources if source_names
+    ]
+    return requested, plan
+
+
+def _grouped(source, group_by, aggregates):
+    return source.order_by().values(group_by).annotate(**aggregates)
+
+
+def change(current, previous):
+    """Absolute and percentage change of every KPI; the percentage is None from a zero."""
+    return {
+        key: {
+            'absolute': round(current[key] - previous[key], 2),
+            'percent': round((current[key] - previous[key]) / abs(previous[key]) * 100, 2)
+            if previous[key] else None,
+        }
+        for key in current
+    }
+
+
+def compare(raw, requested, periods):
+    """Evaluate raw period aggregates into ``{period: kpis, ..., 'change': ...}``."""
+    result = {period: evaluate(period_values(raw, period), requested) for period in periods}
+    result['change'] = change(result['current'], result['previous'])
+    return result
+
+
+def _merge_groups(group_by, row_sets, requested, periods=None):
+    grouped = {}
+    for rows in row_sets:
+        for row in rows:
+            grouped.setdefault(row.pop(group_by), {}).update(row)
+    return [
+        {group_by: key, **(compare(grouped[key], requested, periods) if periods
+                           else evaluate(grouped[key], requested))}
+        for key in sorted(grouped, key=lambda key: (key is None, key))
+    ]
+
+
+def aggregate_kpis(queryset, names, metrics=None, periods=None):
+    """
+    Compute any set of KPIs over ``queryset`` with a single aggregate() call.
+
+    When ``metrics`` is given (e.g. a DailyRollup queryset), metric KPIs are
+    aggregated from it instead, at the cost of one extra query. ``periods``
+    ({'current': (first, last), 'previous': (first, last)}) computes the
+    metric KPIs for both date ranges in the same query and returns
+    ``{'current': kpis, 'previous': kpis, 'change': ...}``.
+    """
+    requested, plan = _plan(queryset, names, metrics, periods)
+    raw = {}
+    for source, aggregates in plan:
+        raw.update(source.aggregate(**aggregates))
+    return compare(raw, requested, periods) if periods else evaluate(raw, requested)
+
+
+def group_kpis(queryset, group_by, names, metrics=None, periods=None):
+    """
+    KPIs for every distinct value of ``group_by`` in one grouped query.
+
+    ``group_by`` is any field reachable from the queryset's model, e.g.
+    ``'platform'``, ``'status'`` or ``'metrics__date'`` on Campaign. With
+    ``metrics``, metric KPIs come from that queryset grouped by the same
+    field and the two result sets are merged. ``periods`` works as in
+    aggregate_kpis(), per group.
+    """
+    requested, plan = _plan(queryset, names, metrics, periods)
+    row_sets = [_grouped(source, group_by, aggregates) for source, aggregates in plan]
+    return _merge_groups(group_by, row_sets, requested, periods)
+
+
+async def aaggregate_kpis(queryset, names, metrics=None, periods=None):
+    """Async aggregate_kpis(); the per-source queries are awaited together."""
+    requested, plan = _plan(queryset, names, metrics, periods)
+    results = await asyncio.gather(*(source.aaggregate(**aggregates) for source, aggregates in plan))
+    raw = {}
+    for result in results:
+        raw.update(result)
+    return compare(raw, requested, periods) if periods else evaluate(raw, requested)
+
+
+async def agroup_kpis(queryset, group_by, names, metrics=None, periods=None):
+    """Async group_kpis(); the per-source queries are awaited together."""
+    requested, plan = _plan(queryset, names, metrics, periods)
+
+    async def fetch(source, aggregates):
+        return [row async for row in _grouped(source, group_by, aggregates)]
+
+    row_sets = await asyncio.gather(*(fetch(source, aggregates) for source, aggregates in plan))
+    return _merge_groups(group_by, row_sets, requested, periods)
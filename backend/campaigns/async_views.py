@@ -0,0 +1,79 @@
+"""
+Native async variants of the read-only analytics endpoints, for ASGI servers.
+
+They return the same data as the CampaignViewSet actions of the same name,
+share their response cache and run their independent queries concurrently
+with asyncio.gather through Django's async ORM.
+"""
+import functools
+
+from analytics_project.routers import use_replica
+from django.http import JsonResponse
+from rest_framework.exceptions import ValidationError
+
+from .analytics import DASHBOARD_KPIS, PLATFORM_KPIS, aaggregate_kpis, agroup_kpis
+from .caching import cached_async_view
+from .filtering import (
+    DEFAULT_LIST_METRICS_LIMIT, filter_metrics, filter_rollups, kpi_rollups, metrics_prefetch, metrics_window,
+    parse_date_range,
+)
+from .models import Campaign, DailyRollup, Metric
+from .params import parse_bool
+from .serializers import CampaignSerializer
+from .timeseries import atimeseries
+
+
+def async_get(view):
+    """Allow only GET and turn parameter validation errors into 400 responses."""
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+        try:
+            return await view(request, *args, **kwargs)
+        except ValidationError as exc:
+            return JsonResponse(exc.detail, status=400)
+    return wrapper
+
+
+@async_get
+@use_replica
+@cached_async_view('campaign:active')
+async def active(request):
+    # Same payload as CampaignViewSet.active, whose cache entries this view shares.
+    include_metrics = parse_bool(request.GET, 'include_metrics')
+    campaigns = Campaign.objects.filter(status='active')
+    if include_metrics:
+        campaigns = campaigns.prefetch_related(
+            metrics_prefetch(*metrics_window(request.GET, DEFAULT_LIST_METRICS_LIMIT)))
+    campaigns = [campaign async for campaign in campaigns]
+    return CampaignSerializer(campaigns, many=True, context={'include_metrics': include_metrics}).data
+
+
+@async_get
+@use_replica
+@cached_async_view('campaign:dashboard_stats')
+async def dashboard_stats(request):
+    rollups, periods = kpi_rollups(request.GET)
+    return await aaggregate_kpis(Campaign.objects.all(), DASHBOARD_KPIS, metrics=rollups, periods=periods)
+
+
+@async_get
+@use_replica
+@cached_async_view('campaign:platform_performance')
+async def platform_performance(request):
+    rollups, periods = kpi_rollups(request.GET)
+    return await agroup_kpis(Campaign.objects.all(), 'platform', PLATFORM_KPIS, metrics=rollups, periods=periods)
+
+
+@async_get
+@use_replica
+@cached_async_view('campaign:timeseries')
+async def timeseries(request):
+    params = request.GET
+    date_from, date_to = parse_date_range(params)
+    if params.get('status') or params.get('campaign'):
+        rows = filter_metrics(Metric.objects.all(), params)
+    else:
+        rows = filter_rollups(DailyRollup.objects.all(), params)
+    return await atimeseries(rows, params.get('interval', 'day'), date_from, date_to)
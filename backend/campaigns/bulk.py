@@ -0,0 +1,140 @@
+"""
+Bulk campaign actions.
+
+``set_status`` and ``duplicate`` act on many campaigns at once, chosen by id
+or by the ``platform``/``status`` filters, inside one transaction. The
+campaigns are locked in id order, then changed with a single ``UPDATE`` or
+``bulk_create`` (plus batched ``bulk_create`` calls for copied metrics), and
+every requested id gets an outcome. Both writes bypass the model signals, so
+the rollups, totals and response cache are maintained here.
+"""
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from . import caching, rollups, totals
+from .filtering import filter_campaigns
+from .models import Campaign, Metric
+from .transitions import NOT_ALLOWED, TRANSITIONS, UNCHANGED, UPDATED
+
+
+MAX_CAMPAIGNS = 1000
+METRIC_BATCH_SIZE = 5000
+# Campaigns whose metrics are read into memory at once when copying them.
+METRIC_CAMPAIGN_CHUNK = 50
+
+DUPLICATED = 'duplicated'
+NOT_FOUND = 'not_found'
+
+COPIED_FIELDS = ('name', 'description', 'platform', 'status', 'start_date', 'end_date', 'budget')
+COPY_SUFFIX = ' (Copy)'
+NAME_LENGTH = Campaign._meta.get_field('name').max_length
+
+
+def _unique(ids):
+    """``ids`` without repeats, in request order: a repeated id is one campaign and one outcome."""
+    return None if ids is None else list(dict.fromkeys(ids))
+
+
+def _locked(ids=None, filters=None):
+    """Lock the selected campaigns; returns their rows in id order."""
+    campaigns = Campaign.objects.select_for_update().order_by('pk')
+    if ids is not None:
+        return list(campaigns.filter(pk__in=ids).values('pk', *COPIED_FIELDS))
+    rows = list(filter_campaigns(campaigns, filters or {}).values('pk', *COPIED_FIELDS)[:MAX_CAMPAIGNS + 1])
+    if len(rows) > MAX_CAMPAIGNS:
+        raise ValidationError({'filter': f'Matches more than {MAX_CAMPAIGNS} campaigns; narrow it down.'})
+    return rows
+
+
+def _report(ids, rows, outcome, outcomes):
+    """Per-id results in request order (id order for filters) and a count per outcome."""
+    found = {row['pk']: row for row in rows}
+    results = [
+        {'id': pk, **outcome(found[pk])} if pk in found else {'id': pk, 'outcome': NOT_FOUND}
+        for pk in (ids if ids is not None else found)
+    ]
+    counts = dict.fromkeys(outcomes, 0)
+    for result in results:
+        counts[result['outcome']] += 1
+    return counts, results
+
+
+def set_status(status, ids=None, filters=None):
+    """
+    Set ``status`` on the selected campaigns with one UPDATE, following the
+    pause/resume rules of campaigns.transitions: campaigns already in that
+    status are left alone, and those it cannot be entered from are
+    ``not_allowed``. Returns (counts, results).
+    """
+    sources = TRANSITIONS[status]
+    ids = _unique(ids)
+    with transaction.atomic():
+        rows = _locked(ids, filters)
+        changing = [row['pk'] for row in rows if row['status'] in sources]
+        if changing:
+            # QuerySet.update() skips auto_now, so updated_at is set here.
+            Campaign.objects.filter(pk__in=changing, status__in=sources).update(
+                status=status, updated_at=timezone.now()
+            )
+            caching.invalidate()
+    changing = set(changing)
+
+    def outcome(row):
+        if row['pk'] in changing:
+            return {'outcome': UPDATED}
+        return {'outcome': UNCHANGED if row['status'] == status else NOT_ALLOWED}
+
+    return _report(ids, rows, outcome, (UPDATED, UNCHANGED, NOT_ALLOWED, NOT_FOUND))
+
+
+def _copy_metrics(copies):
+    """Copy the metric rows of {source id: copy id}; returns the rows copied and their buckets."""
+    copied, buckets = 0, set()
+    sources = sorted(copies)
+    for start in range(0, len(sources), METRIC_CAMPAIGN_CHUNK):
+        rows = (
+            Metric.objects.filter(campaign_id__in=sources[start:start + METRIC_CAMPAIGN_CHUNK])
+            .order_by().values('campaign_id', 'campaign__platform', 'date', *totals.TOTAL_FIELDS)
+        )
+        metrics = []
+        for row in rows:
+            buckets.add((row['date'], row['campaign__platform']))
+            metrics.append(Metric(
+                campaign_id=copies[row['campaign_id']], date=row['date'],
+                **{field: row[field] for field in totals.TOTAL_FIELDS}
+            ))
+        Metric.objects.bulk_create(metrics, batch_size=METRIC_BATCH_SIZE)
+        copied += len(metrics)
+    return copied, buckets
+
+
+def duplicate(ids=None, filters=None, include_metrics=False):
+    """
+    Copy the selected campaigns with one bulk_create, and with
+    ``include_metrics`` their metric rows too. Returns (counts, results),
+    the counts including ``metrics_copied``.
+    """
+    ids = _unique(ids)
+    with transaction.atomic():
+        rows = _locked(ids, filters)
+        # The copies start without metrics, so their totals keep the zero defaults.
+        copies = []
+        for row in rows:
+            copy = Campaign(**{field: row[field] for field in COPIED_FIELDS})
+            copy.name = f'{copy.name[:NAME_LENGTH - len(COPY_SUFFIX)]}{COPY_SUFFIX}'
+            copies.append(copy)
+        Campaign.objects.bulk_create(copies)
+        copy_ids = {row['pk']: copy.pk for row, copy in zip(rows, copies)}
+        copied = 0
+        if include_metrics and copy_ids:
+            copied, buckets = _copy_metrics(copy_ids)
+            # bulk_create bypasses the signal handlers that maintain the rollups, totals and caches.
+            rollups.refresh(buckets)
+            totals.reconcile(copy_ids.values())
+        if copy_ids:
+            caching.invalidate()
+    counts, results = _report(ids, rows, lambda row: {'outcome': DUPLICATED, 'copy_id': copy_ids[row['pk']]},
+                              (DUPLICATED, NOT_FOUND))
+    counts['metrics_copied'] = copied
+    return counts, results
@@ -0,0 +1,140 @@
+"""
+Response caching for the read-heavy analytics actions.
+
+Cached responses are keyed by action, URL kwargs and query parameters plus a
+data version stamp. Any Campaign or Metric write bumps the stamp once the
+transaction commits, so earlier entries are never served again and simply
+expire. The stamp also forms the ETag, letting clients revalidate with
+``If-None-Match`` and get a 304 without the view running.
+
+Works with any Django cache backend; with several worker processes use a
+shared one (Redis, Memcached, database) so all workers see the same stamp.
+"""
+import functools
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponseBase, HttpResponseNotModified, JsonResponse
+from django.utils.http import parse_etags
+from rest_framework.response import Response
+
+
+VERSION_KEY = 'campaigns:data-version'
+
+_pending = threading.local()
+
+
+def data_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock so a lost stamp never reuses an older version.
+        cache.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        data_version()
+
+
+def _flush():
+    if getattr(_pending, 'dirty', False):
+        _pending.dirty = False
+        bump_version()
+
+
+def invalidate():
+    """Bump the data version when the current transaction commits (once per transaction)."""
+    _pending.dirty = True
+    transaction.on_commit(_flush)
+
+
+async def adata_version():
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+def cache_key(name, params, kwargs):
+    params = sorted((key, params.getlist(key)) for key in params)
+    raw = f'{name}:{sorted(kwargs.items())}:{params}'
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def _etag(version, key):
+    return f'"{version}-{key[:16]}"'
+
+
+def _not_modified(request, etag):
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+    return None
+
+
+def _finish(response, etag, hit):
+    response['X-Cache'] = 'HIT' if hit else 'MISS'
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def cached_action(func):
+    """Cache a viewset action's successful responses until the data version changes."""
+    @functools.wraps(func)
+    def wrapper(self, request, *args, **kwargs):
+        version = data_version()
+        key = cache_key(f'{self.basename}:{self.action}', request.query_params, kwargs)
+        etag = _etag(version, key)
+        not_modified = _not_modified(request, etag)
+        if not_modified:
+            return not_modified
+
+        data = cache.get(f'campaigns:response:{key}:{version}')
+        if data is not None:
+            return _finish(Response(data), etag, hit=True)
+        response = func(self, request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        cache.set(f'campaigns:response:{key}:{version}', response.data, settings.ANALYTICS_CACHE_TIMEOUT)
+        return _finish(response, etag, hit=False)
+    return wrapper
+
+
+def cached_async_view(name):
+    """
+    cached_action() for async function views returning JSON-serializable data.
+
+    The view returns plain data (or an HttpResponse, which is passed through
+    uncached); the wrapper builds the JsonResponse.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            version = await adata_version()
+            key = cache_key(name, request.GET, kwargs)
+            etag = _etag(version, key)
+            not_modified = _not_modified(request, etag)
+            if not_modified:
+                return not_modified
+
+            data = await cache.aget(f'campaigns:response:{key}:{version}')
+            hit = data is not None
+            if not hit:
+                data = await view(request, *args, **kwargs)
+                if isinstance(data, HttpResponseBase):
+                    return data
+                await cache.aset(f'campaigns:response:{key}:{version}', data, settings.ANALYTICS_CACHE_TIMEOUT)
+            return _finish(JsonResponse(data, safe=False), etag, hit)
+        return wrapper
+    return decorator
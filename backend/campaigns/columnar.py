@@ -0,0 +1,408 @@
+"""
+Columnar in-memory analytics over Metric.
+
+MetricColumns holds every metric row as NumPy arrays: int32 counters, date
+ordinals (days since 1970-01-01) and campaign positions, plus spend as int64
+cents. Platform and status are categorical codes per campaign, looked up
+through the campaign position, so pausing a campaign never rewrites the
+metric columns. A query is answered by vectorized reductions: filters become
+boolean masks, the group-by dimensions are folded into one integer group
+code and every KPI input is summed per group with ``np.bincount``.
+
+Each process keeps one copy, brought up to date before a query whenever the
+data version stamp of campaigns.caching has moved: metric rows with a higher
+id than any loaded row are appended and the campaign codes are reloaded.
+Edited and deleted metric rows cannot be applied that way, so they bump a
+separate stamp (``mark_rewritten``) that makes the next refresh reload
+everything, as does ``COLUMNAR_MAX_AGE``, which also bounds how long a row
+committed out of id order can go unseen.
+
+NumPy is optional and only imported on first use; without it, or with
+``COLUMNAR_ANALYTICS`` off, queries run as the equivalent ORM aggregation.
+"""
+import importlib
+import math
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import BigIntegerField, F, Sum
+from django.db.models.functions import Cast, Round, TruncMonth, TruncWeek
+from rest_framework.exceptions import ValidationError
+
+from . import caching
+from .analytics import KPIS, METRIC, aggregate_names, evaluate, expressions, resolve
+from .filtering import PLATFORMS, STATUSES, parse_choices, parse_date_range
+from .models import Campaign, Metric
+
+
+DIMENSIONS = ('platform', 'status', 'campaign', 'date', 'week', 'month')
+COUNTER_FIELDS = ('impressions', 'clicks', 'engagements', 'conversions')
+# Categorical codes follow the sorted values, so groups come out in the same order as ORDER BY.
+PLATFORM_CODES = sorted(PLATFORMS)
+STATUS_CODES = sorted(STATUSES)
+
+MAX_GROUPS = 10_000
+LOAD_CHUNK = 50_000
+# Group code ranges up to this size are counted with a dense bincount; larger ones are sorted first.
+DENSE_GROUPS = 1 << 22
+EPOCH = date(1970, 1, 1)
+REWRITE_KEY = 'campaigns:columnar-rewrites'
+
+_numpy = None
+_columns = None
+_lock = threading.Lock()
+_pending = threading.local()
+
+
+def numpy():
+    """NumPy, imported on first use; None when it is not installed."""
+    global _numpy
+    if _numpy is None:
+        try:
+            _numpy = importlib.import_module('numpy')
+        except ImportError:
+            return None
+    return _numpy
+
+
+def _metric_sums_only(kpi):
+    return all(
+        KPIS[name].source == METRIC and KPIS[name].aggregate is Sum and not KPIS[name].filter
+        for name in aggregate_names([kpi])
+    )
+
+
+# KPIs computable from per-group sums of metric columns.
+QUERY_KPIS = [name for name, kpi in KPIS.items() if _metric_sums_only(kpi)]
+
+
+def _flush():
+    if getattr(_pending, 'dirty', False):
+        _pending.dirty = False
+        try:
+            cache.incr(REWRITE_KEY)
+        except ValueError:
+            cache.add(REWRITE_KEY, int(time.time() * 1000), timeout=None)
+
+
+def mark_rewritten():
+    """Make every process reload its columns once the current transaction commits."""
+    _pending.dirty = True
+    transaction.on_commit(_flush)
+
+
+def parse_query(params):
+    """The group-by dimensions, KPIs and filters of a query request."""
+    group_by = list(dict.fromkeys(name.strip() for name in params.get('group_by', '').split(',') if name.strip()))
+    unknown = [name for name in group_by if name not in DIMENSIONS]
+    if unknown:
+        raise ValidationError({'group_by': f"Unknown dimension(s) {', '.join(unknown)}; "
+                                           f"expected {', '.join(DIMENSIONS)}."})
+    kpis = list(dict.fromkeys(name.strip() for name in params.get('kpis', '').split(',') if name.strip()))
+    unknown = [name for name in kpis if name not in QUERY_KPIS]
+    if unknown:
+        raise ValidationError({'kpis': f"Unknown KPI(s) {', '.join(unknown)}; expected {', '.join(QUERY_KPIS)}."})
+    campaign = params.get('campaign')
+    if campaign and not campaign.isdigit():
+        raise ValidationError({'campaign': 'Enter a campaign id.'})
+    date_from, date_to = parse_date_range(params)
+    return {
+        'group_by': group_by,
+        'kpis': kpis or QUERY_KPIS,
+        'platforms': parse_choices(params, 'platform', PLATFORMS),
+        'statuses': parse_choices(params, 'status', STATUSES),
+        'campaign': int(campaign) if campaign else None,
+        'date_from': date_from,
+        'date_to': date_to,
+    }
+
+
+def too_many_groups():
+    return ValidationError({'group_by': f'More than {MAX_GROUPS} groups; add filters or coarser dimensions.'})
+
+
+ORM_DIMENSIONS = {
+    'platform': F('campaign__platform'),
+    'status': F('campaign__status'),
+    'campaign': F('campaign_id'),
+    'date': F('date'),
+    'week': TruncWeek('date'),
+    'month': TruncMonth('date'),
+}
+
+
+def orm_query(group_by, kpis, platforms=(), statuses=(), campaign=None, date_from=None, date_to=None):
+    """The query as one grouped aggregation over Metric in the database."""
+    metrics = Metric.objects.all()
+    if platforms:
+        metrics = metrics.filter(campaign__platform__in=platforms)
+    if statuses:
+        metrics = metrics.filter(campaign__status__in=statuses)
+    if campaign is not None:
+        metrics = metrics.filter(campaign_id=campaign)
+    if date_from:
+        metrics = metrics.filter(date__gte=date_from)
+    if date_to:
+        metrics = metrics.filter(date__lte=date_to)
+    requested = resolve(kpis)
+    aggregates = expressions(Metric, aggregate_names(requested.values()))
+    if not group_by:
+        return [evaluate(metrics.aggregate(**aggregates), requested)]
+    keys = {f'group_{name}': ORM_DIMENSIONS[name] for name in group_by}
+    rows = list(
+        metrics.order_by().values(**keys).annotate(**aggregates).order_by(*keys)[:MAX_GROUPS + 1]
+    )
+    if len(rows) > MAX_GROUPS:
+        raise too_many_groups()
+    return [
+        {**{name: row.pop(f'group_{name}') for name in group_by}, **evaluate(row, requested)}
+        for row in rows
+    ]
+
+
+def epoch_day(day):
+    return (day - EPOCH).days
+
+
+def from_epoch_day(value):
+    return EPOCH + timedelta(days=int(value))
+
+
+class Frame:
+    """A consistent view of the columns, queried without holding the refresh lock."""
+
+    def __init__(self, columns, campaign_ids, campaign_platform, campaign_status):
+        self.columns = columns
+        self.campaign_ids = campaign_ids
+        self.campaign_platform = campaign_platform
+        self.campaign_status = campaign_status
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns.values())
+
+    def _dimension(self, name, columns):
+        """Integer codes of a dimension, their range and a function turning a code back into a value."""
+        np = numpy()
+        if name == 'platform':
+            return self.campaign_platform[columns['campaign']], len(PLATFORM_CODES), PLATFORM_CODES.__getitem__
+        if name == 'status':
+            return self.campaign_status[columns['campaign']], len(STATUS_CODES), STATUS_CODES.__getitem__
+        if name == 'campaign':
+            return columns['campaign'], len(self.campaign_ids), lambda code: int(self.campaign_ids[code])
+        days = columns['day'].astype(np.int64)
+        if name == 'week':
+            # 1970-01-05 was a Monday.
+            days = days - (days - 4) % 7
+        elif name == 'month':
+            days = days.astype('datetime64[D]').astype('datetime64[M]').astype('datetime64[D]').astype(np.int64)
+        first = int(days.min()) if len(days) else 0
+        span = int(days.max()) - first + 1 if len(days) else 1
+        return days - first, span, lambda code: from_epoch_day(first + code)
+
+    def query(self, group_by, kpis, platforms=(), statuses=(), campaign=None, date_from=None, date_to=None):
+        """Same arguments and rows as orm_query()."""
+        np = numpy()
+        requested = resolve(kpis)
+        fields = [KPIS[name].field for name in aggregate_names(requested.values())]
+        columns = self.columns
+        mask = None
+        if platforms or statuses or campaign is not None:
+            allowed = np.ones(len(self.campaign_ids), dtype=bool)
+            if platforms:
+                allowed &= np.isin(self.campaign_platform, [PLATFORM_CODES.index(value) for value in platforms])
+            if statuses:
+                allowed &= np.isin(self.campaign_status, [STATUS_CODES.index(value) for value in statuses])
+            if campaign is not None:
+                allowed &= self.campaign_ids == campaign
+            mask = allowed[columns['campaign']]
+        for bound, keep in ((date_from, np.greater_equal), (date_to, np.less_equal)):
+            if bound:
+                condition = keep(columns['day'], epoch_day(bound))
+                mask = condition if mask is None else mask & condition
+        if mask is not None:
+            selected = np.flatnonzero(mask)
+            columns = {name: columns[name][selected] for name in ('campaign', 'day', *fields)}
+
+        if not group_by:
+            raw = {name: columns[KPIS[name].field].sum(dtype=np.int64) for name in aggregate_names(requested.values())}
+            return [evaluate(self._raw(raw), requested)]
+
+        group, radices, decoders = np.zeros(len(columns['day']), dtype=np.int64), [], []
+        for name in group_by:
+            codes, radix, decode = self._dimension(name, columns)
+            group = group * radix + codes
+            radices.append(radix)
+            decoders.append(decode)
+        size = math.prod(radices)
+        if size <= DENSE_GROUPS:
+            present = np.flatnonzero(np.bincount(group, minlength=size))
+            index, positions = group, present
+        else:
+            present, index = np.unique(group, return_inverse=True)
+            size, positions = len(present), np.arange(len(present))
+        if len(present) > MAX_GROUPS:
+            raise too_many_groups()
+        # float64 sums are exact up to 2**53, far beyond any realistic per-group total.
+        sums = {
+            field: np.bincount(index, weights=columns[field], minlength=size)[positions]
+            for field in fields
+        }
+
+        rows = []
+        for number, code in enumerate(present.tolist()):
+            keys = []
+            for radix, decode in zip(reversed(radices), reversed(decoders)):
+                code, part = divmod(code, radix)
+                keys.append(decode(part))
+            raw = {name: round(sums[KPIS[name].field][number]) for name in aggregate_names(requested.values())}
+            rows.append({**dict(zip(group_by, reversed(keys))), **evaluate(self._raw(raw), requested)})
+        return rows
+
+    @staticmethod
+    def _raw(raw):
+        # Spend is held in cents; KPIs see the same Decimal the database sum returns.
+        return {
+            name: Decimal(int(value)).scaleb(-2) if KPIS[name].field == 'spend' else int(value)
+            for name, value in raw.items()
+        }
+
+
+class MetricColumns:
+    """The growable column arrays and the bookkeeping needed to refresh them."""
+
+    DTYPES = {
+        'campaign': 'int32', 'day': 'int32',
+        **{field: 'int32' for field in COUNTER_FIELDS},
+        'spend': 'int64',
+    }
+
+    def __init__(self):
+        self.version = None
+        self.rewrites = None
+        self.loaded_at = 0
+        self.reset()
+
+    def reset(self):
+        np = numpy()
+        self.size = self.capacity = self.watermark = 0
+        self.columns = {name: np.empty(0, dtype=dtype) for name, dtype in self.DTYPES.items()}
+        self.campaign_ids = np.empty(0, dtype=np.int64)
+        self.campaign_platform = self.campaign_status = np.empty(0, dtype=np.int8)
+
+    def load(self):
+        """Read every campaign and metric row into fresh columns."""
+        self.reset()
+        self._load_campaigns()
+        self._append(Metric.objects.all())
+        self.loaded_at = time.monotonic()
+
+    def refresh(self):
+        """Bring the columns up to date with the database if its data version moved."""
+        version = caching.data_version()
+        if version is not None and version == self.version:
+            return
+        rewrites = cache.get(REWRITE_KEY)
+        if not self.loaded_at or rewrites != self.rewrites or \
+                time.monotonic() - self.loaded_at > settings.COLUMNAR_MAX_AGE or \
+                not self._load_campaigns():
+            self.load()
+        else:
+            self._append(Metric.objects.filter(pk__gt=self.watermark))
+        self.version, self.rewrites = version, rewrites
+
+    def frame(self):
+        return Frame(
+            {name: column[:self.size] for name, column in self.columns.items()},
+            self.campaign_ids, self.campaign_platform, self.campaign_status,
+        )
+
+    def _load_campaigns(self):
+        """Reload the campaign codes; False if loaded campaigns are gone (positions would shift)."""
+        np = numpy()
+        rows = list(Campaign.objects.order_by('pk').values_list('pk', 'platform', 'status'))
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        known = len(self.campaign_ids)
+        if known and not np.array_equal(ids[:known], self.campaign_ids):
+            return False
+        platforms = {value: code for code, value in enumerate(PLATFORM_CODES)}
+        statuses = {value: code for code, value in enumerate(STATUS_CODES)}
+        self.campaign_ids = ids
+        self.campaign_platform = np.array([platforms[row[1]] for row in rows], dtype=np.int8)
+        self.campaign_status = np.array([statuses[row[2]] for row in rows], dtype=np.int8)
+        return True
+
+    def _positions(self, campaign_ids):
+        """Campaign positions of metric rows; -1 where the campaign is not loaded."""
+        np = numpy()
+        positions = np.searchsorted(self.campaign_ids, campaign_ids)
+        clipped = np.minimum(positions, max(len(self.campaign_ids) - 1, 0))
+        found = (positions < len(self.campaign_ids)) & (self.campaign_ids[clipped] == campaign_ids) \
+            if len(self.campaign_ids) else np.zeros(len(campaign_ids), dtype=bool)
+        return np.where(found, positions, -1)
+
+    def _append(self, metrics):
+        np = numpy()
+        dtype = [('id', 'int64'), ('campaign_id', 'int64'), ('date', 'datetime64[D]')] + \
+            [(field, 'int32') for field in COUNTER_FIELDS] + [('spend', 'int64')]
+        rows = metrics.order_by('pk').values_list(
+            'pk', 'campaign_id', 'date', *COUNTER_FIELDS,
+            Cast(Round(F('spend') * 100), BigIntegerField()),
+        ).iterator(chunk_size=LOAD_CHUNK)
+        while chunk := list(islice(rows, LOAD_CHUNK)):
+            block = np.array(chunk, dtype=dtype)
+            self.watermark = int(block['id'][-1])
+            positions = self._positions(block['campaign_id'])
+            if (positions < 0).any():
+                # Campaigns created after the codes were loaded; rows of deleted ones are dropped.
+                self._load_campaigns()
+                positions = self._positions(block['campaign_id'])
+                keep = positions >= 0
+                block, positions = block[keep], positions[keep]
+            self._extend({
+                'campaign': positions,
+                'day': block['date'].astype(np.int64),
+                **{field: block[field] for field in COUNTER_FIELDS},
+                'spend': block['spend'],
+            })
+
+    def _extend(self, values):
+        np = numpy()
+        end = self.size + len(values['day'])
+        if end > self.capacity:
+            # Grow geometrically so incremental refreshes copy the columns rarely.
+            self.capacity = max(end, self.capacity * 2, LOAD_CHUNK)
+            for name, column in self.columns.items():
+                grown = np.empty(self.capacity, dtype=column.dtype)
+                grown[:self.size] = column[:self.size]
+                self.columns[name] = grown
+        for name, column in self.columns.items():
+            column[self.size:end] = values[name]
+        self.size = end
+
+
+def frame():
+    """A refreshed Frame of this process's columns, or None without NumPy."""
+    global _columns
+    if numpy() is None:
+        return None
+    with _lock:
+        if _columns is None:
+            _columns = MetricColumns()
+        _columns.refresh()
+        return _columns.frame()
+
+
+def run_query(params):
+    """Answer a query request from the columns, or from the database without NumPy."""
+    spec = parse_query(params)
+    columns = frame() if settings.COLUMNAR_ANALYTICS else None
+    if columns is None:
+        return orm_query(**spec)
+    return columns.query(**spec)
@@ -0,0 +1,118 @@
+"""
+Seeded synthetic campaigns and daily metrics for development and benchmarks.
+
+Every platform has its own traffic profile (reach, CTR, engagement, CPC and
+conversion rate) and daily traffic follows a weekly cycle with noise, so the
+analytics endpoints see realistic distributions. Campaigns and metrics are
+written with bulk inserts in batches, and the same seed always produces the
+same data.
+"""
+import math
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from . import caching, rollups, totals
+from .filtering import PLATFORMS
+from .models import Campaign, Metric
+
+
+# platform: (median daily impressions, CTR, engagement rate, conversion rate, CPC)
+PROFILES = {
+    'facebook': (40000, 0.012, 0.035, 0.060, Decimal('0.85')),
+    'instagram': (55000, 0.009, 0.055, 0.040, Decimal('1.10')),
+    'twitter': (25000, 0.015, 0.025, 0.030, Decimal('0.60')),
+    'linkedin': (8000, 0.006, 0.020, 0.090, Decimal('4.50')),
+    'tiktok': (90000, 0.011, 0.070, 0.025, Decimal('0.45')),
+}
+# Monday .. Sunday
+WEEKDAY_FACTORS = (1.0, 1.05, 1.05, 1.0, 0.95, 0.8, 0.75)
+NAME_WORDS = [
+    'Summer', 'Winter', 'Holiday', 'Launch', 'Brand', 'Awareness', 'Flash', 'Sale', 'Retargeting',
+    'Video', 'Influencer', 'Giveaway', 'Spring', 'Clearance', 'Webinar', 'App', 'Install', 'Loyalty',
+]
+CENT = Decimal('0.01')
+
+
+def _campaign(rng, number, platform, first_day, last_day, days):
+    """An unsaved campaign with its running dates and status."""
+    name = f"{' '.join(rng.sample(NAME_WORDS, 2))} {platform.title()} {number}"
+    if rng.random() < 0.05:
+        # Drafts start after the generated window and have no metrics yet.
+        start = last_day + timedelta(days=rng.randint(1, 30))
+        return Campaign(name=name, platform=platform, status='draft', start_date=start,
+                        budget=Decimal(rng.randint(10, 500) * 100))
+    start = first_day + timedelta(days=rng.randint(0, max(0, days // 3)))
+    end = start + timedelta(days=rng.randint(max(1, days // 3), max(1, days)) - 1)
+    if end < last_day:
+        status = 'completed'
+    else:
+        end = None if rng.random() < 0.5 else end
+        status = 'paused' if rng.random() < 0.2 else 'active'
+    return Campaign(name=name, platform=platform, status=status, start_date=start, end_date=end,
+                    description=f'{platform.title()} campaign generated with seed data.',
+                    budget=Decimal(rng.randint(10, 500) * 100))
+
+
+def _metrics(rng, campaign, last_day):
+    """Daily metric rows for the days the campaign ran inside the window."""
+    reach, ctr, engagement, conversion, cpc = PROFILES[campaign.platform]
+    scale = reach * math.exp(rng.gauss(0, 0.6))
+    rows = []
+    day = campaign.start_date
+    end = min(campaign.end_date or last_day, last_day)
+    while day <= end:
+        impressions = int(scale * WEEKDAY_FACTORS[day.weekday()] * rng.uniform(0.8, 1.2))
+        clicks = int(impressions * ctr * rng.uniform(0.7, 1.3))
+        rows.append(Metric(
+            campaign=campaign, date=day, impressions=impressions, clicks=clicks,
+            engagements=int(impressions * engagement * rng.uniform(0.7, 1.3)),
+            conversions=int(clicks * conversion * rng.uniform(0.5, 1.5)),
+            spend=(clicks * cpc * Decimal(str(round(rng.uniform(0.85, 1.15), 3)))).quantize(CENT),
+        ))
+        day += timedelta(days=1)
+    return rows
+
+
+def generate(campaigns=100, days=90, platforms=None, seed=0, end_date=None, batch_size=5000):
+    """
+    Insert ``campaigns`` campaigns spread over ``platforms`` with up to
+    ``days`` days of metrics ending at ``end_date`` (default today).
+
+    Campaign totals are reconciled with their metrics, the daily rollups
+    are rebuilt and cached responses invalidated. Returns the row counts.
+    """
+    rng = random.Random(seed)
+    platforms = platforms or PLATFORMS
+    last_day = end_date or date.today()
+    first_day = last_day - timedelta(days=days - 1)
+    created = {'campaigns': 0, 'metrics': 0}
+
+    pending = []
+    pending_rows = 0
+
+    def flush():
+        Campaign.objects.bulk_create([campaign for campaign, _ in pending], batch_size=batch_size)
+        metrics = [metric for _, rows in pending for metric in rows]
+        Metric.objects.bulk_create(metrics, batch_size=batch_size)
+        created['campaigns'] += len(pending)
+        created['metrics'] += len(metrics)
+        pending.clear()
+
+    for number in range(1, campaigns + 1):
+        campaign = _campaign(rng, number, platforms[(number - 1) % len(platforms)], first_day, last_day, days)
+        rows = _metrics(rng, campaign, last_day)
+        pending.append((campaign, rows))
+        pending_rows += len(rows) + 1
+        if pending_rows >= batch_size:
+            flush()
+            pending_rows = 0
+    if pending:
+        flush()
+
+    # bulk_create bypasses the signal handlers that maintain the rollups, totals and caches.
+    report = rollups.rebuild(first_day, last_day)
+    created['rollups'] = report['created'] + report['updated']
+    totals.reconcile()
+    caching.invalidate()
+    return created
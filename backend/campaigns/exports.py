@@ -0,0 +1,95 @@
+"""
+Streaming CSV and NDJSON exports.
+
+Rows are read with ``values_list().iterator()`` so no model instances are
+built and only one database chunk is held in memory at a time; each row is
+encoded and handed to the response as soon as it is read.
+"""
+import csv
+import json
+
+from django.http import StreamingHttpResponse
+
+from .filtering import filter_campaigns, filter_metrics, parse_date_range
+from .models import Campaign, Metric
+
+
+OUTPUTS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+CHUNK_SIZE = 2000
+
+CAMPAIGN_FIELDS = (
+    'id', 'name', 'description', 'platform', 'status', 'start_date', 'end_date', 'budget',
+    'impressions', 'clicks', 'conversions', 'engagements', 'spend', 'engagement_rate',
+    'created_at', 'updated_at',
+)
+METRIC_FIELDS = (
+    'id', 'campaign_id', 'date', 'impressions', 'clicks', 'engagements', 'conversions',
+    'spend', 'created_at',
+)
+
+
+class _Line:
+    """File-like target that hands back what csv.writer writes to it."""
+
+    def write(self, value):
+        return value
+
+
+def _plain(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def csv_lines(fields, rows):
+    writer = csv.writer(_Line())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(map(_plain, row))
+
+
+def ndjson_lines(fields, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(fields, map(_plain, row)))) + '\n'
+
+
+def export_lines(queryset, fields, output):
+    rows = queryset.order_by('pk').values_list(*fields).iterator(chunk_size=CHUNK_SIZE)
+    return csv_lines(fields, rows) if output == 'csv' else ndjson_lines(fields, rows)
+
+
+def export_response(queryset, fields, output, filename):
+    """Stream ``fields`` of every row in ``queryset`` as a CSV or NDJSON attachment."""
+    response = StreamingHttpResponse(export_lines(queryset, fields, output), content_type=OUTPUTS[output])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{output}"'
+    return response
+
+
+def write_export(queryset, fields, output, path):
+    """Write the lines export_response would stream to ``path``; return the row count."""
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as target:
+        for line in export_lines(queryset, fields, output):
+            target.write(line)
+            count += 1
+    return count - 1 if output == 'csv' else count
+
+
+def campaign_rows(params):
+    """Campaigns filtered by ``platform``, ``status`` and a date range on the start date."""
+    campaigns = filter_campaigns(Campaign.objects.all(), params)
+    date_from, date_to = parse_date_range(params)
+    if date_from:
+        campaigns = campaigns.filter(start_date__gte=date_from)
+    if date_to:
+        campaigns = campaigns.filter(start_date__lte=date_to)
+    return campaigns
+
+
+def metric_rows(params):
+    return filter_metrics(Metric.objects.all(), params)
@@ -0,0 +1,124 @@
+"""Query-parameter filters shared by the export and analytics endpoints."""
+from datetime import timedelta
+
+from django.db.models import Prefetch
+from rest_framework.exceptions import ValidationError
+
+from .models import Campaign, DailyRollup, Metric
+from .params import parse_bool, parse_date, parse_int
+
+
+PLATFORMS = [value for value, _ in Campaign._meta.get_field('platform').choices]
+STATUSES = [value for value, _ in Campaign._meta.get_field('status').choices]
+DEFAULT_LIST_METRICS_LIMIT = 30
+MAX_METRICS_LIMIT = 366
+
+
+def parse_choices(params, name, choices):
+    """Comma-separated choice values, e.g. ``?platform=facebook,instagram``."""
+    value = params.get(name)
+    if not value:
+        return []
+    values = [item.strip() for item in value.split(',') if item.strip()]
+    invalid = [item for item in values if item not in choices]
+    if invalid:
+        raise ValidationError({name: f"Unknown value(s) {', '.join(invalid)}; expected {', '.join(choices)}."})
+    return values
+
+
+def parse_date_range(params):
+    date_from = parse_date(params, 'date_from')
+    date_to = parse_date(params, 'date_to')
+    if date_from and date_to and date_to < date_from:
+        raise ValidationError({'date_to': 'Must not be before date_from.'})
+    return date_from, date_to
+
+
+def comparison_periods(params):
+    """
+    With ``?compare=true``, the ``date_from``..``date_to`` range and the
+    equally long range just before it as ``{'current': (first, last),
+    'previous': (first, last)}``; None otherwise.
+    """
+    if not parse_bool(params, 'compare'):
+        return None
+    date_from, date_to = parse_date_range(params)
+    if not date_from or not date_to:
+        raise ValidationError({'compare': 'Requires both date_from and date_to.'})
+    length = date_to - date_from + timedelta(days=1)
+    return {
+        'current': (date_from, date_to),
+        'previous': (date_from - length, date_from - timedelta(days=1)),
+    }
+
+
+def filter_dates(queryset, params):
+    """Apply a ``date_from``/``date_to`` range to a queryset with a ``date`` field."""
+    date_from, date_to = parse_date_range(params)
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+    return queryset
+
+
+def kpi_rollups(params):
+    """
+    The DailyRollup rows and comparison periods for the KPI endpoints: the
+    ``date_from``/``date_to`` range, or with ``?compare=true`` both periods.
+    """
+    periods = comparison_periods(params)
+    rollups = DailyRollup.objects.all()
+    if periods is None:
+        rollups = filter_dates(rollups, params)
+    return rollups, periods
+
+
+def filter_campaigns(queryset, params, prefix=''):
+    """Apply ``platform`` and ``status`` filters; ``prefix`` reaches Campaign from another model."""
+    platforms = parse_choices(params, 'platform', PLATFORMS)
+    statuses = parse_choices(params, 'status', STATUSES)
+    if platforms:
+        queryset = queryset.filter(**{f'{prefix}platform__in': platforms})
+    if statuses:
+        queryset = queryset.filter(**{f'{prefix}status__in': statuses})
+    return queryset
+
+
+def filter_metrics(queryset, params):
+    """Apply campaign, platform, status and ``date_from``/``date_to`` filters to Metric rows."""
+    queryset = filter_campaigns(queryset, params, prefix='campaign__')
+    campaign = params.get('campaign')
+    if campaign:
+        if not campaign.isdigit():
+            raise ValidationError({'campaign': 'Enter a campaign id.'})
+        queryset = queryset.filter(campaign_id=int(campaign))
+    return filter_dates(queryset, params)
+
+
+def filter_rollups(queryset, params):
+    """Apply ``platform`` filters to DailyRollup rows; rollups carry no status or campaign."""
+    platforms = parse_choices(params, 'platform', PLATFORMS)
+    if platforms:
+        queryset = queryset.filter(platform__in=platforms)
+    return queryset
+
+
+def metrics_window(params, default_limit=None):
+    """The nested metrics a campaign read shows: a Metric queryset and the per-campaign limit."""
+    metrics = Metric.objects.all()
+    metrics_from = parse_date(params, 'metrics_from')
+    metrics_to = parse_date(params, 'metrics_to')
+    if metrics_from:
+        metrics = metrics.filter(date__gte=metrics_from)
+    if metrics_to:
+        metrics = metrics.filter(date__lte=metrics_to)
+    limit = parse_int(params, 'metrics_limit', default_limit, minimum=1, maximum=MAX_METRICS_LIMIT)
+    return metrics, limit
+
+
+def metrics_prefetch(metrics, limit):
+    """One bounded query for the nested metrics of every campaign read."""
+    if limit:
+        metrics = metrics[:limit]
+    return Prefetch('metrics', queryset=metrics, to_attr='metric_window')
@@ -0,0 +1,268 @@
+"""
+Bulk ingestion of daily Metric rows from JSON Lines or CSV streams.
+
+Rows are read lazily and handled in chunks. Each chunk is validated as a
+whole (one query resolves every referenced campaign) and written with a
+single upsert against the (campaign, date) unique constraint, so a chunk
+costs a constant number of queries however many rows it holds.
+"""
+import csv
+import json
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import caching, columnar, rollups, totals
+from .models import Campaign, Metric
+
+
+COUNTER_FIELDS = ('impressions', 'clicks', 'engagements', 'conversions')
+VALUE_FIELDS = COUNTER_FIELDS + ('spend',)
+FORMATS = ('jsonl', 'csv')
+DEFAULT_CHUNK_SIZE = 5000
+MAX_CHUNK_SIZE = 50000
+MAX_ERRORS_PER_BATCH = 20
+
+MAX_COUNTER = 2 ** 31 - 1
+MAX_CAMPAIGN_ID = 2 ** 63 - 1
+MAX_SPEND = Decimal('99999999.99')
+CENT = Decimal('0.01')
+
+
+def read_rows(lines, fmt):
+    """
+    Yield (line number, raw dict or exception) from an iterable of text
+    lines. Lines that decode_lines could not decode arrive as their
+    UnicodeDecodeError and are yielded as such.
+    """
+    if fmt == 'csv':
+        undecodable = []
+
+        def text(lines):
+            for number, line in enumerate(lines, start=1):
+                if isinstance(line, UnicodeDecodeError):
+                    undecodable.append((number, line))
+                    # An empty line still counts towards line_num but yields no row.
+                    line = ''
+                yield line
+
+        reader = csv.DictReader(text(lines))
+        for row in reader:
+            yield from undecodable
+            undecodable.clear()
+            yield reader.line_num, row
+        yield from undecodable
+        return
+    for number, line in enumerate(lines, start=1):
+        if isinstance(line, UnicodeDecodeError):
+            yield number, line
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield number, exc
+            continue
+        yield number, row if isinstance(row, dict) else ValueError('Expected a JSON object.')
+
+
+def decode_lines(stream, encoding='utf-8'):
+    """
+    Iterate a binary file-like object (or HttpRequest) as text lines. A line
+    that is not valid ``encoding`` is yielded as its UnicodeDecodeError, so
+    it is rejected like any malformed row instead of failing the request
+    after earlier chunks were committed.
+    """
+    for line in stream:
+        try:
+            yield line.decode(encoding)
+        except UnicodeDecodeError as exc:
+            yield exc
+
+
+def whole_number(value):
+    """
+    ``value`` as an int, or None if it is not a whole number. Booleans and
+    numbers with a fractional part are not, rather than being truncated.
+    """
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+    return None
+
+
+def parse_counter(field, value):
+    """A counter value as an int; missing or empty is 0."""
+    if value is None or value == '':
+        return 0
+    number = whole_number(value)
+    if number is None:
+        raise ValueError(f'{field}: enter a whole number.')
+    return number
+
+
+def parse_row(raw):
+    """Validate one raw row; return (campaign_id, date, values) or raise ValueError."""
+    campaign_id = whole_number(raw.get('campaign', raw.get('campaign_id')))
+    if campaign_id is None or not 0 < campaign_id <= MAX_CAMPAIGN_ID:
+        raise ValueError('campaign: a campaign id is required.')
+    try:
+        day = date.fromisoformat(str(raw.get('date', '')).strip())
+    except ValueError:
+        raise ValueError('date: enter a date in YYYY-MM-DD format.')
+
+    values = {}
+    for field in COUNTER_FIELDS:
+        value = parse_counter(field, raw.get(field))
+        if not 0 <= value <= MAX_COUNTER:
+            raise ValueError(f'{field}: must be between 0 and {MAX_COUNTER}.')
+        values[field] = value
+    spend = raw.get('spend')
+    if isinstance(spend, bool):
+        raise ValueError('spend: enter a number.')
+    try:
+        spend = Decimal(str(spend if spend not in (None, '') else 0)).quantize(CENT)
+    except (InvalidOperation, ValueError):
+        raise ValueError('spend: enter a number.')
+    if not spend.is_finite():
+        raise ValueError('spend: enter a number.')
+    if not 0 <= spend <= MAX_SPEND:
+        raise ValueError(f'spend: must be between 0 and {MAX_SPEND}.')
+    values['spend'] = spend
+    return campaign_id, day, values
+
+
+def ingest_batch(rows, number=1):
+    """
+    Validate and upsert one chunk of (line number, raw row) pairs.
+
+    Returns a report with the inserted, updated and rejected counts and the
+    first few rejection reasons.
+    """
+    report = {'batch': number, 'received': len(rows), 'inserted': 0, 'updated': 0,
+              'rejected': 0, 'errors': []}
+
+    def reject(line, message):
+        report['rejected'] += 1
+        if len(report['errors']) < MAX_ERRORS_PER_BATCH:
+            report['errors'].append({'line': line, 'error': message})
+
+    parsed = {}
+    for line, raw in rows:
+        if isinstance(raw, Exception):
+            reject(line, f'Malformed row: {raw}')
+            continue
+        try:
+            campaign_id, day, values = parse_row(raw)
+        except ValueError as exc:
+            reject(line, str(exc))
+            continue
+        key = (campaign_id, day)
+        if key in parsed:
+            reject(parsed[key][0], f'Superseded by line {line} for the same campaign and date.')
+        parsed[key] = (line, values)
+
+    platforms = dict(
+        Campaign.objects.filter(pk__in={campaign_id for campaign_id, _ in parsed})
+        .values_list('pk', 'platform')
+    )
+    for key in [key for key in parsed if key[0] not in platforms]:
+        reject(parsed.pop(key)[0], f'campaign: campaign {key[0]} does not exist.')
+    if not parsed:
+        return report
+
+    with transaction.atomic():
+        existed = upsert({key: values for key, (_, values) in parsed.items()})
+        # The upsert bypasses the signal handlers that maintain the rollups, totals and caches.
+        rollups.refresh({(day, platforms[campaign_id]) for campaign_id, day in parsed})
+        totals.reconcile({campaign_id for campaign_id, _ in parsed})
+        caching.invalidate()
+        if existed:
+            columnar.mark_rewritten()
+
+    report['updated'] = len(existed)
+    report['inserted'] = len(parsed) - report['updated']
+    return report
+
+
+def upsert(rows):
+    """
+    Insert or update {(campaign_id, date): values} in one statement and
+    return the keys that already existed.
+
+    On PostgreSQL the statement reports that per row (``xmax = 0`` for a
+    fresh insert), which stays exact while another ingest writes the same
+    keys. Elsewhere the existing keys are read inside the caller's
+    transaction first; SQLite serializes writers, so a concurrent write
+    fails the transaction rather than skewing the counts.
+    """
+    if connection.vendor == 'postgresql':
+        return _upsert_returning(rows)
+    existing = set(
+        Metric.objects.filter(
+            campaign_id__in={campaign_id for campaign_id, _ in rows},
+            date__in={day for _, day in rows},
+        ).values_list('campaign_id', 'date')
+    )
+    Metric.objects.bulk_create(
+        [Metric(campaign_id=campaign_id, date=day, **values) for (campaign_id, day), values in rows.items()],
+        update_conflicts=True,
+        unique_fields=['campaign', 'date'],
+        update_fields=list(VALUE_FIELDS),
+    )
+    return existing & set(rows)
+
+
+def _upsert_returning(rows):
+    # One array parameter per column keeps the statement far below
+    # PostgreSQL's bind-parameter limit however large the chunk is.
+    qn = connection.ops.quote_name
+    fields = [Metric._meta.get_field(name) for name in ('campaign', 'date', *VALUE_FIELDS)]
+    columns = [field.column for field in fields]
+    arrays = [[campaign_id for campaign_id, _ in rows], [day for _, day in rows]]
+    arrays += [[values[name] for values in rows.values()] for name in VALUE_FIELDS]
+    unnest = ', '.join(f'%s::{field.db_type(connection)}[]' for field in fields)
+    updates = ', '.join(f'{qn(column)} = EXCLUDED.{qn(column)}' for column in columns[2:])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {qn(Metric._meta.db_table)} '
+            f"({', '.join(qn(column) for column in columns)}, {qn('created_at')}) "
+            f'SELECT *, %s FROM unnest({unnest}) '
+            f"ON CONFLICT ({qn('campaign_id')}, {qn('date')}) DO UPDATE SET {updates} "
+            f"RETURNING {qn('campaign_id')}, {qn('date')}, xmax <> 0",
+            [timezone.now(), *arrays],
+        )
+        return {(campaign_id, day) for campaign_id, day, existed in cursor.fetchall() if existed}
+
+
+def ingest(lines, fmt='jsonl', chunk_size=DEFAULT_CHUNK_SIZE):
+    """Ingest text lines in chunks of ``chunk_size`` rows; yield one report per chunk."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {', '.join(FORMATS)}.")
+    rows = read_rows(lines, fmt)
+    number = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        number += 1
+        yield ingest_batch(chunk, number)
+
+
+def summarize(reports):
+    totals = {'received': 0, 'inserted': 0, 'updated': 0, 'rejected': 0}
+    for report in reports:
+        for key in totals:
+            totals[key] += report[key]
+    return totals
@@ -0,0 +1,155 @@
+"""
+Top-K campaign leaderboards by any KPI.
+
+Without a date window the campaign totals (campaigns.totals) already are
+the per-campaign rollup, so a board is one ``ORDER BY score LIMIT k`` query
+on Campaign. With a window, the campaigns' metric rows in it are summed in
+one grouped query ordered and limited the same way. Either way the database
+ranks with a bounded top-N sort rather than sorting every campaign.
+
+Per-platform boards stream the same scored rows once through a bounded
+heap per platform (``heapq``): O(N log K) time and O(K) memory per platform,
+however many campaigns there are. Ratio KPIs skip campaigns whose
+denominator is zero, and ``min_impressions`` keeps tiny campaigns from
+topping them.
+"""
+import heapq
+
+from django.db.models import F, FloatField, Sum
+from django.db.models.functions import Cast
+from rest_framework.exceptions import ValidationError
+
+from .filtering import filter_campaigns, parse_date_range
+from .models import Campaign, Metric
+from .params import parse_bool, parse_int
+
+
+TOTALS = ('impressions', 'clicks', 'engagements', 'conversions', 'spend')
+# KPI -> (numerator, denominator, scale)
+RATIOS = {
+    'ctr': ('clicks', 'impressions', 100),
+    'engagement_rate': ('engagements', 'impressions', 100),
+    'conversion_rate': ('conversions', 'clicks', 100),
+    'cpc': ('spend', 'clicks', 1),
+}
+KPIS = TOTALS + tuple(RATIOS) + ('roi',)
+CAMPAIGN_FIELDS = ('id', 'name', 'platform', 'status')
+# Lower is better.
+ASCENDING = ('cpc',)
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+
+
+def score(kpi, columns):
+    """
+    The KPI as an expression over ``columns`` (total name -> column name)
+    and the column that must be positive for it to be defined.
+    """
+    def column(name):
+        return Cast(F(columns[name]), FloatField())
+
+    if kpi in TOTALS:
+        return F(columns[kpi]), None
+    if kpi == 'roi':
+        # As in campaigns.analytics: each conversion is worth 100.
+        return (column('conversions') * 100 - column('spend')) * 100 / column('spend'), columns['spend']
+    numerator, denominator, scale = RATIOS[kpi]
+    return column(numerator) * scale / column(denominator), columns[denominator]
+
+
+def parse_board(params):
+    kpi = params.get('kpi', 'ctr')
+    if kpi not in KPIS:
+        raise ValidationError({'kpi': f"Expected one of {', '.join(KPIS)}."})
+    order = params.get('order') or ('asc' if kpi in ASCENDING else 'desc')
+    if order not in ('asc', 'desc'):
+        raise ValidationError({'order': 'Expected asc or desc.'})
+    date_from, date_to = parse_date_range(params)
+    return {
+        'kpi': kpi,
+        'order': order,
+        'limit': parse_int(params, 'limit', DEFAULT_LIMIT, minimum=1, maximum=MAX_LIMIT),
+        'min_impressions': parse_int(params, 'min_impressions', 0, minimum=0),
+        'date_from': date_from,
+        'date_to': date_to,
+        'per_platform': parse_bool(params, 'per_platform'),
+    }
+
+
+def scored_rows(params, kpi, min_impressions, date_from=None, date_to=None):
+    """
+    Per-campaign rows with their totals and ``score``, from Campaign or from
+    the windowed metric rows, and the row key of each campaign field and total.
+    """
+    if date_from is None and date_to is None:
+        columns = {name: name for name in CAMPAIGN_FIELDS + TOTALS}
+        rows = filter_campaigns(Campaign.objects.all(), params).values(*CAMPAIGN_FIELDS, *TOTALS)
+    else:
+        columns = {
+            'id': 'campaign_id',
+            **{name: f'campaign__{name}' for name in CAMPAIGN_FIELDS if name != 'id'},
+            **{name: f'sum_{name}' for name in TOTALS},
+        }
+        metrics = filter_campaigns(Metric.objects.all(), params, prefix='campaign__')
+        if date_from:
+            metrics = metrics.filter(date__gte=date_from)
+        if date_to:
+            metrics = metrics.filter(date__lte=date_to)
+        rows = (
+            metrics.order_by()
+            .values(*(columns[name] for name in CAMPAIGN_FIELDS))
+            .annotate(**{columns[name]: Sum(name) for name in TOTALS})
+        )
+    expression, positive = score(kpi, columns)
+    rows = rows.annotate(score=expression)
+    if positive:
+        rows = rows.filter(**{f'{positive}__gt': 0})
+    if min_impressions:
+        rows = rows.filter(**{f"{columns['impressions']}__gte": min_impressions})
+    return rows, columns
+
+
+def entry(rank, row, columns):
+    return {
+        'rank': rank,
+        **{name: row[columns[name]] for name in CAMPAIGN_FIELDS},
+        'value': round(float(row['score']), 2),
+        **{name: row[columns[name]] or 0 for name in TOTALS if name != 'spend'},
+        'spend': float(row[columns['spend']] or 0),
+    }
+
+
+def top_per_group(rows, limit, group, id_column, descending=True):
+    """Stream ``rows`` once, keeping the ``limit`` best scores per ``group`` value in a heap."""
+    heaps = {}
+    for row in rows:
+        # Ties go to the lower id, as in the ORDER BY.
+        key = (row['score'] if descending else -row['score'], -row[id_column])
+        heap = heaps.setdefault(row[group], [])
+        if len(heap) < limit:
+            heapq.heappush(heap, (key, row))
+        elif key > heap[0][0]:
+            heapq.heapreplace(heap, (key, row))
+    return {value: [row for _, row in sorted(heap, key=lambda item: item[0], reverse=True)]
+            for value, heap in sorted(heaps.items())}
+
+
+def leaderboard(params):
+    """The board for a request: ``results``, or ``platforms`` with ``per_platform``."""
+    board = parse_board(params)
+    rows, columns = scored_rows(params, board['kpi'], board['min_impressions'],
+                                board['date_from'], board['date_to'])
+    descending = board['order'] == 'desc'
+    response = {key: board[key] for key in ('kpi', 'order', 'limit', 'min_impressions')}
+    if board['per_platform']:
+        groups = top_per_group(rows.iterator(), board['limit'], columns['platform'], columns['id'], descending)
+        response['platforms'] = {
+            platform: [entry(rank, row, columns) for rank, row in enumerate(top, 1)]
+            for platform, top in groups.items()
+        }
+        return response
+    ordering = ('-score', columns['id']) if descending else ('score', columns['id'])
+    top = rows.order_by(*ordering)[:board['limit']]
+    response['results'] = [entry(rank, row, columns) for rank, row in enumerate(top, 1)]
+    return response
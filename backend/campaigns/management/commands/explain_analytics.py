@@ -0,0 +1,114 @@
+import re
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from campaigns import datasets
+from campaigns.models import Campaign
+
+
+# Every analytics read path; the SQL each one executes is captured and explained.
+ENDPOINTS = [
+    '/api/campaigns/',
+    '/api/campaigns/?include_metrics=true',
+    '/api/campaigns/?search=summer&ordering=status',
+    '/api/campaigns/active/',
+    '/api/campaigns/dashboard_stats/',
+    '/api/campaigns/platform_performance/',
+    '/api/campaigns/timeseries/?interval=week',
+    '/api/campaigns/timeseries/?interval=day&status=active&date_from={recent}',
+    '/api/campaigns/{campaign}/timeseries/?interval=day',
+    '/api/campaigns/dashboard_stats/?date_from={recent}&date_to={today}&compare=true',
+    '/api/campaigns/platform_performance/?date_from={recent}&date_to={today}&compare=true',
+    '/api/campaigns/leaderboard/?kpi=ctr&min_impressions=1000',
+    '/api/campaigns/leaderboard/?kpi=roi&per_platform=true&date_from={recent}&date_to={today}',
+    '/api/metrics/query/?group_by=platform,week',
+    '/api/metrics/query/?group_by=campaign&status=active&date_from={recent}&kpis=total_clicks,cpc',
+    '/api/metrics/export/?date_from={recent}&platform=instagram',
+]
+
+SEQUENTIAL_SCAN = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (\w+)\b(?! USING)'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Run EXPLAIN (ANALYZE on PostgreSQL) over the SQL issued by every analytics '
+        'endpoint and flag sequential scans.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed-campaigns', type=int, default=0,
+                            help='Seed this many synthetic campaigns first (rolled back afterwards).')
+        parser.add_argument('--seed-days', type=int, default=90,
+                            help='Days of metrics per seeded campaign (default 90).')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan in full.')
+        parser.add_argument('--fail-on-seq-scan', action='store_true',
+                            help='Exit with an error if any query uses a sequential scan.')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in SEQUENTIAL_SCAN:
+            raise CommandError(f'EXPLAIN parsing is not supported for {connection.vendor}.')
+
+        with transaction.atomic():
+            if options['seed_campaigns']:
+                self.seed(options['seed_campaigns'], options['seed_days'])
+            flagged = self.explain_all(options['verbose_plans'])
+            # Seeded rows are never kept.
+            transaction.set_rollback(True)
+
+        if flagged:
+            self.stdout.write(self.style.WARNING(f'{len(flagged)} queries use sequential scans.'))
+            if options['fail_on_seq_scan']:
+                raise CommandError('Sequential scans found.')
+        else:
+            self.stdout.write(self.style.SUCCESS('No sequential scans found.'))
+
+    def seed(self, campaigns, days):
+        created = datasets.generate(campaigns, days)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        self.stdout.write('Seeded {campaigns} campaigns and {metrics} metrics.'.format(**created))
+
+    def explain_all(self, verbose):
+        client = Client()
+        campaign = Campaign.objects.values_list('pk', flat=True).first() or 0
+        today = date.today()
+        recent = (today - timedelta(days=30)).isoformat()
+        statements = {}
+        # Bypass the response cache so every endpoint reaches the database.
+        with override_settings(ALLOWED_HOSTS=['*'],
+                               CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+            for template in ENDPOINTS:
+                url = template.format(campaign=campaign, recent=recent, today=today.isoformat())
+                with CaptureQueriesContext(connection) as queries:
+                    response = client.get(url)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                for query in queries.captured_queries:
+                    if query['sql'].lstrip().upper().startswith('SELECT'):
+                        statements.setdefault(query['sql'], url)
+
+        flagged = []
+        pattern = SEQUENTIAL_SCAN[connection.vendor]
+        # Scans of derived tables (subqueries, CTEs) are not missing indexes.
+        tables = set(connection.introspection.table_names())
+        prefix = 'EXPLAIN ANALYZE ' if connection.vendor == 'postgresql' else 'EXPLAIN QUERY PLAN '
+        for sql, url in statements.items():
+            with connection.cursor() as cursor:
+                cursor.execute(prefix + sql)
+                plan = '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+            scans = sorted(set(pattern.findall(plan)) & tables)
+            if scans:
+                flagged.append((url, scans))
+            label = self.style.WARNING('SEQ SCAN ' + ', '.join(scans)) if scans else 'ok'
+            self.stdout.write(f'{label}  {url}\n    {sql[:160]}')
+            if verbose or scans:
+                self.stdout.write('    ' + plan.replace('\n', '\n    '))
+        return flagged
@@ -0,0 +1,45 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from campaigns import datasets
+from campaigns.filtering import PLATFORMS
+from campaigns.models import Campaign
+
+
+class Command(BaseCommand):
+    help = 'Generate a seeded synthetic dataset of campaigns and daily metrics.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--campaigns', type=int, default=100, help='Campaigns to create (default 100).')
+        parser.add_argument('--days', type=int, default=90, help='Days of metrics per campaign (default 90).')
+        parser.add_argument('--platforms', default=','.join(PLATFORMS),
+                            help='Comma-separated platforms to spread campaigns over (default all).')
+        parser.add_argument('--end-date', help='Last day of metrics (YYYY-MM-DD, default today).')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default 0).')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert (default 5000).')
+        parser.add_argument('--clear', action='store_true', help='Delete all campaigns and metrics first.')
+
+    def handle(self, *args, **options):
+        if options['campaigns'] < 1 or options['days'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--campaigns, --days and --batch-size must be positive.')
+        platforms = [platform.strip() for platform in options['platforms'].split(',') if platform.strip()]
+        unknown = [platform for platform in platforms if platform not in PLATFORMS]
+        if unknown or not platforms:
+            raise CommandError(f"--platforms must be a subset of {', '.join(PLATFORMS)}.")
+        try:
+            end_date = date.fromisoformat(options['end_date']) if options['end_date'] else None
+        except ValueError as exc:
+            raise CommandError(f'Invalid date: {exc}')
+
+        with transaction.atomic():
+            if options['clear']:
+                Campaign.objects.all().delete()
+            created = datasets.generate(
+                options['campaigns'], options['days'], platforms, seed=options['seed'],
+                end_date=end_date, batch_size=options['batch_size'],
+            )
+        self.stdout.write(self.style.SUCCESS(
+            'Created {campaigns} campaigns, {metrics} metrics and {rollups} rollup rows.'.format(**created)
+        ))
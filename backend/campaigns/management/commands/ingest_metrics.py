@@ -0,0 +1,39 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from campaigns import ingest
+
+
+class Command(BaseCommand):
+    help = 'Upsert daily metric rows from a JSON Lines or CSV file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to read, or '-' for standard input.")
+        parser.add_argument('--format', choices=ingest.FORMATS,
+                            help='Input format; defaults to csv for *.csv files and jsonl otherwise.')
+        parser.add_argument('--chunk-size', type=int, default=ingest.DEFAULT_CHUNK_SIZE,
+                            help=f'Rows per batch (default {ingest.DEFAULT_CHUNK_SIZE}).')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl')
+        if not 1 <= options['chunk_size'] <= ingest.MAX_CHUNK_SIZE:
+            raise CommandError(f'--chunk-size must be between 1 and {ingest.MAX_CHUNK_SIZE}.')
+
+        try:
+            source = sys.stdin.buffer if path == '-' else open(path, 'rb')
+        except OSError as exc:
+            raise CommandError(str(exc))
+        reports = []
+        with source:
+            for report in ingest.ingest(ingest.decode_lines(source), fmt, options['chunk_size']):
+                reports.append(report)
+                self.stdout.write(
+                    'batch {batch}: received={received} inserted={inserted} '
+                    'updated={updated} rejected={rejected}'.format(**report)
+                )
+                for error in report['errors']:
+                    self.stderr.write(f"  line {error['line']}: {error['error']}")
+        self.stdout.write('total: received={received} inserted={inserted} '
+                          'updated={updated} rejected={rejected}'.format(**ingest.summarize(reports)))
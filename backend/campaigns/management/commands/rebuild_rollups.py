@@ -0,0 +1,31 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from campaigns import rollups
+
+
+class Command(BaseCommand):
+    help = 'Backfill the daily rollup table from Metric and repair any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', help='First day to reconcile (YYYY-MM-DD).')
+        parser.add_argument('--date-to', help='Last day to reconcile (YYYY-MM-DD).')
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only report drift; exit with an error if any bucket is out of date.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            date_from = date.fromisoformat(options['date_from']) if options['date_from'] else None
+            date_to = date.fromisoformat(options['date_to']) if options['date_to'] else None
+        except ValueError as exc:
+            raise CommandError(f'Invalid date: {exc}')
+
+        report = rollups.rebuild(date_from, date_to, dry_run=options['check'])
+        self.stdout.write(
+            'created={created} updated={updated} deleted={deleted} unchanged={unchanged}'.format(**report)
+        )
+        if options['check'] and (report['created'] or report['updated'] or report['deleted']):
+            raise CommandError('Rollups are out of date; run rebuild_rollups without --check.')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from campaigns import totals
+
+
+class Command(BaseCommand):
+    help = 'Recompute the campaign totals from Metric in one statement and repair any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('campaign_ids', nargs='*', type=int, help='Campaigns to reconcile (default: all).')
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only report drift; exit with an error if any campaign is out of date.',
+        )
+
+    def handle(self, *args, **options):
+        drifted = totals.reconcile(options['campaign_ids'] or None, dry_run=options['check'])
+        self.stdout.write(f'out_of_date={drifted}')
+        if options['check'] and drifted:
+            raise CommandError('Campaign totals are out of date; run reconcile_totals without --check.')
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0002_metric'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('platform', models.CharField(max_length=50)),
+                ('metric_count', models.IntegerField(default=0)),
+                ('impressions', models.BigIntegerField(default=0)),
+                ('clicks', models.BigIntegerField(default=0)),
+                ('engagements', models.BigIntegerField(default=0)),
+                ('conversions', models.BigIntegerField(default=0)),
+                ('spend', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-date', 'platform'],
+                'unique_together': {('date', 'platform')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0003_dailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='campaign',
+            index=models.Index(fields=['-created_at', '-id'], name='campaign_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='campaign',
+            index=models.Index(fields=['status', '-created_at'], name='campaign_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='campaign',
+            index=models.Index(fields=['platform', 'status'], name='campaign_platform_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='metric',
+            index=models.Index(fields=['date', 'campaign'], include=('impressions', 'clicks', 'engagements', 'conversions', 'spend'), name='metric_date_campaign_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0004_metric_and_campaign_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='metric',
+            index=models.Index(fields=['-date', '-id'], name='metric_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector
+from django.db import DatabaseError, migrations, transaction
+
+
+# GIN indexes behind campaigns.search. They exist on PostgreSQL only, so
+# they are created here rather than declared in Campaign.Meta; the search
+# vector must stay identical to campaigns.search.SEARCH_VECTOR.
+SEARCH_INDEX = GinIndex(
+    SearchVector('name', weight='A', config='simple')
+    + SearchVector('description', weight='B', config='simple'),
+    name='campaign_search_idx',
+)
+TRIGRAM_INDEX = GinIndex(OpClass('name', name='gin_trgm_ops'), name='campaign_name_trgm_idx')
+
+
+def install_pg_trgm(schema_editor):
+    """Create pg_trgm if the server ships it and the role may; return whether it is installed."""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT installed_version IS NOT NULL FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        row = cursor.fetchone()
+    if row is None:
+        return False
+    if row[0]:
+        return True
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except DatabaseError:
+        return False
+    return True
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Campaign = apps.get_model('campaigns', 'Campaign')
+    schema_editor.add_index(Campaign, SEARCH_INDEX)
+    # Without pg_trgm, search runs without the typo-tolerant name match (campaigns.search).
+    if install_pg_trgm(schema_editor):
+        schema_editor.add_index(Campaign, TRIGRAM_INDEX)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Campaign = apps.get_model('campaigns', 'Campaign')
+    schema_editor.remove_index(Campaign, SEARCH_INDEX)
+    schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(TRIGRAM_INDEX.name)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0005_metric_pagination_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:37
+
+from django.db import migrations, models
+from django.db.models import Case, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Round
+
+
+def reconcile_totals(apps, schema_editor):
+    # The stored totals were never maintained before; compute them from Metric.
+    # Only the historical models are used, so later schema changes cannot break this.
+    Campaign = apps.get_model('campaigns', 'Campaign')
+    Metric = apps.get_model('campaigns', 'Metric')
+    using = schema_editor.connection.alias
+    metrics = Metric.objects.using(using).filter(campaign=OuterRef('pk')).order_by().values('campaign')
+
+    def total(field):
+        output_field = Campaign._meta.get_field(field)
+        return Coalesce(
+            Subquery(metrics.annotate(total=Sum(field)).values('total'), output_field=output_field),
+            Value(0), output_field=output_field,
+        )
+
+    campaigns = Campaign.objects.using(using)
+    campaigns.update(**{field: total(field) for field in ('impressions', 'clicks', 'engagements', 'conversions', 'spend')})
+    campaigns.update(engagement_rate=Case(
+        When(impressions__gt=0, then=Round(Cast('engagements', models.FloatField()) * 100 / F('impressions'), 2)),
+        default=Value(0.0),
+        output_field=models.FloatField(),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0006_campaign_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaign',
+            name='engagements',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='campaign',
+            name='spend',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(reconcile_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0007_campaign_totals'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='campaign',
+            constraint=models.CheckConstraint(condition=models.Q(('status__in', ['draft', 'active', 'paused', 'completed'])), name='campaign_status_valid'),
+        ),
+    ]
@@ -1,6 +1,19 @@
-from django.db import models
+from django.db import models, router, transaction
+
+class CampaignStatus(models.TextChoices):
+    DRAFT = 'draft', 'Draft'
+    ACTIVE = 'active', 'Active'
+    PAUSED = 'paused', 'Paused'
+    COMPLETED = 'completed', 'Completed'
+
 
 class Campaign(models.Model):
+    DRAFT = CampaignStatus.DRAFT
+    ACTIVE = CampaignStatus.ACTIVE
+    PAUSED = CampaignStatus.PAUSED
+    COMPLETED = CampaignStatus.COMPLETED
+    STATUSES = CampaignStatus.choices
+
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
     platform = models.CharField(max_length=50, choices=[
@@ -10,24 +23,37 @@ class Campaign(models.Model):
         ('linkedin', 'LinkedIn'),
         ('tiktok', 'TikTok'),
     ])
-    status = models.CharField(max_length=20, choices=[
-        ('draft', 'Draft'),
-        ('active', 'Active'),
-        ('paused', 'Paused'),
-        ('completed', 'Completed'),
-    ], default='draft')
+    status = models.CharField(max_length=20, choices=STATUSES, default=DRAFT)
     start_date = models.DateField()
     end_date = models.DateField(blank=True, null=True)
     budget = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    # Totals over the campaign's metrics, maintained by campaigns.totals.
     impressions = models.IntegerField(default=0)
     clicks = models.IntegerField(default=0)
     conversions = models.IntegerField(default=0)
+    engagements = models.IntegerField(default=0)
+    spend = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     engagement_rate = models.FloatField(default=0.0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Default list ordering, and the active/status filters with that ordering.
+            models.Index(fields=['-created_at', '-id'], name='campaign_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='campaign_status_created_idx'),
+            # Per-platform breakdowns and their status filters.
+            models.Index(fields=['platform', 'status'], name='campaign_platform_status_idx'),
+        ]
+        constraints = [
+            # Writes that bypass the serializer (QuerySet.update, pause/resume)
+            # still cannot store an unknown status.
+            models.CheckConstraint(
+                condition=models.Q(status__in=CampaignStatus.values),
+                name='campaign_status_valid',
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -46,6 +72,42 @@ class Metric(models.Model):
     class Meta:
         ordering = ['-date']
         unique_together = ('campaign', 'date')
+        indexes = [
+            # Date-range scans across campaigns; on PostgreSQL the INCLUDE columns
+            # let the metric aggregates be answered from the index alone.
+            models.Index(
+                fields=['date', 'campaign'],
+                name='metric_date_campaign_idx',
+                include=['impressions', 'clicks', 'engagements', 'conversions', 'spend'],
+            ),
+            # Keyset pagination of the metrics listing.
+            models.Index(fields=['-date', '-id'], name='metric_date_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.campaign.name} - {self.date}"
+
+    def save(self, *args, **kwargs):
+        # The signal handlers that update the campaign totals run in the same transaction.
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(Metric, instance=self)):
+            super().save(*args, **kwargs)
+
+
+class DailyRollup(models.Model):
+    """Metric totals per day and platform, maintained by campaigns.rollups."""
+    date = models.DateField()
+    platform = models.CharField(max_length=50)
+    metric_count = models.IntegerField(default=0)
+    impressions = models.BigIntegerField(default=0)
+    clicks = models.BigIntegerField(default=0)
+    engagements = models.BigIntegerField(default=0)
+    conversions = models.BigIntegerField(default=0)
+    spend = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-date', 'platform']
+        unique_together = ('date', 'platform')
+
+    def __str__(self):
+        return f"{self.platform} - {self.date}"
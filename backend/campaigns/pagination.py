@@ -0,0 +1,148 @@
+"""
+Keyset (cursor) pagination for the campaign and metric listings.
+
+DRF's CursorPagination positions a cursor on the first ordering field only
+and skips ties with an OFFSET. Here the cursor holds the value of every
+ordering field and the ordering always ends in the primary key, so a page is
+one indexed range query, ``WHERE (created_at, id) < (:created_at, :id)``,
+whatever its depth, and rows inserted meanwhile never shift later pages.
+The total count costs a COUNT(*) and is only returned with ``?count=true``.
+"""
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.response import Response
+
+from .params import parse_bool
+
+
+MAX_PAGE_SIZE = 100
+
+
+class KeysetPagination(CursorPagination):
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+    count_query_param = 'count'
+
+    def get_ordering(self, request, queryset, view):
+        """The requested ordering, made unique by a trailing primary key."""
+        ordering = tuple(super().get_ordering(request, queryset, view))
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering += ('-id' if ordering[-1].startswith('-') else 'id',)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.count = queryset.count() if parse_bool(request.query_params, self.count_query_param) else None
+
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+        current_position = self.cursor.position if self.cursor else None
+
+        queryset = queryset.order_by(*(_flip(field) for field in self.ordering) if reverse else self.ordering)
+        if current_position is not None:
+            queryset = queryset.filter(self.after(queryset, current_position, reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = current_position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, current_position is not None
+
+        # Links continue from the rows on either edge of the page, or from
+        # the cursor itself when it points past the last row.
+        if self.page:
+            self.next_position = self._get_position_from_instance(self.page[-1], self.ordering)
+            self.previous_position = self._get_position_from_instance(self.page[0], self.ordering)
+        else:
+            self.next_position = self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def after(self, queryset, position, reverse):
+        """
+        Rows strictly past ``position`` in the (possibly reversed) ordering:
+        ``a < x OR (a = x AND b < y) OR ...``, led by ``a <= x`` so the
+        database can answer it with a single index range scan.
+        """
+        values = self.decode_position(queryset, position)
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') != reverse else 'gt'
+            if not equal:
+                leading = Q(**{f'{name}__{lookup}e': value})
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return leading & condition
+
+    def decode_position(self, queryset, position):
+        try:
+            values = json.loads(position)
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                _field(queryset, field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (ValueError, TypeError, FieldDoesNotExist, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            name = field.lstrip('-')
+            value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return json.dumps(values, default=str)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.next_position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.previous_position))
+
+    def get_paginated_response(self, data):
+        response = {'next': self.get_next_link(), 'previous': self.get_previous_link(), 'results': data}
+        if self.count is not None:
+            response = {'count': self.count, **response}
+        return Response(response)
+
+
+class CampaignPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+
+
+class MetricPagination(KeysetPagination):
+    ordering = ('-date', '-id')
+
+
+def _flip(field):
+    return field[1:] if field.startswith('-') else '-' + field
+
+
+def _field(queryset, name):
+    """The model field, or annotation output field, an ordering refers to."""
+    if name in queryset.query.annotations:
+        return queryset.query.annotations[name].output_field
+    return queryset.model._meta.pk if name == 'pk' else queryset.model._meta.get_field(name)
+
@@ -0,0 +1,38 @@
+from datetime import date
+
+from rest_framework.exceptions import ValidationError
+
+
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+
+def parse_bool(params, name, default=False):
+    value = params.get(name)
+    if value is None or value == '':
+        return default
+    return value.lower() in TRUE_VALUES
+
+
+def parse_date(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValidationError({name: 'Enter a date in YYYY-MM-DD format.'})
+
+
+def parse_int(params, name, default=None, minimum=None, maximum=None):
+    value = params.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValidationError({name: 'Enter a whole number.'})
+    if minimum is not None and value < minimum:
+        raise ValidationError({name: f'Must be at least {minimum}.'})
+    if maximum is not None and value > maximum:
+        raise ValidationError({name: f'Must be at most {maximum}.'})
+    return value
@@ -0,0 +1,170 @@
+"""
+Maintenance of the DailyRollup summary table.
+
+A rollup row holds the metric totals of one (date, platform) bucket. Buckets
+are never patched with deltas; a touched bucket is recomputed from Metric,
+which keeps inserts, updates, deletes and platform changes equally correct.
+Signal handlers (campaigns.signals) mark touched buckets and the rows are
+refreshed once per transaction on commit. Writers that bypass signals, such
+as ``bulk_create`` or ``QuerySet.update``, must call ``refresh`` themselves.
+
+On PostgreSQL a refresh holds a transaction-level advisory lock per bucket
+while it recomputes and writes, so two concurrent refreshes of a bucket run
+one after the other and the later one reads the earlier one's metrics; a
+refresh computed from an older snapshot can no longer commit last. SQLite
+serializes writers already.
+"""
+import threading
+import zlib
+
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+
+from .models import Campaign, DailyRollup, Metric
+
+
+TOTAL_FIELDS = ('impressions', 'clicks', 'engagements', 'conversions', 'spend')
+
+_pending = threading.local()
+
+
+def bucket_totals(metrics):
+    """Group a Metric queryset into {(date, platform): totals} in one query."""
+    rows = (
+        metrics
+        .order_by()
+        .values('date', 'campaign__platform')
+        .annotate(
+            total_metric_count=Count('id'),
+            **{f'total_{field}': Sum(field) for field in TOTAL_FIELDS}
+        )
+    )
+    return {
+        (row['date'], row['campaign__platform']): {
+            field: row[f'total_{field}'] for field in ('metric_count',) + TOTAL_FIELDS
+        }
+        for row in rows
+    }
+
+
+def _write(totals, stale):
+    """Upsert ``totals`` and delete the rollup rows for the ``stale`` buckets."""
+    # No savepoint: refresh() already runs this inside its own transaction.
+    with transaction.atomic(savepoint=False):
+        if stale:
+            condition = Q()
+            for day, platform in stale:
+                condition |= Q(date=day, platform=platform)
+            DailyRollup.objects.filter(condition).delete()
+        if totals:
+            DailyRollup.objects.bulk_create(
+                [DailyRollup(date=day, platform=platform, **values)
+                 for (day, platform), values in totals.items()],
+                update_conflicts=True,
+                unique_fields=['date', 'platform'],
+                update_fields=['metric_count', *TOTAL_FIELDS, 'updated_at'],
+            )
+
+
+def _lock(buckets):
+    """Take the advisory locks of ``buckets`` in a fixed order (no deadlocks between refreshes)."""
+    if connection.vendor != 'postgresql':
+        return
+    keys = sorted({zlib.crc32(f'rollups:{day}:{platform}'.encode()) for day, platform in buckets})
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_xact_lock(key) FROM unnest(%s::bigint[]) AS key', [keys])
+
+
+def refresh(buckets):
+    """Recompute the rollup rows of the given (date, platform) buckets."""
+    buckets = set(buckets)
+    if not buckets:
+        return
+    with transaction.atomic():
+        _lock(buckets)
+        metrics = Metric.objects.filter(
+            date__in={day for day, _ in buckets},
+            campaign__platform__in={platform for _, platform in buckets},
+        )
+        totals = {key: values for key, values in bucket_totals(metrics).items() if key in buckets}
+        _write(totals, buckets - set(totals))
+
+
+def rebuild(date_from=None, date_to=None, dry_run=False):
+    """
+    Reconcile the rollups with Metric over an optional date range.
+
+    Returns counts of created, updated, deleted and unchanged buckets. With
+    ``dry_run`` nothing is written, which makes it usable as a drift check.
+    """
+    metrics = Metric.objects.all()
+    rollups = DailyRollup.objects.all()
+    if date_from:
+        metrics = metrics.filter(date__gte=date_from)
+        rollups = rollups.filter(date__gte=date_from)
+    if date_to:
+        metrics = metrics.filter(date__lte=date_to)
+        rollups = rollups.filter(date__lte=date_to)
+
+    expected = bucket_totals(metrics)
+    current = {
+        (row['date'], row['platform']): row
+        for row in rollups.values('date', 'platform', 'metric_count', *TOTAL_FIELDS)
+    }
+
+    changed = {
+        key: values for key, values in expected.items()
+        if key not in current or any(current[key][field] != value for field, value in values.items())
+    }
+    stale = set(current) - set(expected)
+    if not dry_run:
+        _write(changed, stale)
+
+    created = sum(1 for key in changed if key not in current)
+    return {
+        'created': created,
+        'updated': len(changed) - created,
+        'deleted': len(stale),
+        'unchanged': len(expected) - len(changed),
+    }
+
+
+def _state():
+    if not hasattr(_pending, 'buckets'):
+        _pending.buckets = set()
+        _pending.campaign_dates = {}
+        _pending.platforms = {}
+    return _pending
+
+
+def _flush():
+    state = _state()
+    buckets, campaign_dates, platforms = state.buckets, state.campaign_dates, state.platforms
+    if not buckets and not campaign_dates:
+        return
+    del _pending.buckets, _pending.campaign_dates, _pending.platforms
+
+    unknown = set(campaign_dates) - set(platforms)
+    if unknown:
+        platforms.update(Campaign.objects.filter(pk__in=unknown).values_list('pk', 'platform'))
+    for campaign_id, dates in campaign_dates.items():
+        if campaign_id in platforms:
+            buckets.update((day, platforms[campaign_id]) for day in dates)
+    refresh(buckets)
+
+
+def mark_metric(campaign_id, day):
+    """Schedule a refresh of the bucket a campaign's metric row falls into."""
+    _state().campaign_dates.setdefault(campaign_id, set()).add(day)
+    transaction.on_commit(_flush)
+
+
+def remember_platform(campaign_id, platform):
+    """Record a campaign's platform for buckets flushed after it is deleted."""
+    _state().platforms[campaign_id] = platform
+
+
+def mark_buckets(buckets):
+    """Schedule a refresh of explicit (date, platform) buckets."""
+    _state().buckets.update(buckets)
+    transaction.on_commit(_flush)
@@ -0,0 +1,102 @@
+"""
+Indexed campaign search for ``?search=``.
+
+Search terms that are exactly a platform or status value (``instagram``,
+``paused``) become equality filters. The remaining terms are matched against
+name and description. On PostgreSQL that is a prefix full-text query on a
+weighted search vector, OR a pg_trgm word similarity on the name to forgive
+typos, both answered by GIN indexes (migration 0006), and the results are
+ordered by relevance unless ``?ordering=`` is given. Where the pg_trgm
+extension is not installed only the full-text query is used. Other
+databases fall back to DRF's ``icontains`` matching.
+"""
+import re
+
+from django.contrib.postgres.lookups import TrigramWordSimilar
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import F, IntegerField, Q
+from django.db.models.functions import Cast
+from rest_framework import filters
+
+from .filtering import PLATFORMS, STATUSES
+
+
+SEARCH_CONFIG = 'simple'
+# Must stay identical to the expression indexed by campaign_search_idx.
+SEARCH_VECTOR = (
+    SearchVector('name', weight='A', config=SEARCH_CONFIG)
+    + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+)
+# Ranks are kept as integers so they round-trip exactly through pagination cursors.
+RANK_SCALE = 1_000_000
+WORD = re.compile(r'\w+')
+
+_trigram = {}
+
+
+def has_trigram(alias):
+    """Whether pg_trgm is installed in database ``alias``; checked once per process."""
+    if alias not in _trigram:
+        with connections[alias].cursor() as cursor:
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+            _trigram[alias] = cursor.fetchone()[0]
+    return _trigram[alias]
+
+
+def split_terms(terms):
+    """Split search terms into (platforms, statuses, text terms)."""
+    platforms, statuses, text = [], [], []
+    for term in terms:
+        value = term.lower()
+        if value in PLATFORMS:
+            platforms.append(value)
+        elif value in STATUSES:
+            statuses.append(value)
+        else:
+            text.append(term)
+    return platforms, statuses, text
+
+
+class CampaignSearchFilter(filters.SearchFilter):
+
+    def filter_queryset(self, request, queryset, view):
+        platforms, statuses, text = split_terms(self.get_search_terms(request))
+        if platforms:
+            queryset = queryset.filter(platform__in=platforms)
+        if statuses:
+            queryset = queryset.filter(status__in=statuses)
+        if not text:
+            return queryset
+        if connections[queryset.db].vendor == 'postgresql':
+            return self.full_text(queryset, text)
+        return self.substring(queryset, text, getattr(view, 'search_fields', ()))
+
+    def full_text(self, queryset, terms):
+        words = [word for term in terms for word in WORD.findall(term)]
+        if not words:
+            return queryset.none()
+        query = SearchQuery(' & '.join(f'{word}:*' for word in words), search_type='raw', config=SEARCH_CONFIG)
+        condition = Q(search_document=query)
+        if has_trigram(queryset.db):
+            condition |= TrigramWordSimilar(F('name'), ' '.join(terms))
+        return queryset.alias(search_document=SEARCH_VECTOR).annotate(
+            search_rank=Cast(SearchRank(SEARCH_VECTOR, query) * RANK_SCALE, IntegerField()),
+        ).filter(condition)
+
+    def substring(self, queryset, terms, fields):
+        for term in terms:
+            condition = Q()
+            for field in fields:
+                condition |= Q(**{f'{field}__icontains': term})
+            queryset = queryset.filter(condition)
+        return queryset
+
+
+class RelevanceOrderingFilter(filters.OrderingFilter):
+    """OrderingFilter that defaults to best match first for full-text searches."""
+
+    def get_ordering(self, request, queryset, view):
+        if not request.query_params.get(self.ordering_param) and 'search_rank' in queryset.query.annotations:
+            return ['-search_rank']
+        return super().get_ordering(request, queryset, view)
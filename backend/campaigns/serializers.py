@@ -1,10 +1,25 @@
+from decimal import Decimal
+
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
 from rest_framework import serializers
+from . import bulk
 from .models import Campaign, Metric
 
 
+class MetricListSerializer(serializers.ListSerializer):
+    def get_attribute(self, instance):
+        # CampaignViewSet prefetches a bounded window of metrics into ``metric_window``.
+        if hasattr(instance, 'metric_window'):
+            return instance.metric_window
+        return super().get_attribute(instance)
+
+
 class MetricSerializer(serializers.ModelSerializer):
     class Meta:
         model = Metric
+        list_serializer_class = MetricListSerializer
         fields = [
             'id', 'campaign', 'date', 'impressions', 'clicks',
             'engagements', 'conversions', 'spend', 'created_at'
@@ -20,10 +35,20 @@ class CampaignSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'name', 'description', 'platform', 'status',
             'start_date', 'end_date', 'budget', 'impressions',
-            'clicks', 'conversions', 'engagement_rate',
+            'clicks', 'conversions', 'engagements', 'spend', 'engagement_rate',
             'created_at', 'updated_at', 'metrics'
         ]
-        read_only_fields = ['created_at', 'updated_at']
+        # Totals are maintained from the campaign's metrics (campaigns.totals).
+        read_only_fields = [
+            'impressions', 'clicks', 'conversions', 'engagements', 'spend', 'engagement_rate',
+            'created_at', 'updated_at',
+        ]
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.context.get('include_metrics', True):
+            fields.pop('metrics')
+        return fields
 
     def validate_name(self, value):
         if not value or not value.strip():
@@ -40,3 +65,135 @@ class CampaignSerializer(serializers.ModelSerializer):
             if data['end_date'] < data['start_date']:
                 raise serializers.ValidationError("End date must be after start date.")
         return data
+
+    def update(self, instance, validated_data):
+        # Write only the submitted fields: a full save would put back the totals read
+        # with the instance over concurrent metric writes (campaigns.totals).
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
+
+
+class CampaignStatusSerializer(serializers.ModelSerializer):
+    """The slim representation returned by pause and resume."""
+
+    class Meta:
+        model = Campaign
+        fields = ['id', 'status', 'updated_at']
+
+
+class CampaignSelectionSerializer(serializers.Serializer):
+    """The campaigns a bulk action applies to: a list of ``ids`` or a ``filter``."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, allow_empty=False,
+        max_length=bulk.MAX_CAMPAIGNS,
+    )
+    # Comma-separated values, as in the ``platform`` and ``status`` query parameters.
+    filter = serializers.DictField(child=serializers.CharField(), required=False)
+
+    def validate_filter(self, value):
+        unknown = sorted(set(value) - {'platform', 'status'})
+        if unknown:
+            raise serializers.ValidationError(f"Unknown filter(s) {', '.join(unknown)}; expected platform, status.")
+        return value
+
+    def validate(self, data):
+        if ('ids' in data) == ('filter' in data):
+            raise serializers.ValidationError('Give either ids or filter.')
+        return data
+
+
+class BulkDuplicateSerializer(CampaignSelectionSerializer):
+    include_metrics = serializers.BooleanField(default=False)
+
+
+CENT = Decimal('0.01')
+
+
+def _decimal(value):
+    return format(value.quantize(CENT), 'f')
+
+
+def _datetime(value):
+    # Same output as serializers.DateTimeField: current timezone, UTC as 'Z'.
+    value = timezone.localtime(value).isoformat() if timezone.is_aware(value) else value.isoformat()
+    return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+
+def _date(value):
+    return value.isoformat()
+
+
+class ValuesSerializer:
+    """
+    Read-only serializer over ``QuerySet.values()`` rows.
+
+    Produces the same dicts as its ModelSerializer counterpart for reads
+    without building model instances or DRF fields per row. ``fields`` lists
+    ``(name, converter)`` pairs in output order; converters are not called
+    for ``None``.
+    """
+    fields = ()
+
+    def __init__(self, context=None):
+        self.context = context or {}
+
+    def values(self, queryset):
+        """``queryset`` as rows with every serialized field and its selected annotations."""
+        names = [name for name, _ in self.fields]
+        names += [name for name in queryset.query.annotation_select if name not in names]
+        return queryset.prefetch_related(None).values(*names)
+
+    def to_representation(self, row):
+        data = {}
+        for name, convert in self.fields:
+            value = row[name]
+            data[name] = convert(value) if convert is not None and value is not None else value
+        return data
+
+    def serialize(self, rows):
+        return [self.to_representation(row) for row in rows]
+
+
+class MetricValuesSerializer(ValuesSerializer):
+    fields = (
+        ('id', None), ('campaign', None), ('date', _date), ('impressions', None), ('clicks', None),
+        ('engagements', None), ('conversions', None), ('spend', _decimal), ('created_at', _datetime),
+    )
+
+
+class CampaignValuesSerializer(ValuesSerializer):
+    """
+    CampaignSerializer for reads. With ``include_metrics`` in the context the
+    nested metrics of all rows come from one query over ``metrics`` (a Metric
+    queryset), keeping the ``metrics_limit`` most recent per campaign.
+    """
+    fields = (
+        ('id', None), ('name', None), ('description', None), ('platform', None), ('status', None),
+        ('start_date', _date), ('end_date', _date), ('budget', _decimal), ('impressions', None),
+        ('clicks', None), ('conversions', None), ('engagements', None), ('spend', _decimal),
+        ('engagement_rate', None),
+        ('created_at', _datetime), ('updated_at', _datetime),
+    )
+
+    def nested_metrics(self, ids):
+        metrics = self.context.get('metrics', Metric.objects.all()).filter(campaign__in=ids)
+        limit = self.context.get('metrics_limit')
+        if limit:
+            metrics = metrics.annotate(
+                position=Window(RowNumber(), partition_by=F('campaign'), order_by=F('date').desc())
+            ).filter(position__lte=limit)
+        serializer = MetricValuesSerializer(self.context)
+        by_campaign = {campaign_id: [] for campaign_id in ids}
+        for row in metrics.order_by('-date').values(*(name for name, _ in serializer.fields)):
+            by_campaign[row['campaign']].append(serializer.to_representation(row))
+        return by_campaign
+
+    def serialize(self, rows):
+        data = super().serialize(rows)
+        if self.context.get('include_metrics', True) and data:
+            metrics = self.nested_metrics([item['id'] for item in data])
+            for item in data:
+                item['metrics'] = metrics[item['id']]
+        return data
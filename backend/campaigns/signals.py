@@ -0,0 +1,97 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import caching, columnar, rollups, totals
+from .models import Campaign, Metric
+
+
+@receiver(pre_save, sender=Metric)
+def remember_metric_bucket(sender, instance, **kwargs):
+    # A metric moved to another date or campaign also leaves its old bucket.
+    instance._rollup_origin = None
+    if instance.pk:
+        instance._rollup_origin = (
+            Metric.objects.filter(pk=instance.pk).values_list('campaign_id', 'date').first()
+        )
+
+
+@receiver(post_save, sender=Metric)
+def refresh_metric_rollup(sender, instance, **kwargs):
+    rollups.mark_metric(instance.campaign_id, instance.date)
+    origin = getattr(instance, '_rollup_origin', None)
+    if origin and origin != (instance.campaign_id, instance.date):
+        rollups.mark_metric(*origin)
+
+
+@receiver(post_save, sender=Metric)
+def update_campaign_totals(sender, instance, created, **kwargs):
+    if created:
+        totals.add(instance)
+        return
+    # An edited row's previous values are not known without a racy read; recompute instead.
+    campaign_ids = {instance.campaign_id}
+    origin = getattr(instance, '_rollup_origin', None)
+    if origin:
+        campaign_ids.add(origin[0])
+    totals.reconcile(campaign_ids)
+
+
+@receiver(post_save, sender=Metric)
+def reload_rewritten_metric_columns(sender, instance, created, **kwargs):
+    # New rows are appended to the columns; changed ones need a reload.
+    if not created:
+        columnar.mark_rewritten()
+
+
+@receiver(post_delete, sender=Metric)
+def reload_deleted_metric_columns(sender, instance, **kwargs):
+    columnar.mark_rewritten()
+
+
+@receiver(post_delete, sender=Metric)
+def refresh_deleted_metric_rollup(sender, instance, **kwargs):
+    rollups.mark_metric(instance.campaign_id, instance.date)
+
+
+@receiver(post_delete, sender=Metric)
+def subtract_deleted_metric(sender, instance, **kwargs):
+    if not totals.deleting(instance.campaign_id):
+        totals.add(instance, sign=-1)
+
+
+@receiver(pre_save, sender=Campaign)
+def remember_campaign_platform(sender, instance, update_fields=None, **kwargs):
+    instance._rollup_previous_platform = None
+    if instance.pk and (update_fields is None or 'platform' in update_fields):
+        instance._rollup_previous_platform = (
+            Campaign.objects.filter(pk=instance.pk).values_list('platform', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Campaign)
+def refresh_moved_campaign_rollups(sender, instance, **kwargs):
+    previous = getattr(instance, '_rollup_previous_platform', None)
+    if previous is None or previous == instance.platform:
+        return
+    dates = set(Metric.objects.filter(campaign_id=instance.pk).values_list('date', flat=True))
+    rollups.mark_buckets((day, platform) for day in dates for platform in (previous, instance.platform))
+
+
+@receiver(pre_delete, sender=Campaign)
+def remember_deleted_campaign_platform(sender, instance, **kwargs):
+    # Cascaded metric deletes are flushed after the campaign row is gone.
+    rollups.remember_platform(instance.pk, instance.platform)
+    totals.mark_deleting(instance.pk)
+
+
+@receiver(post_delete, sender=Campaign)
+def forget_deleted_campaign(sender, instance, **kwargs):
+    totals.mark_deleting(instance.pk, done=True)
+
+
+@receiver(post_save, sender=Campaign)
+@receiver(post_delete, sender=Campaign)
+@receiver(post_save, sender=Metric)
+@receiver(post_delete, sender=Metric)
+def invalidate_cached_responses(sender, **kwargs):
+    caching.invalidate()
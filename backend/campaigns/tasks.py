@@ -0,0 +1,72 @@
+"""Background job kinds for campaigns (run by the jobs app's run_jobs worker)."""
+import os
+from datetime import date
+
+from django.conf import settings
+
+from jobs.registry import task
+
+from . import exports, ingest, rollups, totals
+
+
+@task('ingest_metrics', concurrency=2)
+def ingest_metrics(job):
+    """MetricViewSet.ingest on the job's payload; ``params``: format and chunk_size."""
+    lines = job.payload.splitlines(keepends=True)
+    batches = list(ingest.ingest(lines, job.params.get('format', 'jsonl'),
+                                 job.params.get('chunk_size', ingest.DEFAULT_CHUNK_SIZE)))
+    return {'totals': ingest.summarize(batches), 'batches': batches}
+
+
+def _export(job, queryset, fields, name):
+    output = job.params.get('output', 'csv')
+    os.makedirs(settings.JOB_OUTPUT_DIR, exist_ok=True)
+    filename = f'{name}.{output}'
+    stored = f'job-{job.pk}-{filename}'
+    rows = exports.write_export(queryset, fields, output, os.path.join(settings.JOB_OUTPUT_DIR, stored))
+    return {'rows': rows, 'file': stored, 'filename': filename, 'content_type': exports.OUTPUTS[output]}
+
+
+@task('export_campaigns', concurrency=2)
+def export_campaigns(job):
+    """The campaign export for the filters in ``params`` (plus ``output``), written to a file."""
+    return _export(job, exports.campaign_rows(job.params), exports.CAMPAIGN_FIELDS, 'campaigns')
+
+
+@task('export_metrics', concurrency=2)
+def export_metrics(job):
+    return _export(job, exports.metric_rows(job.params), exports.METRIC_FIELDS, 'metrics')
+
+
+def _day(params, name):
+    return date.fromisoformat(params[name]) if params.get(name) else None
+
+
+def _check_range(params):
+    for name in ('date_from', 'date_to'):
+        try:
+            _day(params, name)
+        except (TypeError, ValueError):
+            raise ValueError(f'{name} must be a date (YYYY-MM-DD).')
+
+
+def _check_campaign_ids(params):
+    campaign_ids = params.get('campaign_ids')
+    if campaign_ids is None:
+        return
+    if not isinstance(campaign_ids, list) or not all(
+        isinstance(campaign_id, int) and not isinstance(campaign_id, bool) for campaign_id in campaign_ids
+    ):
+        raise ValueError('campaign_ids must be a list of campaign ids.')
+
+
+@task('rebuild_rollups', concurrency=1, public=True, validate=_check_range)
+def rebuild_rollups(job):
+    """rebuild_rollups over an optional ``date_from``/``date_to`` range."""
+    return rollups.rebuild(_day(job.params, 'date_from'), _day(job.params, 'date_to'))
+
+
+@task('reconcile_totals', concurrency=1, public=True, validate=_check_campaign_ids)
+def reconcile_totals(job):
+    """reconcile_totals for ``campaign_ids`` (default: all campaigns)."""
+    return {'out_of_date': totals.reconcile(job.params.get('campaign_ids'))}
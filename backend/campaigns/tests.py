@@ -1,3 +1,853 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import random
+import threading
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock, skipIf, skipUnless
+from urllib.parse import urlencode
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Sum
+from django.http import QueryDict
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import NotFound, ValidationError
+
+from . import bulk, caching, columnar, datasets, exports, ingest, rollups, search, totals, transitions
+from .models import Campaign, DailyRollup, Metric
+
+
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                           'LOCATION': 'campaigns-tests'}}
+
+
+@override_settings(CACHES=NO_CACHE)
+class QueryCountTests(TestCase):
+    """Campaign reads cost a fixed number of queries however many campaigns and platforms exist."""
+
+    @classmethod
+    def setUpTestData(cls):
+        datasets.generate(6, 5, platforms=['instagram'])
+
+    def assert_queries(self, url, count):
+        with self.assertNumQueries(count):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def assert_constant_queries(self, url, count):
+        self.assert_queries(url, count)
+        datasets.generate(20, 5, seed=1)
+        self.assertEqual(Campaign.objects.values('platform').distinct().count(), 5)
+        self.assert_queries(url, count)
+
+    def test_list(self):
+        self.assert_constant_queries('/api/campaigns/', 1)
+
+    def test_list_with_metrics(self):
+        self.assert_constant_queries('/api/campaigns/?include_metrics=true', 2)
+
+    def test_retrieve(self):
+        campaign = Campaign.objects.first()
+        self.assert_queries(f'/api/campaigns/{campaign.pk}/', 2)
+
+    def test_dashboard_stats(self):
+        self.assert_constant_queries('/api/campaigns/dashboard_stats/', 2)
+
+    def test_platform_performance(self):
+        self.assert_constant_queries('/api/campaigns/platform_performance/', 2)
+
+
+@override_settings(CACHES=NO_CACHE)
+class PaginationTests(TestCase):
+    """Keyset pagination: cursors round-trip, ties are ordered by id and bad cursors are rejected."""
+
+    @classmethod
+    def setUpTestData(cls):
+        campaigns = Campaign.objects.bulk_create([
+            Campaign(name=name, platform='tiktok', start_date=date(2024, 1, 1)) for name in 'aabbbcc'
+        ])
+        # Every campaign created at the same instant: the ordering falls back to the id.
+        Campaign.objects.update(created_at=timezone.now())
+        cls.ids = [campaign.pk for campaign in campaigns]
+        Metric.objects.bulk_create([
+            Metric(campaign=campaign, date=date(2024, 1, 1 + number % 2))
+            for number, campaign in enumerate(campaigns)
+        ])
+
+    def page(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def walk(self, url, link='next'):
+        pages = [self.page(url)]
+        while pages[-1][link]:
+            pages.append(self.page(pages[-1][link]))
+        return pages
+
+    def ids_of(self, pages):
+        return [[row['id'] for row in page['results']] for page in pages]
+
+    def test_round_trip_on_ties(self):
+        pages = self.walk('/api/campaigns/?page_size=3')
+        expected = sorted(self.ids, reverse=True)
+        self.assertEqual(self.ids_of(pages), [expected[:3], expected[3:6], expected[6:]])
+        self.assertIsNone(pages[0]['previous'])
+        backwards = self.walk(pages[-1]['previous'], 'previous')
+        self.assertEqual(self.ids_of(backwards), [expected[3:6], expected[:3]])
+        self.assertIsNone(backwards[-1]['previous'])
+
+    def test_ties_in_requested_ordering(self):
+        pages = self.walk('/api/campaigns/?ordering=name&page_size=2')
+        rows = [(row['name'], row['id']) for page in pages for row in page['results']]
+        self.assertEqual(rows, sorted(rows))
+        self.assertEqual(len(rows), 7)
+
+    def test_inserted_rows_do_not_shift_later_pages(self):
+        first = self.page('/api/campaigns/?page_size=3')
+        Campaign.objects.create(name='new', platform='tiktok', start_date=date(2024, 1, 1))
+        pages = [first] + self.walk(first['next'])
+        self.assertEqual(sum(self.ids_of(pages), []), sorted(self.ids, reverse=True))
+
+    def test_metrics_round_trip(self):
+        pages = self.walk('/api/metrics/?page_size=2')
+        rows = [(row['date'], row['id']) for page in pages for row in page['results']]
+        self.assertEqual(rows, sorted(rows, reverse=True))
+        self.assertEqual(len(rows), 7)
+
+    def test_count_is_opt_in(self):
+        self.assertNotIn('count', self.page('/api/campaigns/?page_size=3'))
+        self.assertEqual(self.page('/api/campaigns/?page_size=3&count=true')['count'], 7)
+
+    def test_malformed_cursor(self):
+        def cursor(position):
+            return base64.b64encode(urlencode({'p': position}).encode()).decode()
+
+        for value in ('garbage', cursor('[1]'), cursor('{"a": 1}'), cursor('["not a date", 1]'), cursor('[')):
+            with self.subTest(cursor=value):
+                response = self.client.get('/api/campaigns/', {'cursor': value})
+                self.assertEqual(response.status_code, 404)
+
+
+@override_settings(CACHES=NO_CACHE)
+class SearchTests(TestCase):
+    """?search=: platform and status terms, full-text ranking on PostgreSQL, icontains elsewhere."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Campaign.objects.bulk_create([
+            Campaign(name=name, description=description, platform=platform, status=status,
+                     start_date=date(2024, 1, 1))
+            for name, description, platform, status in (
+                ('Summer Sale', 'Beach promotion', 'instagram', Campaign.ACTIVE),
+                ('Winter Promo', 'Summer leftovers', 'facebook', Campaign.PAUSED),
+                ('Spring Launch', 'New product', 'tiktok', Campaign.ACTIVE),
+            )
+        ])
+
+    def names(self, query):
+        response = self.client.get(f'/api/campaigns/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return [row['name'] for row in response.json()['results']]
+
+    def test_platform_and_status_terms(self):
+        self.assertEqual(self.names('search=instagram'), ['Summer Sale'])
+        self.assertEqual(sorted(self.names('search=active')), ['Spring Launch', 'Summer Sale'])
+        self.assertEqual(self.names('search=paused summer'), ['Winter Promo'])
+        self.assertEqual(self.names('search=tiktok summer'), [])
+
+    def test_all_text_terms_must_match(self):
+        self.assertEqual(self.names('search=summer sale'), ['Summer Sale'])
+        self.assertEqual(self.names('search=launch product'), ['Spring Launch'])
+        self.assertEqual(self.names('search=autumn'), [])
+
+    def test_substring(self):
+        queryset = search.CampaignSearchFilter().substring(Campaign.objects.all(), ['UMME', 'promo'],
+                                                           ['name', 'description'])
+        self.assertEqual(sorted(queryset.values_list('name', flat=True)), ['Summer Sale', 'Winter Promo'])
+
+    @skipIf(connection.vendor == 'postgresql', 'PostgreSQL uses full-text search')
+    def test_icontains_fallback(self):
+        self.assertEqual(sorted(self.names('search=umme')), ['Summer Sale', 'Winter Promo'])
+        self.assertEqual(self.names('search=ing lau'), ['Spring Launch'])
+
+    @skipUnless(connection.vendor == 'postgresql', 'full-text search needs PostgreSQL')
+    def test_name_matches_rank_first(self):
+        self.assertEqual(self.names('search=summer'), ['Summer Sale', 'Winter Promo'])
+        self.assertEqual(self.names('search=summ'), ['Summer Sale', 'Winter Promo'])
+        self.assertEqual(self.names('search=summer&ordering=-name'), ['Winter Promo', 'Summer Sale'])
+        self.assertEqual(self.names('search=umme'), [])
+
+    @skipUnless(connection.vendor == 'postgresql', 'full-text search needs PostgreSQL')
+    def test_ranked_pages(self):
+        first = self.client.get('/api/campaigns/?search=summer&page_size=1').json()
+        second = self.client.get(first['next']).json()
+        self.assertEqual([row['name'] for row in first['results'] + second['results']],
+                         ['Summer Sale', 'Winter Promo'])
+        self.assertIsNone(second['next'])
+
+    @skipUnless(connection.vendor == 'postgresql', 'trigram search needs PostgreSQL')
+    def test_typos_with_trigram(self):
+        if not search.has_trigram(connection.alias):
+            self.skipTest('pg_trgm is not installed')
+        self.assertEqual(self.names('search=Sumer'), ['Summer Sale'])
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class CachingTests(TestCase):
+    """Cached analytics responses are invalidated by writes and revalidated with ETags."""
+
+    @classmethod
+    def setUpTestData(cls):
+        datasets.generate(4, 5)
+        cls.campaign = Campaign.objects.order_by('pk').first()
+
+    def setUp(self):
+        cache.clear()
+
+    def add_metric(self, impressions=1000):
+        # on_commit callbacks (the version bump) only run when captured inside TestCase.
+        with self.captureOnCommitCallbacks(execute=True):
+            Metric.objects.create(campaign=self.campaign, date=date(2020, 1, 1), impressions=impressions)
+
+    def test_write_bumps_version_on_commit(self):
+        version = caching.data_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Metric.objects.create(campaign=self.campaign, date=date(2020, 1, 1), impressions=1000)
+            self.assertEqual(caching.data_version(), version)
+        self.assertGreater(caching.data_version(), version)
+
+    def test_cached_response_rebuilt_after_write(self):
+        url = '/api/campaigns/dashboard_stats/'
+        first = self.client.get(url)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.json(), first.json())
+
+        self.add_metric(impressions=1000)
+        third = self.client.get(url)
+        self.assertEqual(third['X-Cache'], 'MISS')
+        self.assertEqual(third.json()['total_impressions'], first.json()['total_impressions'] + 1000)
+
+    def test_if_none_match(self):
+        url = '/api/campaigns/platform_performance/'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        self.add_metric()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_async_active_shares_sync_payload(self):
+        campaign_id = Metric.objects.values('campaign').annotate(count=Count('id')).filter(count__gt=2)[0]['campaign']
+        Campaign.objects.filter(pk=campaign_id).update(status=Campaign.ACTIVE)
+        url = 'campaigns/active/?include_metrics=true&metrics_limit=2'
+        fresh = self.client.get(f'/api/{url}').json()
+        self.assertEqual([len(row['metrics']) for row in fresh if row['id'] == campaign_id], [2])
+        cache.clear()
+        self.assertEqual(self.client.get(f'/api/async/{url}')['X-Cache'], 'MISS')
+        response = self.client.get(f'/api/{url}')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.json(), fresh)
+
+    def test_pause_and_resume_invalidate(self):
+        url = '/api/campaigns/active/'
+        Campaign.objects.filter(pk=self.campaign.pk).update(status=Campaign.ACTIVE)
+        for action, listed in (('pause', False), ('resume', True)):
+            etag = self.client.get(url)['ETag']
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(self.client.post(f'/api/campaigns/{self.campaign.pk}/{action}/').status_code, 200)
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['X-Cache'], 'MISS')
+            self.assertEqual(self.campaign.pk in [row['id'] for row in response.json()], listed)
+
+
+class ExportMemoryTests(TestCase):
+    """Exports stream: peak memory stays flat however many rows are exported."""
+
+    ROWS = 10 * exports.CHUNK_SIZE
+    MAX_PEAK = 4 * 2 ** 20
+
+    @classmethod
+    def setUpTestData(cls):
+        campaigns = Campaign.objects.bulk_create([
+            Campaign(name=f'Export {i}', platform='tiktok', start_date=date(2024, 1, 1)) for i in range(100)
+        ])
+        Metric.objects.bulk_create([
+            Metric(campaign=campaign, date=date(2024, 1, 1) + timedelta(days=day), impressions=day, spend='1.50')
+            for campaign in campaigns for day in range(cls.ROWS // len(campaigns))
+        ], batch_size=5000)
+
+    def assert_streams(self, output):
+        tracemalloc.start()
+        try:
+            response = self.client.get(f'/api/metrics/export/?output={output}')
+            lines = sum(chunk.count(b'\n') for chunk in response.streaming_content)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(lines, self.ROWS + (output == 'csv'))
+        self.assertLess(peak, self.MAX_PEAK)
+
+    def test_csv(self):
+        self.assert_streams('csv')
+
+    def test_ndjson(self):
+        self.assert_streams('ndjson')
+
+
+@override_settings(CACHES=NO_CACHE)
+class TotalsTests(TransactionTestCase):
+    """Campaign totals equal their metric sums after parallel writes, deletes and reconcile."""
+
+    def setUp(self):
+        self.campaign_ids = [
+            Campaign.objects.create(name=f'Contended {i}', platform='tiktok', start_date=date(2024, 1, 1)).pk
+            for i in range(3)
+        ]
+
+    def assert_totals_match(self):
+        self.assertEqual(totals.reconcile(dry_run=True), 0)
+        for campaign in Campaign.objects.all():
+            sums = campaign.metrics.aggregate(**{field: Sum(field) for field in totals.TOTAL_FIELDS})
+            for field in totals.TOTAL_FIELDS:
+                self.assertEqual(getattr(campaign, field), sums[field] or 0, field)
+
+    def write(self, number, operations=40):
+        rng = random.Random(number)
+        try:
+            for offset in range(operations):
+                # Each writer owns a slice of dates, so inserts never collide on (campaign, date).
+                Metric.objects.create(
+                    campaign_id=rng.choice(self.campaign_ids),
+                    date=date(2024, 1, 1) + timedelta(days=number * operations + offset),
+                    impressions=rng.randint(0, 10000), engagements=rng.randint(0, 500),
+                    clicks=rng.randint(0, 300), spend=Decimal(rng.randint(0, 5000)) / 100,
+                )
+        finally:
+            connection.close()
+
+    # SQLite serializes writers; the in-memory test database also fails them spuriously under threads.
+    @skipUnless(connection.vendor == 'postgresql', 'needs concurrent row-level writers')
+    def test_parallel_writers(self):
+        threads = [threading.Thread(target=self.write, args=(number,)) for number in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(Metric.objects.count(), 160)
+        self.assert_totals_match()
+
+    def test_delete_subtracts(self):
+        self.write(0)
+        campaign_id = self.campaign_ids[0]
+        before = Campaign.objects.get(pk=campaign_id)
+        metric = Metric.objects.filter(campaign_id=campaign_id).first()
+        metric.delete()
+        after = Campaign.objects.get(pk=campaign_id)
+        self.assertEqual(after.impressions, before.impressions - metric.impressions)
+        self.assertEqual(after.spend, before.spend - metric.spend)
+        Metric.objects.filter(campaign_id=self.campaign_ids[1]).delete()
+        self.assertEqual(Campaign.objects.get(pk=self.campaign_ids[1]).impressions, 0)
+        self.assert_totals_match()
+
+    def test_reconcile_fixes_drift(self):
+        self.write(0)
+        Metric.objects.filter(campaign_id=self.campaign_ids[0]).update(impressions=7)
+        self.assertEqual(totals.reconcile(dry_run=True), 1)
+        self.assertEqual(totals.reconcile([self.campaign_ids[1]]), 0)
+        self.assertEqual(totals.reconcile(), 1)
+        self.assert_totals_match()
+        campaign = Campaign.objects.get(pk=self.campaign_ids[0])
+        self.assertEqual(campaign.impressions, 7 * campaign.metrics.count())
+
+
+class IngestTests(TestCase):
+    """Ingestion of JSON Lines and CSV: rejected rows, duplicates and inserted/updated counts."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.first, cls.second = Campaign.objects.bulk_create([
+            Campaign(name=name, platform='tiktok', start_date=date(2024, 1, 1)) for name in ('First', 'Second')
+        ])
+
+    def row(self, campaign=None, day='2024-01-01', **values):
+        return {'campaign': self.first.pk if campaign is None else campaign, 'date': day, **values}
+
+    def run_ingest(self, body, fmt='jsonl', chunk_size=ingest.DEFAULT_CHUNK_SIZE):
+        if isinstance(body, list):
+            body = ''.join(json.dumps(row) + '\n' for row in body)
+        if isinstance(body, str):
+            body = body.encode()
+        return list(ingest.ingest(ingest.decode_lines(io.BytesIO(body)), fmt, chunk_size))
+
+    def assert_counts(self, batches, inserted=0, updated=0, rejected=0):
+        totals_ = ingest.summarize(batches)
+        self.assertEqual((totals_['inserted'], totals_['updated'], totals_['rejected']),
+                         (inserted, updated, rejected), batches)
+
+    def test_jsonl_inserts_then_updates(self):
+        self.assert_counts(self.run_ingest([
+            self.row(impressions=100, spend='1.50'),
+            self.row(self.second.pk, impressions=200),
+        ]), inserted=2)
+        self.assert_counts(self.run_ingest([
+            self.row(impressions=150, engagements=3),
+            self.row(day='2024-01-02', impressions=1),
+        ]), inserted=1, updated=1)
+        metric = Metric.objects.get(campaign=self.first, date=date(2024, 1, 1))
+        self.assertEqual((metric.impressions, metric.engagements, metric.spend), (150, 3, Decimal('0.00')))
+        self.assertEqual(Campaign.objects.get(pk=self.first.pk).impressions, 151)
+        self.assertEqual(totals.reconcile(dry_run=True), 0)
+
+    def test_counts_across_chunks(self):
+        rows = [self.row(day=f'2024-01-0{day}', impressions=day) for day in range(1, 6)]
+        batches = self.run_ingest(rows, chunk_size=2)
+        self.assertEqual([batch['received'] for batch in batches], [2, 2, 1])
+        self.assert_counts(batches, inserted=5)
+        self.assert_counts(self.run_ingest(rows[3:] + [self.row(day='2024-01-06')], chunk_size=2),
+                           inserted=1, updated=2)
+
+    def test_csv(self):
+        body = (
+            'campaign,date,impressions,clicks,spend\n'
+            f'{self.first.pk},2024-01-01,100,5,2.50\n'
+            f'{self.second.pk},2024-01-01,1.5,5,2.50\n'
+            f'{self.second.pk},2024-01-02,,,\n'
+        )
+        batches = self.run_ingest(body, 'csv')
+        self.assert_counts(batches, inserted=2, rejected=1)
+        self.assertEqual(batches[0]['errors'], [{'line': 3, 'error': 'impressions: enter a whole number.'}])
+        self.assertEqual(Metric.objects.get(campaign=self.second).impressions, 0)
+
+    def test_undecodable_and_malformed_jsonl(self):
+        body = b''.join([
+            json.dumps(self.row()).encode() + b'\n',
+            b'\xff\xfe\n',
+            b'{not json\n',
+            b'\n',
+            b'[1, 2]\n',
+            json.dumps(self.row(day='2024-01-02')).encode() + b'\n',
+        ])
+        batches = self.run_ingest(body)
+        self.assert_counts(batches, inserted=2, rejected=3)
+        self.assertEqual([error['line'] for error in batches[0]['errors']], [2, 3, 5])
+        self.assertTrue(all(error['error'].startswith('Malformed row') for error in batches[0]['errors']))
+
+    def test_undecodable_csv_line(self):
+        body = (
+            b'campaign,date,impressions\n'
+            + f'{self.first.pk},2024-01-01,1\n'.encode()
+            + b'\xff,2024-01-02,1\n'
+            + f'{self.first.pk},2024-01-03,oops\n'.encode()
+        )
+        batches = self.run_ingest(body, 'csv')
+        self.assert_counts(batches, inserted=1, rejected=2)
+        self.assertEqual([error['line'] for error in batches[0]['errors']], [3, 4])
+
+    def test_duplicate_rows_in_batch(self):
+        batches = self.run_ingest([self.row(impressions=1), self.row(impressions=2)])
+        self.assert_counts(batches, inserted=1, rejected=1)
+        self.assertEqual(batches[0]['errors'][0],
+                         {'line': 1, 'error': 'Superseded by line 2 for the same campaign and date.'})
+        self.assertEqual(Metric.objects.get().impressions, 2)
+
+    def test_unknown_campaign(self):
+        batches = self.run_ingest([self.row(999999), self.row()])
+        self.assert_counts(batches, inserted=1, rejected=1)
+        self.assertEqual(batches[0]['errors'][0]['error'], 'campaign: campaign 999999 does not exist.')
+
+    def test_campaign_ids(self):
+        for campaign in (str(self.first.pk), float(self.first.pk)):
+            with self.subTest(campaign=campaign):
+                self.assertEqual(ingest.parse_row(self.row(campaign))[0], self.first.pk)
+        rows = [self.row(campaign) for campaign in (True, 3.7, '3.7', '', 0, -1, 10 ** 30, [1])]
+        for row in rows + [{'date': '2024-01-01'}]:
+            with self.subTest(row=row):
+                with self.assertRaisesMessage(ValueError, 'campaign: a campaign id is required.'):
+                    ingest.parse_row(row)
+
+    def test_invalid_values(self):
+        for values, error in (
+            ({'day': '2024-02-30'}, 'date:'),
+            ({'impressions': True}, 'impressions: enter a whole number.'),
+            ({'clicks': 2.5}, 'clicks: enter a whole number.'),
+            ({'engagements': -1}, 'engagements: must be between'),
+            ({'conversions': 2 ** 31}, 'conversions: must be between'),
+            ({'spend': 'NaN'}, 'spend: enter a number.'),
+            ({'spend': True}, 'spend: enter a number.'),
+            ({'spend': '-0.01'}, 'spend: must be between'),
+        ):
+            with self.subTest(values=values):
+                with self.assertRaisesMessage(ValueError, error):
+                    ingest.parse_row(self.row(**values))
+
+    def test_endpoint(self):
+        body = f'campaign,date,impressions\n{self.first.pk},2024-01-01,10\n'
+        response = self.client.post('/api/metrics/ingest/', body, content_type='text/csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['totals'], {'received': 1, 'inserted': 1, 'updated': 0, 'rejected': 0})
+
+
+class BulkTests(TestCase):
+    """Bulk status changes and duplicates: per-id outcomes and the rollups and totals of copies."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.active, cls.paused, cls.draft, cls.completed = Campaign.objects.bulk_create([
+            Campaign(name=status, platform=platform, status=status, start_date=date(2024, 1, 1))
+            for status, platform in ((Campaign.ACTIVE, 'facebook'), (Campaign.PAUSED, 'facebook'),
+                                     (Campaign.DRAFT, 'instagram'), (Campaign.COMPLETED, 'tiktok'))
+        ])
+        Metric.objects.bulk_create([
+            Metric(campaign=cls.active, date=date(2024, 1, day), impressions=100 * day, engagements=day,
+                   spend='2.50')
+            for day in range(1, 4)
+        ])
+        rollups.rebuild()
+        totals.reconcile()
+
+    def statuses(self):
+        return dict(Campaign.objects.values_list('pk', 'status'))
+
+    def test_set_status_outcomes(self):
+        ids = [self.active.pk, self.paused.pk, self.draft.pk, self.completed.pk, 999999, self.active.pk]
+        counts, results = bulk.set_status(Campaign.PAUSED, ids)
+        self.assertEqual(counts, {'updated': 1, 'unchanged': 1, 'not_allowed': 2, 'not_found': 1})
+        self.assertEqual([(result['id'], result['outcome']) for result in results], [
+            (self.active.pk, 'updated'), (self.paused.pk, 'unchanged'), (self.draft.pk, 'not_allowed'),
+            (self.completed.pk, 'not_allowed'), (999999, 'not_found'),
+        ])
+        self.assertEqual(self.statuses()[self.active.pk], Campaign.PAUSED)
+
+    def test_set_status_by_filter(self):
+        counts, results = bulk.set_status(Campaign.ACTIVE, filters={'platform': 'facebook,instagram'})
+        self.assertEqual(counts, {'updated': 2, 'unchanged': 1, 'not_allowed': 0, 'not_found': 0})
+        self.assertEqual([result['id'] for result in results], [self.active.pk, self.paused.pk, self.draft.pk])
+        self.assertEqual(self.statuses()[self.completed.pk], Campaign.COMPLETED)
+
+    def test_filter_cap(self):
+        with mock.patch.object(bulk, 'MAX_CAMPAIGNS', 3):
+            with self.assertRaises(ValidationError):
+                bulk.set_status(Campaign.PAUSED, filters={})
+            with self.assertRaises(ValidationError):
+                bulk.duplicate(filters={'status': 'active,paused,draft,completed'})
+            self.assertEqual(bulk.set_status(Campaign.PAUSED, filters={'platform': 'facebook'})[0]['updated'], 1)
+        self.assertEqual(Campaign.objects.count(), 4)
+
+    def test_duplicate_repeated_ids(self):
+        counts, results = bulk.duplicate([self.draft.pk, 999999, self.draft.pk])
+        self.assertEqual(counts, {'duplicated': 1, 'not_found': 1, 'metrics_copied': 0})
+        self.assertEqual([result['outcome'] for result in results], ['duplicated', 'not_found'])
+        copy = Campaign.objects.get(pk=results[0]['copy_id'])
+        self.assertEqual((copy.name, copy.status, copy.impressions), ('draft (Copy)', Campaign.DRAFT, 0))
+
+    def test_duplicate_with_metrics(self):
+        counts, results = bulk.duplicate([self.active.pk], include_metrics=True)
+        self.assertEqual(counts['metrics_copied'], 3)
+        copy = Campaign.objects.get(pk=results[0]['copy_id'])
+        source = Campaign.objects.get(pk=self.active.pk)
+        for field in totals.TOTAL_FIELDS + ('engagement_rate',):
+            self.assertEqual(getattr(copy, field), getattr(source, field), field)
+        self.assertEqual(totals.reconcile(dry_run=True), 0)
+        self.assertEqual(rollups.rebuild(dry_run=True), {'created': 0, 'updated': 0, 'deleted': 0, 'unchanged': 3})
+        rollup = DailyRollup.objects.get(date=date(2024, 1, 2), platform='facebook')
+        self.assertEqual((rollup.metric_count, rollup.impressions), (2, 400))
+
+    def test_endpoint_repeated_ids(self):
+        response = self.client.post('/api/campaigns/bulk_pause/', {'ids': [self.active.pk, self.active.pk]},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['updated'], len(response.json()['results'])), (1, 1))
+
+
+@override_settings(CACHES=NO_CACHE)
+class ComparisonTests(TestCase):
+    """KPI endpoints over a date range and compared with the previous period match the ORM sums."""
+
+    FIELDS = ('impressions', 'clicks', 'engagements', 'conversions', 'spend')
+    CURRENT = (date(2024, 6, 16), date(2024, 6, 30))
+    PREVIOUS = (date(2024, 6, 1), date(2024, 6, 15))
+
+    @classmethod
+    def setUpTestData(cls):
+        datasets.generate(10, 40, end_date=date(2024, 6, 30), seed=3)
+
+    def sums(self, dates, **filters):
+        sums = Metric.objects.filter(date__range=dates, **filters).aggregate(
+            **{field: Sum(field) for field in self.FIELDS})
+        return {field: value or 0 for field, value in sums.items()}
+
+    def assert_kpis(self, kpis, sums, prefix='total_', ctr='avg_ctr'):
+        for field in self.FIELDS:
+            self.assertAlmostEqual(kpis[prefix + field], float(sums[field]), places=2, msg=field)
+        expected = sums['clicks'] / sums['impressions'] * 100 if sums['impressions'] else 0
+        self.assertAlmostEqual(kpis[ctr], expected, places=2)
+
+    def test_dashboard_range(self):
+        response = self.client.get('/api/campaigns/dashboard_stats/?date_from=2024-06-16&date_to=2024-06-30')
+        self.assert_kpis(response.json(), self.sums(self.CURRENT))
+        self.assertEqual(response.json()['total_campaigns'], 10)
+
+    def test_dashboard_compare(self):
+        data = self.client.get(
+            '/api/campaigns/dashboard_stats/?date_from=2024-06-16&date_to=2024-06-30&compare=true').json()
+        current, previous = self.sums(self.CURRENT), self.sums(self.PREVIOUS)
+        self.assert_kpis(data['current'], current)
+        self.assert_kpis(data['previous'], previous)
+        change = data['change']['total_impressions']
+        self.assertEqual(change['absolute'], current['impressions'] - previous['impressions'])
+        self.assertAlmostEqual(
+            change['percent'], (current['impressions'] - previous['impressions']) / previous['impressions'] * 100,
+            places=2)
+        self.assertEqual(data['change']['total_campaigns'], {'absolute': 0, 'percent': 0.0})
+
+    def test_platform_compare(self):
+        data = self.client.get(
+            '/api/campaigns/platform_performance/?date_from=2024-06-16&date_to=2024-06-30&compare=true').json()
+        platforms = sorted(set(Campaign.objects.values_list('platform', flat=True)))
+        self.assertEqual([row['platform'] for row in data], platforms)
+        for row in data:
+            for period, dates in (('current', self.CURRENT), ('previous', self.PREVIOUS)):
+                self.assert_kpis(row[period], self.sums(dates, campaign__platform=row['platform']), ctr='ctr')
+
+    def test_invalid_ranges(self):
+        for query in ('compare=true', 'compare=true&date_from=2024-06-16',
+                      'date_from=2024-06-30&date_to=2024-06-01'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f'/api/campaigns/dashboard_stats/?{query}').status_code, 400)
+
+
+@skipUnless(columnar.numpy(), 'needs NumPy')
+@override_settings(CACHES=LOCAL_CACHE, COLUMNAR_ANALYTICS=True)
+class ColumnarTests(TestCase):
+    """The in-memory columnar engine answers queries exactly as the ORM aggregation does."""
+
+    QUERIES = (
+        '',
+        'group_by=platform',
+        'group_by=platform,status',
+        'group_by=campaign&kpis=total_impressions,ctr,cpc',
+        'group_by=date&platform=facebook,instagram',
+        'group_by=week,status&date_from=2024-06-05&date_to=2024-06-25',
+        'group_by=month&status=active',
+        'group_by=date&campaign=1',
+        'group_by=platform&date_from=2030-01-01',
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        datasets.generate(12, 60, end_date=date(2024, 6, 30), seed=4)
+        cls.campaign = Campaign.objects.order_by('pk').first()
+
+    def setUp(self):
+        cache.clear()
+        # Each test loads its own columns from its own data.
+        patcher = mock.patch.object(columnar, '_columns', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assert_matches_orm(self, query):
+        spec = columnar.parse_query(QueryDict(query.replace('campaign=1', f'campaign={self.campaign.pk}')))
+        self.assertEqual(columnar.frame().query(**spec), columnar.orm_query(**spec), query)
+
+    def test_queries_match_orm(self):
+        for query in self.QUERIES:
+            with self.subTest(query=query):
+                self.assert_matches_orm(query)
+
+    def test_endpoint(self):
+        response = self.client.get('/api/metrics/query/?group_by=platform&kpis=total_impressions,total_spend')
+        self.assertEqual(response.status_code, 200)
+        spec = columnar.parse_query(QueryDict('group_by=platform&kpis=total_impressions,total_spend'))
+        self.assertEqual(response.json(), json.loads(json.dumps(columnar.orm_query(**spec))))
+
+    def test_sees_new_and_edited_rows(self):
+        self.assert_matches_orm('group_by=campaign')
+        with self.captureOnCommitCallbacks(execute=True):
+            Metric.objects.create(campaign=self.campaign, date=date(2024, 7, 1), impressions=1000, spend='5.00')
+        self.assert_matches_orm('group_by=campaign')
+        metric = Metric.objects.filter(campaign=self.campaign).order_by('pk').first()
+        metric.clicks += 7
+        with self.captureOnCommitCallbacks(execute=True):
+            metric.save()
+        self.assert_matches_orm('group_by=campaign')
+        with self.captureOnCommitCallbacks(execute=True):
+            Metric.objects.filter(date=date(2024, 6, 30)).delete()
+        self.assert_matches_orm('group_by=date')
+
+    def test_rejects_unknown_dimensions_and_kpis(self):
+        for query in ('group_by=country', 'kpis=total_campaigns', 'campaign=x'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f'/api/metrics/query/?{query}').status_code, 400)
+
+
+@override_settings(CACHES=NO_CACHE)
+class LeaderboardTests(TestCase):
+    """Leaderboards rank campaigns as sorting the ORM sums of their metrics does."""
+
+    FIELDS = ('impressions', 'clicks', 'engagements', 'conversions', 'spend')
+
+    @classmethod
+    def setUpTestData(cls):
+        datasets.generate(30, 20, end_date=date(2024, 6, 30), seed=5)
+
+    def board(self, query):
+        response = self.client.get(f'/api/campaigns/leaderboard/?{query}')
+        self.assertEqual(response.status_code, 200, query)
+        return response.json()
+
+    def expected(self, kpi, dates=None, min_impressions=0, limit=10, per_platform=False):
+        metrics = Metric.objects.all() if dates is None else Metric.objects.filter(date__range=dates)
+        sums = metrics.values('campaign', 'campaign__platform').annotate(
+            **{f'sum_{field}': Sum(field) for field in self.FIELDS})
+        scored = []
+        for row in sums:
+            impressions, clicks = row['sum_impressions'], row['sum_clicks']
+            spend, conversions = float(row['sum_spend']), row['sum_conversions']
+            if impressions < min_impressions:
+                continue
+            if kpi == 'ctr':
+                value = clicks * 100 / impressions if impressions else None
+            elif kpi == 'cpc':
+                value = spend / clicks if clicks else None
+            elif kpi == 'roi':
+                value = (conversions * 100 - spend) * 100 / spend if spend else None
+            else:
+                value = float(row[f'sum_{kpi}'])
+            if value is not None:
+                scored.append((row['campaign__platform'], row['campaign'], value))
+        sign = 1 if kpi == 'cpc' else -1
+        scored.sort(key=lambda item: (sign * item[2], item[1]))
+        if not per_platform:
+            return [(campaign, round(value, 2)) for _, campaign, value in scored[:limit]]
+        boards = {}
+        for platform, campaign, value in scored:
+            top = boards.setdefault(platform, [])
+            if len(top) < limit:
+                top.append((campaign, round(value, 2)))
+        return dict(sorted(boards.items()))
+
+    def ranked(self, entries):
+        self.assertEqual([entry['rank'] for entry in entries], list(range(1, len(entries) + 1)))
+        return [(entry['id'], entry['value']) for entry in entries]
+
+    def test_overall_matches_orm(self):
+        for kpi in ('impressions', 'spend', 'ctr', 'cpc', 'roi'):
+            with self.subTest(kpi=kpi):
+                self.assertEqual(self.ranked(self.board(f'kpi={kpi}')['results']), self.expected(kpi))
+
+    def test_window_matches_orm(self):
+        dates = (date(2024, 6, 21), date(2024, 6, 30))
+        for kpi in ('clicks', 'ctr', 'roi'):
+            with self.subTest(kpi=kpi):
+                results = self.board(f'kpi={kpi}&date_from=2024-06-21&date_to=2024-06-30&limit=5')['results']
+                self.assertEqual(self.ranked(results), self.expected(kpi, dates, limit=5))
+
+    def test_per_platform_matches_orm(self):
+        platforms = self.board('kpi=ctr&per_platform=true&limit=3&min_impressions=1000')['platforms']
+        expected = self.expected('ctr', min_impressions=1000, limit=3, per_platform=True)
+        self.assertEqual({platform: self.ranked(top) for platform, top in platforms.items()}, expected)
+
+    def test_entry_totals(self):
+        entry = self.board('kpi=clicks&limit=1')['results'][0]
+        sums = Metric.objects.filter(campaign=entry['id']).aggregate(
+            **{field: Sum(field) for field in self.FIELDS})
+        for field in self.FIELDS:
+            self.assertAlmostEqual(entry[field], float(sums[field]), places=2, msg=field)
+
+    def test_ties_go_to_lower_id(self):
+        ids = [Campaign.objects.create(name=f'Tied {i}', platform='tiktok', start_date=date(2024, 1, 1)).pk
+               for i in range(3)]
+        Metric.objects.bulk_create([Metric(campaign_id=pk, date=date(2030, 1, 1), impressions=50, clicks=5)
+                                    for pk in reversed(ids)])
+        for query in ('kpi=clicks', 'kpi=ctr&per_platform=true'):
+            with self.subTest(query=query):
+                data = self.board(f'{query}&date_from=2030-01-01')
+                entries = data['results'] if 'results' in data else data['platforms']['tiktok']
+                self.assertEqual([entry['id'] for entry in entries], ids)
+
+    def test_rejects_unknown_kpi_and_order(self):
+        for query in ('kpi=budget', 'order=up'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f'/api/campaigns/leaderboard/?{query}').status_code, 400)
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class TransitionTests(TestCase):
+    """Pause and resume: one conditional UPDATE, read back only when it matched nothing."""
+
+    def setUp(self):
+        cache.clear()
+        self.campaigns = {
+            status: Campaign.objects.create(name=status, platform='tiktok', status=status,
+                                            start_date=date(2024, 1, 1), impressions=500)
+            for status in (Campaign.DRAFT, Campaign.ACTIVE, Campaign.PAUSED, Campaign.COMPLETED)
+        }
+
+    def status(self, current):
+        return Campaign.objects.get(pk=self.campaigns[current].pk).status
+
+    def test_updated(self):
+        for current, target in ((Campaign.ACTIVE, Campaign.PAUSED), (Campaign.PAUSED, Campaign.ACTIVE),
+                                (Campaign.DRAFT, Campaign.ACTIVE)):
+            with self.subTest(current=current, target=target):
+                campaign, outcome = transitions.transition(self.campaigns[current].pk, target)
+                self.assertEqual((campaign['status'], outcome), (target, transitions.UPDATED))
+                self.assertEqual(self.status(current), target)
+        self.assertEqual(Campaign.objects.get(pk=self.campaigns[Campaign.ACTIVE].pk).impressions, 500)
+
+    def test_unchanged(self):
+        campaign, outcome = transitions.transition(self.campaigns[Campaign.PAUSED].pk, Campaign.PAUSED)
+        self.assertEqual((campaign['status'], outcome), (Campaign.PAUSED, transitions.UNCHANGED))
+
+    def test_not_allowed(self):
+        for current, target in ((Campaign.DRAFT, Campaign.PAUSED), (Campaign.COMPLETED, Campaign.PAUSED),
+                                (Campaign.COMPLETED, Campaign.ACTIVE)):
+            with self.subTest(current=current, target=target):
+                with self.assertRaises(transitions.TransitionNotAllowed):
+                    transitions.transition(self.campaigns[current].pk, target)
+                self.assertEqual(self.status(current), current)
+
+    def test_not_found(self):
+        active = self.campaigns[Campaign.ACTIVE].pk
+        for pk, queryset in ((10 ** 6, None), ('abc', None), (None, None),
+                             (active, Campaign.objects.exclude(pk=active))):
+            with self.subTest(pk=pk):
+                with self.assertRaises(NotFound):
+                    transitions.transition(pk, Campaign.PAUSED, queryset)
+        self.assertEqual(self.status(Campaign.ACTIVE), Campaign.ACTIVE)
+
+    def test_endpoints(self):
+        active, completed = self.campaigns[Campaign.ACTIVE].pk, self.campaigns[Campaign.COMPLETED].pk
+        for path, status_code, outcome in (
+            (f'/api/campaigns/{active}/pause/', 200, transitions.UPDATED),
+            (f'/api/campaigns/{active}/pause/', 200, transitions.UNCHANGED),
+            (f'/api/campaigns/{active}/resume/', 200, transitions.UPDATED),
+            (f'/api/campaigns/{completed}/pause/', 409, None),
+            ('/api/campaigns/999999/resume/', 404, None),
+        ):
+            with self.subTest(path=path, outcome=outcome):
+                response = self.client.post(path)
+                self.assertEqual(response.status_code, status_code)
+                if outcome:
+                    self.assertEqual(response.json()['outcome'], outcome)
+
+    def test_invalidates_cached_responses(self):
+        active = self.campaigns[Campaign.ACTIVE].pk
+        self.assertEqual([row['id'] for row in self.client.get('/api/campaigns/active/').json()], [active])
+        # The UPDATE bypasses the model signals that would invalidate the cached list.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/campaigns/{active}/pause/')
+        self.assertEqual(self.client.get('/api/campaigns/active/').json(), [])
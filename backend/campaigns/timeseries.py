@@ -0,0 +1,109 @@
+"""
+Server-side bucketed time series over Metric or DailyRollup rows.
+
+Buckets are computed in the database with TruncDay/TruncWeek/TruncMonth and
+one grouped query; missing buckets are filled with zeros. Series are
+returned column-wise (one array per KPI) to keep long ranges compact.
+"""
+from datetime import date, timedelta
+
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from rest_framework.exceptions import ValidationError
+
+from .analytics import agroup_kpis, evaluate, group_kpis, resolve
+
+
+INTERVALS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+MAX_BUCKETS = 3660
+
+# Series name -> KPI name.
+SERIES_KPIS = {
+    'impressions': 'total_impressions',
+    'clicks': 'total_clicks',
+    'engagements': 'total_engagements',
+    'conversions': 'total_conversions',
+    'spend': 'total_spend',
+    'ctr': 'ctr',
+    'engagement_rate': 'engagement_rate',
+    'conversion_rate': 'conversion_rate',
+    'cpc': 'cpc',
+}
+
+
+def bucket_start(day, interval):
+    if interval == 'week':
+        return day - timedelta(days=day.weekday())
+    if interval == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(day, interval):
+    if interval == 'week':
+        return day + timedelta(days=7)
+    if interval == 'month':
+        return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+    return day + timedelta(days=1)
+
+
+def bucket_range(first, last, interval):
+    """Every bucket start from the bucket holding ``first`` to the one holding ``last``."""
+    buckets = []
+    current, last = bucket_start(first, interval), bucket_start(last, interval)
+    while current <= last:
+        if len(buckets) == MAX_BUCKETS:
+            raise ValidationError({'interval': f'The range spans more than {MAX_BUCKETS} buckets; '
+                                               'narrow it or use a coarser interval.'})
+        buckets.append(current)
+        current = next_bucket(current, interval)
+    return buckets
+
+
+def bucketed(queryset, interval, date_from=None, date_to=None):
+    """Restrict ``queryset`` to the range and annotate each row with its ``bucket``."""
+    if interval not in INTERVALS:
+        raise ValidationError({'interval': f"Expected one of {', '.join(INTERVALS)}."})
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+    return queryset.annotate(bucket=INTERVALS[interval]('date'))
+
+
+def fill(rows, interval, date_from=None, date_to=None):
+    """Lay grouped rows out as gap-filled columns."""
+    by_bucket = {row.pop('bucket'): row for row in rows}
+    first = date_from or min(by_bucket, default=None)
+    last = date_to or max(by_bucket, default=None)
+    buckets = bucket_range(first, last, interval) if first and last else []
+    empty = evaluate({}, resolve(SERIES_KPIS))
+    return {
+        'interval': interval,
+        'date_from': first,
+        'date_to': last,
+        'buckets': buckets,
+        'series': {
+            name: [by_bucket.get(bucket, empty)[name] for bucket in buckets]
+            for name in SERIES_KPIS
+        },
+    }
+
+
+def timeseries(queryset, interval='day', date_from=None, date_to=None):
+    """
+    Gap-filled series for a queryset of rows with a ``date`` and metric columns.
+
+    Without explicit bounds the range covers the first to the last bucket
+    that has data.
+    """
+    rows = group_kpis(bucketed(queryset, interval, date_from, date_to), 'bucket', SERIES_KPIS)
+    return fill(rows, interval, date_from, date_to)
+
+
+async def atimeseries(queryset, interval='day', date_from=None, date_to=None):
+    rows = await agroup_kpis(bucketed(queryset, interval, date_from, date_to), 'bucket', SERIES_KPIS)
+    return fill(rows, interval, date_from, date_to)
@@ -0,0 +1,124 @@
+"""
+Campaign totals maintained from Metric.
+
+``Campaign.impressions``, ``clicks``, ``engagements``, ``conversions``,
+``spend`` and ``engagement_rate`` are the sums over the campaign's metric
+rows. New and deleted metric rows adjust them with a single ``F()``
+increment in the writer's transaction (campaigns.signals), so parallel
+writers never overwrite each other's counts. Edited rows and writers that
+bypass signals (``bulk_create``, ``QuerySet.update``, ingestion) recompute
+the affected campaigns with ``reconcile``, one grouped ``UPDATE ... FROM``;
+the reconcile_totals command runs it over every campaign.
+"""
+import threading
+
+from django.db import connections, router, transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Cast, Round
+from django.db.models.lookups import GreaterThan
+
+from .models import Campaign, Metric
+
+
+COUNTER_FIELDS = ('impressions', 'clicks', 'engagements', 'conversions')
+TOTAL_FIELDS = COUNTER_FIELDS + ('spend',)
+
+_deleting = threading.local()
+
+
+def engagement_rate(engagements, impressions):
+    """Expression for engagements per 100 impressions, rounded to 2 places (0 without impressions)."""
+    return Case(
+        When(GreaterThan(impressions, 0), then=Round(Cast(engagements, FloatField()) * 100 / impressions, 2)),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def add(metric, sign=1):
+    """Add (or with ``sign=-1`` subtract) a metric row's values to its campaign in one UPDATE."""
+    deltas = {}
+    for field in TOTAL_FIELDS:
+        value = Metric._meta.get_field(field).to_python(getattr(metric, field))
+        if value:
+            deltas[field] = value * sign
+    if not deltas:
+        return
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    if 'impressions' in deltas or 'engagements' in deltas:
+        # Right-hand sides see the row before the UPDATE, so apply the deltas here too.
+        updates['engagement_rate'] = engagement_rate(
+            F('engagements') + deltas.get('engagements', 0), F('impressions') + deltas.get('impressions', 0),
+        )
+    Campaign.objects.filter(pk=metric.campaign_id).update(**updates)
+
+
+def deleting(campaign_id):
+    """Whether ``campaign_id`` is being deleted (its cascaded metrics need no adjustment)."""
+    return campaign_id in getattr(_deleting, 'campaigns', ())
+
+
+def mark_deleting(campaign_id, done=False):
+    campaigns = _deleting.__dict__.setdefault('campaigns', set())
+    if done:
+        campaigns.discard(campaign_id)
+    else:
+        campaigns.add(campaign_id)
+
+
+def reconcile(campaign_ids=None, dry_run=False, using=None):
+    """
+    Recompute the totals of ``campaign_ids`` (every campaign by default) from
+    Metric and return how many campaigns were out of date.
+
+    The campaign rows are locked first, so a concurrent F() increment either
+    lands before the recomputation (and is counted by it) or waits and is
+    applied on top. With ``dry_run`` nothing is written.
+    """
+    using = using or router.db_for_write(Campaign)
+    connection = connections[using]
+    if campaign_ids is not None:
+        campaign_ids = sorted(set(campaign_ids))
+        if not campaign_ids:
+            return 0
+    qn = connection.ops.quote_name
+    campaign_table, metric_table = qn(Campaign._meta.db_table), qn(Metric._meta.db_table)
+    scope, params = '', []
+    if campaign_ids is not None:
+        scope = f"WHERE c.id IN ({', '.join(['%s'] * len(campaign_ids))})"
+        params = campaign_ids
+    # ROUND keeps SQLite's floating-point decimal arithmetic comparable; a no-op on PostgreSQL.
+    sums = ', '.join(f'COALESCE(SUM(m.{field}), 0) AS {field}' for field in COUNTER_FIELDS)
+    sums += ', COALESCE(ROUND(SUM(m.spend), 2), 0) AS spend'
+    rate = ('CASE WHEN t.impressions > 0 '
+            'THEN ROUND(CAST(t.engagements * 100.0 / t.impressions AS NUMERIC), 2) ELSE 0 END')
+    totals = (
+        f'(SELECT c.id AS campaign_id, {sums} FROM {campaign_table} c '
+        f'LEFT JOIN {metric_table} m ON m.campaign_id = c.id {scope} GROUP BY c.id) t'
+    )
+    drift = ' OR '.join(
+        [f'{campaign_table}.{field} <> t.{field}' for field in COUNTER_FIELDS]
+        + [f'ROUND({campaign_table}.spend, 2) <> t.spend']
+        + [f'{campaign_table}.engagement_rate <> {rate}']
+    )
+    with transaction.atomic(using=using, savepoint=False), connection.cursor() as cursor:
+        if dry_run:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {campaign_table} JOIN {totals} '
+                f'ON {campaign_table}.id = t.campaign_id WHERE {drift}',
+                params,
+            )
+            return cursor.fetchone()[0]
+        locked = Campaign.objects.using(using).select_for_update().order_by('pk')
+        if campaign_ids is not None:
+            locked = locked.filter(pk__in=campaign_ids)
+        list(locked.values_list('pk', flat=True))
+        assignments = ', '.join(
+            [f'{field} = t.{field}' for field in TOTAL_FIELDS] + [f'engagement_rate = {rate}']
+        )
+        cursor.execute(
+            f'UPDATE {campaign_table} SET {assignments} FROM {totals} '
+            f'WHERE {campaign_table}.id = t.campaign_id AND ({drift})',
+            params,
+        )
+        return cursor.rowcount
@@ -0,0 +1,65 @@
+"""
+Campaign status transitions: pause and resume.
+
+A transition is one conditional UPDATE of ``status`` and ``updated_at``::
+
+    UPDATE campaigns_campaign SET status = 'paused', updated_at = ...
+    WHERE id = 12 AND status IN ('active')
+
+The rest of the row is never rewritten, so the description and the totals
+that metric writes increment concurrently (campaigns.totals) are left
+alone, and the database arbitrates concurrent requests: of two racing
+pauses one updates the row and the other finds it already paused. Only
+when no row matched is the campaign read back, to tell a transition that
+already happened (``unchanged``) from a disallowed one (409) or a missing
+campaign (404). The UPDATE bypasses the model signals, so the response
+cache is invalidated here.
+"""
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound
+
+from . import caching
+from .models import Campaign
+
+
+# Target status -> the statuses it can be entered from.
+TRANSITIONS = {
+    Campaign.PAUSED: (Campaign.ACTIVE,),
+    Campaign.ACTIVE: (Campaign.PAUSED, Campaign.DRAFT),
+}
+
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+NOT_ALLOWED = 'not_allowed'
+
+
+class TransitionNotAllowed(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The campaign cannot make this status change.'
+    default_code = 'transition_not_allowed'
+
+
+def transition(pk, target, queryset=None):
+    """
+    Move campaign ``pk`` to ``target``. Returns the campaign's ``id``,
+    ``status`` and ``updated_at`` and the outcome (UPDATED or UNCHANGED).
+    ``queryset`` (a view's ``get_queryset()``) limits the campaigns that can
+    be found; campaigns outside it are 404s.
+    """
+    if queryset is None:
+        queryset = Campaign.objects.all()
+    try:
+        pk = int(pk)
+    except (TypeError, ValueError):
+        raise NotFound()
+    now = timezone.now()
+    if queryset.filter(pk=pk, status__in=TRANSITIONS[target]).update(status=target, updated_at=now):
+        caching.invalidate()
+        return {'id': pk, 'status': target, 'updated_at': now}, UPDATED
+    current = queryset.filter(pk=pk).values('id', 'status', 'updated_at').first()
+    if current is None:
+        raise NotFound()
+    if current['status'] != target:
+        raise TransitionNotAllowed(f"A {current['status']} campaign cannot become {target}.")
+    return current, UNCHANGED
@@ -1,10 +1,16 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CampaignViewSet
+from . import async_views
+from .views import CampaignViewSet, MetricViewSet
 
 router = DefaultRouter()
 router.register(r'campaigns', CampaignViewSet, basename='campaign')
+router.register(r'metrics', MetricViewSet, basename='metric')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('async/campaigns/active/', async_views.active, name='async-campaign-active'),
+    path('async/campaigns/dashboard_stats/', async_views.dashboard_stats, name='async-campaign-dashboard-stats'),
+    path('async/campaigns/platform_performance/', async_views.platform_performance, name='async-campaign-platform-performance'),
+    path('async/campaigns/timeseries/', async_views.timeseries, name='async-campaign-timeseries'),
 ]
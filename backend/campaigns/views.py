@@ -1,40 +1,144 @@
-from rest_framework import viewsets, filters, status
+from rest_framework import mixins, viewsets, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Sum, Avg
-from .models import Campaign, Metric
-from .serializers import CampaignSerializer
+from django.conf import settings
+from analytics_project.routers import use_replica
+from jobs.views import accepted, enqueue_or_400, queue_on_post
+from . import bulk, columnar, exports, ingest, leaderboard, totals, transitions
+from .caching import cached_action
+from .analytics import DASHBOARD_KPIS, PLATFORM_KPIS, aggregate_kpis, group_kpis
+from .filtering import (
+    DEFAULT_LIST_METRICS_LIMIT, filter_metrics, filter_rollups, kpi_rollups, metrics_prefetch, metrics_window,
+    parse_date_range,
+)
+from .models import Campaign, DailyRollup, Metric
+from .pagination import CampaignPagination, MetricPagination
+from .search import CampaignSearchFilter, RelevanceOrderingFilter
+from .params import parse_bool, parse_int
+from .serializers import (
+    BulkDuplicateSerializer, CampaignSelectionSerializer, CampaignSerializer, CampaignStatusSerializer,
+    CampaignValuesSerializer, MetricSerializer, MetricValuesSerializer,
+)
+from .timeseries import timeseries
+
+
+# Read actions whose campaigns are serialized from a prefetched metrics set.
+METRIC_READ_ACTIONS = ('list', 'retrieve', 'active')
+# List responses are compact; nested metrics are opt-in with ?include_metrics=true.
+LIST_ACTIONS = ('list', 'active')
+BULK_SERIALIZERS = {
+    'bulk_pause': CampaignSelectionSerializer,
+    'bulk_resume': CampaignSelectionSerializer,
+    'bulk_duplicate': BulkDuplicateSerializer,
+}
+
+
+def values_list_response(view, serializer):
+    """ListModelMixin.list() over ``values()`` rows serialized by a ValuesSerializer."""
+    queryset = serializer.values(view.filter_queryset(view.get_queryset()))
+    page = view.paginate_queryset(queryset)
+    if page is not None:
+        return view.get_paginated_response(serializer.serialize(page))
+    return Response(serializer.serialize(queryset))
+
+
+def run_in_background(request):
+    """``?async=true``: queue the work as a job and answer 202 with its status URL."""
+    return parse_bool(request.query_params, 'async')
+
+
+def job_params(request):
+    return {name: value for name, value in request.query_params.items() if name != 'async'}
+
+
+def bulk_response(counts, results, status_code=status.HTTP_200_OK):
+    return Response({**counts, 'results': results}, status=status_code)
+
+
+def transition_response(view, pk, target):
+    campaign, outcome = transitions.transition(pk, target, view.get_queryset())
+    return Response({**CampaignStatusSerializer(campaign).data, 'outcome': outcome})
+
+
+def export_output(request):
+    output = request.query_params.get('output', 'csv')
+    if output not in exports.OUTPUTS:
+        raise ValidationError({'output': f"Expected one of {', '.join(exports.OUTPUTS)}."})
+    return output
 
 
 class CampaignViewSet(viewsets.ModelViewSet):
     queryset = Campaign.objects.all()
     serializer_class = CampaignSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['name', 'platform', 'status']
-    ordering_fields = ['created_at', 'name', 'status']
+    pagination_class = CampaignPagination
+    filter_backends = [CampaignSearchFilter, RelevanceOrderingFilter]
+    search_fields = ['name', 'description']
+    ordering_fields = [
+        'created_at', 'name', 'status',
+        'impressions', 'clicks', 'conversions', 'engagements', 'spend', 'engagement_rate',
+    ]
     ordering = ['-created_at']
 
+    def include_metrics(self):
+        return parse_bool(self.request.query_params, 'include_metrics', default=self.action not in LIST_ACTIONS)
+
+    def metrics_window(self):
+        """The nested metrics to show: a Metric queryset and the per-campaign limit."""
+        default_limit = DEFAULT_LIST_METRICS_LIMIT if self.action in LIST_ACTIONS else None
+        return metrics_window(self.request.query_params, default_limit)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in METRIC_READ_ACTIONS and self.include_metrics():
+            queryset = queryset.prefetch_related(metrics_prefetch(*self.metrics_window()))
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in METRIC_READ_ACTIONS:
+            context['include_metrics'] = self.include_metrics()
+        return context
+
+    def get_serializer_class(self):
+        return BULK_SERIALIZERS.get(self.action) or super().get_serializer_class()
+
+    def bulk_selection(self):
+        serializer = self.get_serializer(data=self.request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    def get_values_serializer(self):
+        context = self.get_serializer_context()
+        if context['include_metrics']:
+            context['metrics'], context['metrics_limit'] = self.metrics_window()
+        return CampaignValuesSerializer(context)
+
+    def list(self, request, *args, **kwargs):
+        if not settings.VALUES_SERIALIZERS:
+            return super().list(request, *args, **kwargs)
+        return values_list_response(self, self.get_values_serializer())
+
     @action(detail=False, methods=['get'])
+    @cached_action
+    @use_replica
     def active(self, request):
-        active_campaigns = Campaign.objects.filter(status='active')
+        active_campaigns = self.get_queryset().filter(status='active')
+        if settings.VALUES_SERIALIZERS:
+            serializer = self.get_values_serializer()
+            return Response(serializer.serialize(serializer.values(active_campaigns)))
         serializer = self.get_serializer(active_campaigns, many=True)
         return Response(serializer.data)
 
     @action(detail=True, methods=['post'])
     def pause(self, request, pk=None):
-        campaign = self.get_object()
-        campaign.status = 'paused'
-        campaign.save()
-        serializer = self.get_serializer(campaign)
-        return Response(serializer.data)
+        """Pause an active campaign with one conditional UPDATE (campaigns.transitions)."""
+        return transition_response(self, pk, Campaign.PAUSED)
 
     @action(detail=True, methods=['post'])
     def resume(self, request, pk=None):
-        campaign = self.get_object()
-        campaign.status = 'active'
-        campaign.save()
-        serializer = self.get_serializer(campaign)
-        return Response(serializer.data)
+        """Set a paused or draft campaign active."""
+        return transition_response(self, pk, Campaign.ACTIVE)
 
     @action(detail=True, methods=['post'])
     def duplicate(self, request, pk=None):
@@ -42,73 +146,185 @@ class CampaignViewSet(viewsets.ModelViewSet):
         campaign.pk = None
         campaign.id = None
         campaign.name = f"{campaign.name} (Copy)"
+        # The copy has no metrics yet.
+        for field in totals.TOTAL_FIELDS + ('engagement_rate',):
+            setattr(campaign, field, 0)
         campaign.save()
         serializer = self.get_serializer(campaign)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=['post'])
+    def bulk_pause(self, request):
+        """Pause the campaigns given as ``{"ids": [...]}`` or ``{"filter": {...}}`` in one UPDATE."""
+        selection = self.bulk_selection()
+        return bulk_response(*bulk.set_status(Campaign.PAUSED, selection.get('ids'), selection.get('filter')))
+
+    @action(detail=False, methods=['post'])
+    def bulk_resume(self, request):
+        """Activate the campaigns given as ``{"ids": [...]}`` or ``{"filter": {...}}`` in one UPDATE."""
+        selection = self.bulk_selection()
+        return bulk_response(*bulk.set_status(Campaign.ACTIVE, selection.get('ids'), selection.get('filter')))
+
+    @action(detail=False, methods=['post'])
+    def bulk_duplicate(self, request):
+        """
+        Copy the selected campaigns with one bulk_create; ``"include_metrics": true``
+        copies their metric rows as well.
+        """
+        selection = self.bulk_selection()
+        counts, results = bulk.duplicate(
+            selection.get('ids'), selection.get('filter'), selection['include_metrics']
+        )
+        created = status.HTTP_201_CREATED if counts.get(bulk.DUPLICATED) else status.HTTP_200_OK
+        return bulk_response(counts, results, created)
+
+    @action(detail=False, methods=['get', 'post'])
+    def export(self, request):
+        """
+        Stream campaigns as ``?output=csv|ndjson``, filtered by ``platform``,
+        ``status`` and a ``date_from``/``date_to`` range on the start date.
+        POST with the same query string has a job write the file instead.
+        """
+        campaigns = exports.campaign_rows(request.query_params)
+        output = export_output(request)
+        if queue_on_post(request):
+            return accepted(request, enqueue_or_400('export_campaigns', params=job_params(request)))
+        return exports.export_response(campaigns, exports.CAMPAIGN_FIELDS, output, 'campaigns')
+
+    @action(detail=False, methods=['get'])
+    @cached_action
+    @use_replica
+    def timeseries(self, request):
+        """
+        Metric totals and rates per ``?interval=day|week|month`` bucket across
+        campaigns, filtered by ``platform``, ``status``, ``campaign`` and
+        ``date_from``/``date_to``. Served from the daily rollups unless a
+        status or campaign filter needs the raw metric rows.
+        """
+        params = request.query_params
+        date_from, date_to = parse_date_range(params)
+        if params.get('status') or params.get('campaign'):
+            rows = filter_metrics(Metric.objects.all(), params)
+        else:
+            rows = filter_rollups(DailyRollup.objects.all(), params)
+        return Response(timeseries(rows, params.get('interval', 'day'), date_from, date_to))
+
+    @action(detail=True, methods=['get'], url_path='timeseries')
+    @cached_action
+    @use_replica
+    def campaign_timeseries(self, request, pk=None):
+        campaign = self.get_object()
+        date_from, date_to = parse_date_range(request.query_params)
+        return Response(timeseries(
+            campaign.metrics.all(), request.query_params.get('interval', 'day'), date_from, date_to
+        ))
+
     @action(detail=False, methods=['get'])
+    @cached_action
+    @use_replica
+    def leaderboard(self, request):
+        """
+        Top ``limit`` campaigns by ``?kpi=`` (a total, ``ctr``, ``engagement_rate``,
+        ``conversion_rate``, ``cpc`` or ``roi``), overall or with ``per_platform=true``,
+        over ``date_from``/``date_to``, ``platform`` and ``status``, with at least
+        ``min_impressions``.
+        """
+        return Response(leaderboard.leaderboard(request.query_params))
+
+    @action(detail=False, methods=['get'])
+    @cached_action
+    @use_replica
     def dashboard_stats(self, request):
-        campaigns = Campaign.objects.all()
-        metrics = Metric.objects.all()
-
-        total_impressions = metrics.aggregate(Sum('impressions'))['impressions__sum'] or 0
-        total_clicks = metrics.aggregate(Sum('clicks'))['clicks__sum'] or 0
-        total_engagements = metrics.aggregate(Sum('engagements'))['engagements__sum'] or 0
-        total_conversions = metrics.aggregate(Sum('conversions'))['conversions__sum'] or 0
-        total_spend = metrics.aggregate(Sum('spend'))['spend__sum'] or 0
-
-        avg_ctr = (total_clicks / total_impressions * 100) if total_impressions > 0 else 0
-        avg_engagement_rate = (total_engagements / total_impressions * 100) if total_impressions > 0 else 0
-        conversion_rate = (total_conversions / total_clicks * 100) if total_clicks > 0 else 0
-        roi = ((total_conversions * 100 - total_spend) / total_spend * 100) if total_spend > 0 else 0
-
-        return Response({
-            'total_campaigns': campaigns.count(),
-            'active_campaigns': campaigns.filter(status='active').count(),
-            'total_impressions': total_impressions,
-            'total_clicks': total_clicks,
-            'total_engagements': total_engagements,
-            'total_conversions': total_conversions,
-            'total_spend': float(total_spend),
-            'avg_ctr': round(avg_ctr, 2),
-            'avg_engagement_rate': round(avg_engagement_rate, 2),
-            'conversion_rate': round(conversion_rate, 2),
-            'roi': round(roi, 2),
-        })
+        """
+        Overall KPIs; the metric figures cover ``date_from``/``date_to``.
+        ``?compare=true`` adds the previous period of the same length and the change.
+        """
+        rollups, periods = kpi_rollups(request.query_params)
+        return Response(aggregate_kpis(Campaign.objects.all(), DASHBOARD_KPIS, metrics=rollups, periods=periods))
 
     @action(detail=False, methods=['get'])
+    @cached_action
+    @use_replica
     def platform_performance(self, request):
-        platforms = Campaign.objects.values('platform').distinct()
-        platform_stats = []
-
-        for platform in platforms:
-            platform_name = platform['platform']
-            campaigns = Campaign.objects.filter(platform=platform_name)
-            metrics = Metric.objects.filter(campaign__in=campaigns)
-
-            impressions = metrics.aggregate(Sum('impressions'))['impressions__sum'] or 0
-            clicks = metrics.aggregate(Sum('clicks'))['clicks__sum'] or 0
-            engagements = metrics.aggregate(Sum('engagements'))['engagements__sum'] or 0
-            conversions = metrics.aggregate(Sum('conversions'))['conversions__sum'] or 0
-            spend = metrics.aggregate(Sum('spend'))['spend__sum'] or 0
-
-            ctr = (clicks / impressions * 100) if impressions > 0 else 0
-            engagement_rate = (engagements / impressions * 100) if impressions > 0 else 0
-            conversion_rate = (conversions / clicks * 100) if clicks > 0 else 0
-            cpc = (spend / clicks) if clicks > 0 else 0
-
-            platform_stats.append({
-                'platform': platform_name,
-                'campaigns_count': campaigns.count(),
-                'total_impressions': impressions,
-                'total_clicks': clicks,
-                'total_engagements': engagements,
-                'total_conversions': conversions,
-                'total_spend': float(spend),
-                'ctr': round(ctr, 2),
-                'engagement_rate': round(engagement_rate, 2),
-                'conversion_rate': round(conversion_rate, 2),
-                'cpc': round(cpc, 2),
-            })
-
-        return Response(platform_stats)
+        """KPIs per platform, with the same date range and comparison as dashboard_stats."""
+        rollups, periods = kpi_rollups(request.query_params)
+        return Response(group_kpis(
+            Campaign.objects.all(), 'platform', PLATFORM_KPIS, metrics=rollups, periods=periods
+        ))
+
+
+class MetricViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Metric rows, newest first, filtered by ``campaign``, ``platform``,
+    ``status`` and ``date_from``/``date_to``.
+    """
+    queryset = Metric.objects.all()
+    serializer_class = MetricSerializer
+    pagination_class = MetricPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            queryset = filter_metrics(queryset, self.request.query_params)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        if not settings.VALUES_SERIALIZERS:
+            return super().list(request, *args, **kwargs)
+        return values_list_response(self, MetricValuesSerializer(self.get_serializer_context()))
+
+    @action(detail=False, methods=['get'])
+    @cached_action
+    def query(self, request):
+        """
+        KPIs (``kpis=``) of the metric rows grouped by any of
+        ``group_by=platform,status,campaign,date,week,month`` and filtered by
+        ``platform``, ``status``, ``campaign`` and ``date_from``/``date_to``.
+        Answered from in-memory columns when NumPy is installed.
+        """
+        return Response(columnar.run_query(request.query_params))
+
+    @action(detail=False, methods=['post'])
+    def ingest(self, request):
+        """
+        Upsert daily metric rows from a JSON Lines or CSV request body.
+
+        The format follows the Content-Type (``text/csv`` for CSV, JSON Lines
+        otherwise) or ``?input=csv|jsonl``; ``?chunk_size=`` sets the batch size.
+        With ``?async=true`` the body is queued as a job instead.
+        """
+        fmt = request.query_params.get('input')
+        if not fmt:
+            fmt = 'csv' if request.content_type.startswith('text/csv') else 'jsonl'
+        if fmt not in ingest.FORMATS:
+            raise ValidationError({'input': f"Expected one of {', '.join(ingest.FORMATS)}."})
+        chunk_size = parse_int(request.query_params, 'chunk_size', ingest.DEFAULT_CHUNK_SIZE,
+                               minimum=1, maximum=ingest.MAX_CHUNK_SIZE)
+        if run_in_background(request):
+            if not request.body:
+                raise ValidationError({'detail': 'The request body is empty.'})
+            try:
+                payload = request.body.decode('utf-8')
+            except UnicodeDecodeError:
+                raise ValidationError({'detail': 'The request body is not valid UTF-8.'})
+            job = enqueue_or_400('ingest_metrics', params={'format': fmt, 'chunk_size': chunk_size},
+                                 payload=payload)
+            return accepted(request, job)
+        if request.stream is None:
+            raise ValidationError({'detail': 'The request body is empty.'})
+
+        batches = list(ingest.ingest(ingest.decode_lines(request.stream), fmt, chunk_size))
+        return Response({'totals': ingest.summarize(batches), 'batches': batches})
+
+    @action(detail=False, methods=['get', 'post'])
+    def export(self, request):
+        """
+        Stream metric rows as ``?output=csv|ndjson``, filtered by ``campaign``,
+        ``platform``, ``status`` and ``date_from``/``date_to``.
+        POST with the same query string has a job write the file instead.
+        """
+        metrics = exports.metric_rows(request.query_params)
+        output = export_output(request)
+        if queue_on_post(request):
+            return accepted(request, enqueue_or_400('export_metrics', params=job_params(request)))
+        return exports.export_response(metrics, exports.METRIC_FIELDS, output, 'metrics')
@@ -0,0 +1,49 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs import queue
+from jobs.registry import TASKS
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs from the job table with a pool of worker threads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.JOB_WORKERS,
+                            help='Worker threads (default JOB_WORKERS).')
+        parser.add_argument('--kinds', help='Comma-separated job kinds to run (default: all).')
+        parser.add_argument('--burst', action='store_true', help='Exit once no job is due.')
+        parser.add_argument('--poll-interval', type=float, default=settings.JOB_POLL_INTERVAL,
+                            help='Seconds to wait when the queue is empty (default JOB_POLL_INTERVAL).')
+
+    def handle(self, *args, **options):
+        kinds = options['kinds'].split(',') if options['kinds'] else None
+        unknown = set(kinds or ()) - set(TASKS)
+        if unknown:
+            raise CommandError(f"Unknown job kinds: {', '.join(sorted(unknown))}.")
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1.')
+
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            # Finish the jobs in progress, then exit.
+            signal.signal(signum, lambda *_: stop.set())
+
+        processed = [0] * options['workers']
+
+        def worker(index):
+            processed[index] = queue.work(queue.worker_name(index), stop, kinds, options['burst'],
+                                          options['poll_interval'])
+
+        threads = [threading.Thread(target=worker, args=(index,), name=f'jobs-{index}')
+                   for index in range(options['workers'])]
+        self.stdout.write(f"Running jobs with {len(threads)} workers ({', '.join(kinds or sorted(TASKS))}).")
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(0.5)
+        self.stdout.write(f'Processed {sum(processed)} jobs.')
@@ -0,0 +1,43 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """A unit of background work, claimed and run by the run_jobs worker."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUSES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=100)
+    params = models.JSONField(default=dict, blank=True)
+    # Bulk input such as an ingestion body; kept out of the API representation.
+    payload = models.TextField(blank=True, default='')
+    status = models.CharField(max_length=20, choices=STATUSES, default=QUEUED)
+    priority = models.IntegerField(default=0)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    worker = models.CharField(max_length=100, blank=True, default='')
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # The claim query: due queued jobs, highest priority first.
+            models.Index(fields=['status', '-priority', 'run_after', 'id'], name='job_claim_idx'),
+            models.Index(fields=['-created_at', '-id'], name='job_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} #{self.pk} ({self.status})'
@@ -0,0 +1,190 @@
+"""
+The database-backed job queue.
+
+``enqueue`` inserts a Job row. Workers (the run_jobs command) ``claim`` the
+most urgent due job with ``SELECT ... FOR UPDATE SKIP LOCKED``, so any
+number of workers poll the same table without blocking each other or
+running a job twice, then ``run`` it. Failures are retried with exponential
+backoff up to the task's ``max_attempts``, and a running job whose worker
+vanished is requeued once its timeout passes. Per-kind concurrency limits
+are checked under a transaction-level advisory lock on PostgreSQL (SQLite
+serializes writers anyway). No broker is involved.
+"""
+import logging
+import os
+import socket
+import traceback
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import OperationalError, close_old_connections, connection, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Job
+from .registry import TASKS
+
+
+logger = logging.getLogger('analytics.jobs')
+
+MAX_ERROR_LENGTH = 4000
+
+
+class InvalidParams(ValueError):
+    """The params of a job were rejected by its task's ``validate``."""
+
+
+def enqueue(kind, params=None, payload='', priority=None):
+    """Queue a job of a registered ``kind``; returns the Job."""
+    task = TASKS.get(kind)
+    if task is None:
+        raise ValueError(f'Unknown job kind {kind!r}.')
+    params = params or {}
+    if task.validate is not None:
+        try:
+            task.validate(params)
+        except ValueError as exc:
+            raise InvalidParams(str(exc)) from exc
+    return Job.objects.create(
+        kind=kind,
+        params=params,
+        payload=payload,
+        priority=task.priority if priority is None else priority,
+        max_attempts=task.max_attempts,
+    )
+
+
+def worker_name(index=0):
+    return f'{socket.gethostname()}:{os.getpid()}:{index}'
+
+
+def _full_kinds():
+    """Kinds already running as many jobs as their concurrency limit allows."""
+    limits = {name: task.concurrency for name, task in TASKS.items() if task.concurrency}
+    if not limits:
+        return []
+    running = (
+        Job.objects.filter(status=Job.RUNNING, kind__in=limits)
+        .order_by().values('kind').annotate(count=Count('id'))
+    )
+    return [row['kind'] for row in running if row['count'] >= limits[row['kind']]]
+
+
+def _lock_kind(kind):
+    # Serializes the limit check of concurrent claims of one kind until commit.
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [zlib.crc32(f'jobs:{kind}'.encode())])
+
+
+def claim(worker, kinds=None):
+    """Mark the most urgent due job as running for ``worker`` and return it, or None."""
+    now = timezone.now()
+    candidates = Job.objects.filter(status=Job.QUEUED, run_after__lte=now)
+    if kinds:
+        candidates = candidates.filter(kind__in=kinds)
+    full = set(_full_kinds())
+    while True:
+        with transaction.atomic():
+            due = candidates.exclude(kind__in=full) if full else candidates
+            job = due.select_for_update(skip_locked=True).order_by('-priority', 'run_after', 'id').first()
+            if job is None:
+                return None
+            task = TASKS.get(job.kind)
+            if task is not None and task.concurrency:
+                _lock_kind(job.kind)
+                if Job.objects.filter(kind=job.kind, status=Job.RUNNING).count() >= task.concurrency:
+                    # The kind filled up since _full_kinds(); try the next due job of another kind.
+                    full.add(job.kind)
+                    continue
+            # Conditional, so backends without row locks cannot hand the job out twice.
+            claimed = Job.objects.filter(pk=job.pk, status=Job.QUEUED).update(
+                status=Job.RUNNING, attempts=F('attempts') + 1, worker=worker, started_at=now,
+            )
+        if not claimed:
+            return None
+        job.status, job.attempts, job.worker, job.started_at = Job.RUNNING, job.attempts + 1, worker, now
+        return job
+
+
+def _finish(job, **fields):
+    # Guarded so a worker that lost the job (timed out and requeued) does not overwrite it.
+    return Job.objects.filter(pk=job.pk, status=Job.RUNNING, worker=job.worker).update(**fields)
+
+
+def fail(job, error):
+    """Requeue ``job`` with backoff if it has attempts left, otherwise mark it failed."""
+    error = error[-MAX_ERROR_LENGTH:]
+    now = timezone.now()
+    if job.attempts < job.max_attempts:
+        delay = settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+        updated = _finish(job, status=Job.QUEUED, worker='', error=error,
+                          run_after=now + timedelta(seconds=delay))
+        if updated:
+            logger.warning('Job %s (%s) failed, retrying in %ss: %s', job.pk, job.kind, delay,
+                           error.strip().splitlines()[-1])
+        return
+    if _finish(job, status=Job.FAILED, error=error, finished_at=now):
+        logger.error('Job %s (%s) failed after %s attempts: %s', job.pk, job.kind, job.attempts,
+                     error.strip().splitlines()[-1])
+
+
+def run(job):
+    """Run a claimed job and record its result or failure; returns whether it succeeded."""
+    task = TASKS.get(job.kind)
+    try:
+        if task is None:
+            raise LookupError(f'Unknown job kind {job.kind!r}.')
+        result = task.func(job)
+    except Exception:
+        fail(job, traceback.format_exc())
+        return False
+    _finish(job, status=Job.SUCCEEDED, result=result, error='', finished_at=timezone.now())
+    return True
+
+
+def requeue_stale():
+    """Fail (and so retry) running jobs that outlived their timeout; returns how many."""
+    now = timezone.now()
+    shortest = min([settings.JOB_TIMEOUT] + [task.timeout for task in TASKS.values() if task.timeout])
+    stale = 0
+    for job in Job.objects.filter(status=Job.RUNNING, started_at__lt=now - timedelta(seconds=shortest)):
+        task = TASKS.get(job.kind)
+        timeout = (task.timeout if task and task.timeout else None) or settings.JOB_TIMEOUT
+        if job.started_at < now - timedelta(seconds=timeout):
+            fail(job, f'Timed out after {timeout}s on worker {job.worker}.')
+            stale += 1
+    return stale
+
+
+def work(worker, stop, kinds=None, burst=False, poll_interval=None):
+    """
+    Claim and run jobs until ``stop`` (a threading.Event) is set, or with
+    ``burst`` until no job is due. Returns the number of jobs run.
+    """
+    poll_interval = settings.JOB_POLL_INTERVAL if poll_interval is None else poll_interval
+    processed = 0
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                requeue_stale()
+                job = claim(worker, kinds)
+            except OperationalError as exc:
+                # e.g. SQLite's "database is locked" under concurrent claims
+                logger.debug('Claim failed on %s: %s', worker, exc)
+                job = None
+            if job is not None:
+                run(job)
+                processed += 1
+                continue
+            due = Job.objects.filter(status=Job.QUEUED, run_after__lte=timezone.now())
+            if kinds:
+                due = due.filter(kind__in=kinds)
+            if burst and not due.exists():
+                break
+            stop.wait(poll_interval)
+    finally:
+        connection.close()
+    return processed
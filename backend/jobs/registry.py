@@ -0,0 +1,45 @@
+"""
+Registry of background job kinds.
+
+Apps declare the work that can run in the background in a ``tasks`` module,
+discovered when the jobs app is ready::
+
+    @task('rebuild_rollups', concurrency=1, public=True)
+    def rebuild_rollups(job):
+        return rollups.rebuild()
+
+A task is called with its Job (``params``, ``payload``) and returns a
+JSON-serializable result. Exceptions are retried up to ``max_attempts``.
+An optional ``validate(params)`` raises ValueError for params the task
+cannot run with, so they are rejected when the job is queued.
+"""
+
+
+TASKS = {}
+
+
+class Task:
+
+    def __init__(self, name, func, priority=0, max_attempts=3, concurrency=None, timeout=None, public=False,
+                 validate=None):
+        self.name = name
+        self.func = func
+        # Higher runs first.
+        self.priority = priority
+        self.max_attempts = max_attempts
+        # Most jobs of this kind running at once across all workers (None: no limit).
+        self.concurrency = concurrency
+        # Seconds after which a running job is presumed lost (default JOB_TIMEOUT).
+        self.timeout = timeout
+        # Whether clients may enqueue it directly with POST /api/jobs/.
+        self.public = public
+        # Called with the params when a job is queued; raises ValueError to reject them.
+        self.validate = validate
+
+
+def task(name, **options):
+    """Register the decorated function as the job kind ``name``."""
+    def register(func):
+        TASKS[name] = Task(name, func, **options)
+        return func
+    return register
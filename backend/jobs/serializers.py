@@ -0,0 +1,41 @@
+from django.urls import reverse
+from rest_framework import serializers
+
+from .models import Job
+from .registry import TASKS
+
+
+class JobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'kind', 'params', 'status', 'priority', 'attempts', 'max_attempts',
+            'run_after', 'result', 'error', 'download_url',
+            'created_at', 'started_at', 'finished_at',
+        ]
+        read_only_fields = [
+            'status', 'attempts', 'max_attempts', 'run_after', 'result', 'error',
+            'created_at', 'started_at', 'finished_at',
+        ]
+        extra_kwargs = {'priority': {'required': False}}
+
+    def get_download_url(self, job):
+        if job.status != Job.SUCCEEDED or not (job.result or {}).get('file'):
+            return None
+        url = reverse('job-download', args=[job.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def validate_kind(self, value):
+        task = TASKS.get(value)
+        if task is None or not task.public:
+            public = sorted(name for name, task in TASKS.items() if task.public)
+            raise serializers.ValidationError(f"Expected one of {', '.join(public)}.")
+        return value
+
+    def validate_params(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError('Expected an object.')
+        return value
@@ -0,0 +1,253 @@
+import threading
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from . import queue
+from .models import Job
+from .registry import TASKS, Task
+
+
+def succeed(job):
+    return {'params': job.params}
+
+
+def explode(job):
+    raise RuntimeError('boom')
+
+
+TEST_TASKS = {
+    'test_ok': Task('test_ok', succeed),
+    'test_urgent': Task('test_urgent', succeed, priority=5),
+    'test_failing': Task('test_failing', explode, max_attempts=3),
+    'test_limited': Task('test_limited', succeed, priority=5, concurrency=1),
+    'test_slow': Task('test_slow', succeed, timeout=60),
+}
+
+
+class QueueTestMixin:
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.dict(TASKS, TEST_TASKS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def running(self, kind, worker='elsewhere', started=None):
+        return Job.objects.create(kind=kind, status=Job.RUNNING, attempts=1, worker=worker,
+                                  started_at=started or timezone.now())
+
+
+class QueueTests(QueueTestMixin, TestCase):
+    """Claiming, running, retrying and requeueing jobs."""
+
+    def test_enqueue_unknown_kind(self):
+        with self.assertRaisesMessage(ValueError, 'Unknown job kind'):
+            queue.enqueue('nope')
+
+    def test_claim_most_urgent_first(self):
+        ok = queue.enqueue('test_ok')
+        urgent = queue.enqueue('test_urgent')
+        job = queue.claim('worker-1')
+        self.assertEqual(job.pk, urgent.pk)
+        self.assertEqual((job.status, job.attempts, job.worker), (Job.RUNNING, 1, 'worker-1'))
+        self.assertEqual(queue.claim('worker-1').pk, ok.pk)
+        self.assertIsNone(queue.claim('worker-1'))
+
+    def test_claim_due_jobs_of_kinds(self):
+        queue.enqueue('test_urgent')
+        Job.objects.update(run_after=timezone.now() + timedelta(minutes=1))
+        ok = queue.enqueue('test_ok')
+        self.assertIsNone(queue.claim('worker-1', kinds=['test_urgent']))
+        self.assertEqual(queue.claim('worker-1').pk, ok.pk)
+
+    def test_concurrency_limit_skips_full_kind(self):
+        self.running('test_limited')
+        queue.enqueue('test_limited')
+        ok = queue.enqueue('test_ok')
+        self.assertEqual(queue.claim('worker-1').pk, ok.pk)
+        self.assertIsNone(queue.claim('worker-1'))
+
+    def test_kind_filled_after_full_kinds_check(self):
+        # Another worker claimed the last slot between _full_kinds() and the locked recount.
+        self.running('test_limited')
+        queue.enqueue('test_limited')
+        ok = queue.enqueue('test_ok')
+        with mock.patch.object(queue, '_full_kinds', return_value=[]):
+            self.assertEqual(queue.claim('worker-1').pk, ok.pk)
+
+    def test_concurrency_limit_frees_up(self):
+        running = self.running('test_limited')
+        limited = queue.enqueue('test_limited')
+        self.assertIsNone(queue.claim('worker-1'))
+        Job.objects.filter(pk=running.pk).update(status=Job.SUCCEEDED)
+        self.assertEqual(queue.claim('worker-1').pk, limited.pk)
+
+    def test_run_records_result(self):
+        queue.enqueue('test_ok', params={'a': 1})
+        job = queue.claim('worker-1')
+        self.assertTrue(queue.run(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), (Job.SUCCEEDED, {'params': {'a': 1}}))
+        self.assertIsNotNone(job.finished_at)
+
+    @override_settings(JOB_RETRY_DELAY=10)
+    def test_retry_with_backoff_until_max_attempts(self):
+        queue.enqueue('test_failing')
+        for attempt, delay in ((1, 10), (2, 20)):
+            job = queue.claim('worker-1')
+            started = timezone.now()
+            self.assertFalse(queue.run(job))
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts, job.worker), (Job.QUEUED, attempt, ''))
+            self.assertIn('RuntimeError: boom', job.error)
+            self.assertAlmostEqual((job.run_after - started).total_seconds(), delay, delta=1)
+            self.assertIsNone(queue.claim('worker-1'))
+            Job.objects.update(run_after=timezone.now())
+        job = queue.claim('worker-1')
+        self.assertFalse(queue.run(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 3))
+        self.assertIsNone(queue.claim('worker-1'))
+
+    @override_settings(JOB_TIMEOUT=600)
+    def test_requeue_stale(self):
+        now = timezone.now()
+        lost = self.running('test_ok', started=now - timedelta(seconds=700))
+        busy = self.running('test_ok', started=now - timedelta(seconds=300))
+        slow = self.running('test_slow', started=now - timedelta(seconds=90))
+        self.assertEqual(queue.requeue_stale(), 2)
+        statuses = dict(Job.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses, {lost.pk: Job.QUEUED, busy.pk: Job.RUNNING, slow.pk: Job.QUEUED})
+        self.assertIn('Timed out after 600s', Job.objects.get(pk=lost.pk).error)
+
+    def test_lost_worker_cannot_finish_requeued_job(self):
+        queue.enqueue('test_ok')
+        job = queue.claim('worker-1')
+        queue.fail(job, 'Timed out.')
+        self.assertTrue(queue.run(job))
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.QUEUED)
+
+
+class JobAPITests(TestCase):
+    """POST /api/jobs/ validates kinds and params before queueing."""
+
+    def post(self, data):
+        return self.client.post('/api/jobs/', data, content_type='application/json')
+
+    def test_queue_public_kind(self):
+        response = self.post({'kind': 'reconcile_totals', 'params': {'campaign_ids': [1, 2]}})
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get()
+        self.assertTrue(response['Location'].endswith(f'/api/jobs/{job.pk}/'))
+        self.assertEqual((job.kind, job.params, job.status), ('reconcile_totals', {'campaign_ids': [1, 2]},
+                                                              Job.QUEUED))
+
+    def test_rejects_unknown_and_internal_kinds(self):
+        for kind in ('nope', 'ingest_metrics'):
+            response = self.post({'kind': kind})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('kind', response.json())
+        self.assertFalse(Job.objects.exists())
+
+    def test_rejects_invalid_params(self):
+        for kind, params in (
+            ('reconcile_totals', []),
+            ('reconcile_totals', {'campaign_ids': 'abc'}),
+            ('reconcile_totals', {'campaign_ids': [1, True]}),
+            ('reconcile_totals', {'campaign_ids': [1.5]}),
+            ('rebuild_rollups', {'date_from': '2024-13-01'}),
+            ('rebuild_rollups', {'date_to': 20240101}),
+        ):
+            response = self.post({'kind': kind, 'params': params})
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('params', response.json())
+        self.assertFalse(Job.objects.exists())
+
+    def test_list_rejects_unknown_status(self):
+        self.assertEqual(self.client.get('/api/jobs/?status=nope').status_code, 400)
+
+
+class QueueingEndpointTests(TestCase):
+    """Exports and trending topics queue jobs on POST; a GET never does."""
+
+    def test_post_queues_job(self):
+        for path, kind, params in (
+            ('/api/campaigns/export/?output=ndjson&platform=tiktok', 'export_campaigns',
+             {'output': 'ndjson', 'platform': 'tiktok'}),
+            ('/api/metrics/export/?async=true', 'export_metrics', {}),
+            ('/api/social-api/fetch_trending_topics/', 'fetch_trending_topics', {}),
+        ):
+            with self.subTest(path=path):
+                response = self.client.post(path)
+                self.assertEqual(response.status_code, 202)
+                job = Job.objects.get(pk=response.json()['id'])
+                self.assertEqual((job.kind, job.params), (kind, params))
+
+    def test_post_validates_before_queueing(self):
+        for path in ('/api/campaigns/export/?output=xml', '/api/metrics/export/?date_from=2024-13-01'):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.post(path).status_code, 400)
+        self.assertFalse(Job.objects.exists())
+
+    def test_get_never_queues(self):
+        for path in ('/api/campaigns/export/?async=true', '/api/metrics/export/?async=true',
+                     '/api/social-api/fetch_trending_topics/?async=true'):
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('async', response.json())
+        self.assertEqual(self.client.get('/api/metrics/export/?async=false').status_code, 200)
+        self.assertFalse(Job.objects.exists())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'needs row and advisory locks')
+class ConcurrentClaimTests(QueueTestMixin, TransactionTestCase):
+    """Concurrent claims on PostgreSQL: SKIP LOCKED and the per-kind advisory lock."""
+
+    def test_claim_skips_locked_rows(self):
+        first, second = queue.enqueue('test_urgent'), queue.enqueue('test_ok')
+        locked, release = threading.Event(), threading.Event()
+
+        def hold():
+            try:
+                with transaction.atomic():
+                    list(Job.objects.select_for_update().filter(pk=first.pk))
+                    locked.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        try:
+            self.assertTrue(locked.wait(10))
+            self.assertEqual(queue.claim('worker-1').pk, second.pk)
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual(queue.claim('worker-1').pk, first.pk)
+
+    def test_concurrent_claims_respect_limit(self):
+        for _ in range(4):
+            queue.enqueue('test_limited')
+        barrier = threading.Barrier(4)
+        claimed = []
+
+        def claim(number):
+            try:
+                barrier.wait(10)
+                claimed.append(queue.claim(f'worker-{number}'))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=claim, args=(number,)) for number in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len([job for job in claimed if job is not None]), 1)
+        self.assertEqual(Job.objects.filter(status=Job.RUNNING).count(), 1)
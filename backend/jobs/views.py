@@ -0,0 +1,93 @@
+import os
+
+from django.conf import settings
+from django.http import FileResponse, Http404
+from django.urls import reverse
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from campaigns.pagination import KeysetPagination
+from campaigns.params import parse_bool
+
+from . import queue
+from .models import Job
+from .serializers import JobSerializer
+
+
+class JobPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+
+
+def accepted(request, job):
+    """202 response for a queued job, pointing at its status URL."""
+    data = JobSerializer(job, context={'request': request}).data
+    location = request.build_absolute_uri(reverse('job-detail', args=[job.pk]))
+    return Response(data, status=status.HTTP_202_ACCEPTED, headers={'Location': location})
+
+
+def queue_on_post(request):
+    """
+    Whether to queue the work as a job: POST does, GET runs it in the request.
+    GET refuses ``?async=true`` so that a safe request never queues a job.
+    """
+    if request.method == 'POST':
+        return True
+    if parse_bool(request.query_params, 'async'):
+        raise ValidationError({'async': 'Queue the job with POST instead.'})
+    return False
+
+
+def enqueue_or_400(kind, **kwargs):
+    try:
+        return queue.enqueue(kind, **kwargs)
+    except queue.InvalidParams as exc:
+        raise ValidationError({'params': str(exc)})
+    except ValueError as exc:
+        raise ValidationError({'kind': str(exc)})
+
+
+class JobViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin,
+                 viewsets.GenericViewSet):
+    """
+    Background jobs, newest first, filtered by ``status`` and ``kind``.
+    POST ``{"kind": ..., "params": {...}}`` queues a job of a public kind.
+    """
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    pagination_class = JobPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            params = self.request.query_params
+            statuses = [value for value, _ in Job.STATUSES]
+            if params.get('status'):
+                if params['status'] not in statuses:
+                    raise ValidationError({'status': f"Expected one of {', '.join(statuses)}."})
+                queryset = queryset.filter(status=params['status'])
+            if params.get('kind'):
+                queryset = queryset.filter(kind=params['kind'])
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = enqueue_or_400(serializer.validated_data['kind'],
+                             params=serializer.validated_data.get('params'),
+                             priority=serializer.validated_data.get('priority'))
+        return accepted(request, job)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """The file written by a finished export job."""
+        job = self.get_object()
+        result = job.result or {}
+        if job.status != Job.SUCCEEDED or not result.get('file'):
+            raise Http404
+        path = os.path.join(settings.JOB_OUTPUT_DIR, os.path.basename(result['file']))
+        if not os.path.exists(path):
+            raise Http404
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=result.get('filename'),
+                            content_type=result.get('content_type'))
@@ -0,0 +1,26 @@
+from django.http import JsonResponse
+
+from .services import TrendingTopicsUnavailable, trending_topics_service
+
+
+async def fetch_trending_topics(request):
+    """ASGI variant of SocialAPIViewSet.fetch_trending_topics."""
+    if request.method != 'GET':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    try:
+        trending_topics, age, stale = await trending_topics_service().aget()
+    except TrendingTopicsUnavailable as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': f'Failed to fetch trending topics: {str(e)}',
+            'trending_topics': [],
+            'total_topics': 0
+        }, status=503)
+
+    return JsonResponse({
+        'status': 'success',
+        'trending_topics': trending_topics,
+        'total_topics': len(trending_topics),
+        'age_seconds': round(age),
+        'stale': stale,
+    })
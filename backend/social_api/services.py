@@ -0,0 +1,296 @@
+"""
+Trending topics from Reddit, served from an in-process cache.
+
+Fresh data is returned straight from memory. Once it is older than the TTL
+it is still served while one background thread refreshes it
+(stale-while-revalidate), until it passes the stale limit. Concurrent
+callers that need an upstream fetch share a single request, upstream calls
+go through a pooled ``requests.Session``, and a circuit breaker with
+exponential backoff stops hammering an upstream that keeps failing.
+
+``aget`` is the asyncio counterpart for ASGI views. It shares the cache and
+the breaker but fetches with a pooled ``httpx.AsyncClient``. Pooled
+connections belong to the event loop that opened them, so the client is
+kept per loop: under ASGI the one server loop reuses it, while under WSGI
+each async view runs in a new loop and gets a new client.
+
+The HTTP clients are imported when the service is first used rather than
+when the URLconf loads, so workers that never serve trending topics skip
+them (httpx alone is about 30 ms of start-up).
+"""
+import asyncio
+import threading
+import time
+
+from django.conf import settings
+
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+MAX_TOPICS = 10
+
+
+class TrendingTopicsUnavailable(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Opens after ``threshold`` consecutive failures and rejects calls for a
+    backoff period that doubles on every re-open, up to ``max_backoff``.
+    After the period one trial call is let through (half-open).
+    """
+
+    def __init__(self, threshold=3, backoff=5.0, max_backoff=300.0, clock=time.monotonic):
+        self.threshold = threshold
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.failures = 0
+        self.opened = 0
+        self.open_until = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.open_until is None:
+            return 'closed'
+        return 'open' if self.clock() < self.open_until else 'half-open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened = 0
+            self.open_until = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.threshold:
+                delay = min(self.backoff * 2 ** self.opened, self.max_backoff)
+                self.opened += 1
+                self.open_until = self.clock() + delay
+                self._trial = False
+
+    def retry_after(self):
+        if self.open_until is None:
+            return 0
+        return max(0.0, self.open_until - self.clock())
+
+
+class _Flight:
+    """One upstream fetch that concurrent callers wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class TrendingTopicsService:
+
+    def __init__(self, url, ttl=60, stale_ttl=600, timeout=10, pool_size=10,
+                 breaker=None, clock=time.monotonic):
+        self.url = url
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.clock = clock
+        self.breaker = breaker or CircuitBreaker(clock=clock)
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.upstream_calls = 0
+        self._topics = None
+        self._fetched_at = None
+        self._flight = None
+        self._lock = threading.Lock()
+        self._async_client = None
+        self._async_client_loop = None
+        self._async_flight = None
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            settings.TRENDING_TOPICS_URL,
+            ttl=settings.TRENDING_TOPICS_TTL,
+            stale_ttl=settings.TRENDING_TOPICS_STALE_TTL,
+            timeout=settings.TRENDING_TOPICS_TIMEOUT,
+        )
+
+    def get(self):
+        """Return ``(topics, age_in_seconds, stale)``; raise TrendingTopicsUnavailable."""
+        age = None if self._fetched_at is None else self.clock() - self._fetched_at
+        if age is not None and age <= self.ttl:
+            return self._topics, age, False
+        if age is not None and age <= self.stale_ttl:
+            self._refresh_in_background()
+            return self._topics, age, True
+        try:
+            self._fetch_shared()
+        except TrendingTopicsUnavailable:
+            if self._topics is None:
+                raise
+            # Too old to serve normally, but better than an error while upstream is down.
+            return self._topics, self.clock() - self._fetched_at, True
+        return self._topics, 0.0, False
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._flight is not None:
+                return
+        threading.Thread(target=self._refresh_quietly, daemon=True).start()
+
+    def _refresh_quietly(self):
+        try:
+            self._fetch_shared()
+        except TrendingTopicsUnavailable:
+            pass
+
+    def _fetch_shared(self):
+        with self._lock:
+            flight = self._flight
+            leader = flight is None
+            if leader:
+                flight = self._flight = _Flight()
+        if leader:
+            try:
+                flight.result = self._fetch()
+            except TrendingTopicsUnavailable as exc:
+                flight.error = exc
+            finally:
+                with self._lock:
+                    self._flight = None
+                flight.done.set()
+        elif not flight.done.wait(self.timeout * 2):
+            raise TrendingTopicsUnavailable('Timed out waiting for the upstream response.')
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def _check_breaker(self):
+        if not self.breaker.allow():
+            raise TrendingTopicsUnavailable(
+                f'Upstream is failing; retrying in {self.breaker.retry_after():.0f}s.'
+            )
+        self.upstream_calls += 1
+
+    def _store(self, topics):
+        self.breaker.record_success()
+        self._topics = topics
+        self._fetched_at = self.clock()
+        return topics
+
+    def _fetch(self):
+        self._check_breaker()
+        try:
+            response = self.session.get(self.url, timeout=self.timeout)
+            response.raise_for_status()
+            topics = parse_topics(response.json())
+        except Exception as exc:
+            # Every failure is recorded, so a half-open trial is always released.
+            self.breaker.record_failure()
+            raise TrendingTopicsUnavailable(str(exc) or type(exc).__name__) from exc
+        return self._store(topics)
+
+    async def aget(self):
+        """Async get(); the upstream fetch does not block the event loop."""
+        age = None if self._fetched_at is None else self.clock() - self._fetched_at
+        if age is not None and age <= self.ttl:
+            return self._topics, age, False
+        if age is not None and age <= self.stale_ttl:
+            self._refresh_in_background()
+            return self._topics, age, True
+        try:
+            await self._afetch_shared()
+        except TrendingTopicsUnavailable:
+            if self._topics is None:
+                raise
+            return self._topics, self.clock() - self._fetched_at, True
+        return self._topics, 0.0, False
+
+    async def _afetch_shared(self):
+        # Callers on the same event loop await one task; shield it so a
+        # cancelled caller does not cancel the fetch for everyone else.
+        flight = self._async_flight
+        if flight is None or flight.done() or flight.get_loop() is not asyncio.get_running_loop():
+            flight = self._async_flight = asyncio.ensure_future(self._afetch())
+        return await asyncio.shield(flight)
+
+    def _client_for_loop(self):
+        """The AsyncClient for the running loop; a client from a finished loop is replaced."""
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._async_client = httpx.AsyncClient(
+                headers={'User-Agent': USER_AGENT},
+                limits=httpx.Limits(max_connections=self.pool_size),
+            )
+            self._async_client_loop = loop
+        return self._async_client
+
+    async def _afetch(self):
+        self._check_breaker()
+        try:
+            response = await self._client_for_loop().get(self.url, timeout=self.timeout)
+            response.raise_for_status()
+            topics = parse_topics(response.json())
+        except Exception as exc:
+            # Transport errors (including ones raised by the connection pool
+            # rather than as httpx.HTTPError) count against the breaker and
+            # release a half-open trial instead of reaching the view.
+            self.breaker.record_failure()
+            raise TrendingTopicsUnavailable(str(exc) or type(exc).__name__) from exc
+        return self._store(topics)
+
+
+def parse_topics(reddit_data):
+    """Topics from a Reddit listing; raises ValueError when it is not shaped like one."""
+    data = reddit_data.get('data', {}) if isinstance(reddit_data, dict) else None
+    posts = data.get('children', []) if isinstance(data, dict) else None
+    if not isinstance(posts, list):
+        raise ValueError('Unexpected response from upstream.')
+    trending_topics = []
+    for post in posts[:MAX_TOPICS]:
+        post_data = post.get('data', {}) if isinstance(post, dict) else None
+        if not isinstance(post_data, dict):
+            raise ValueError('Unexpected response from upstream.')
+        trending_topics.append({
+            'topic': post_data.get('title', ''),
+            'mentions': post_data.get('ups', 0),
+            'comments': post_data.get('num_comments', 0),
+            'subreddit': post_data.get('subreddit', ''),
+            'url': post_data.get('url', '')
+        })
+    return trending_topics
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def trending_topics_service():
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = TrendingTopicsService.from_settings()
+    return _service
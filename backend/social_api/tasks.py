@@ -0,0 +1,17 @@
+"""Background job kinds for social_api (run by the jobs app's run_jobs worker)."""
+from jobs.registry import task
+
+from .services import trending_topics_service
+
+
+@task('fetch_trending_topics', priority=10, max_attempts=2, concurrency=1, public=True)
+def fetch_trending_topics(job):
+    """The fetch_trending_topics response body; unavailable upstreams are retried."""
+    trending_topics, age, stale = trending_topics_service().get()
+    return {
+        'status': 'success',
+        'trending_topics': trending_topics,
+        'total_topics': len(trending_topics),
+        'age_seconds': round(age),
+        'stale': stale,
+    }
@@ -1,3 +1,170 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from .services import CircuitBreaker, TrendingTopicsService, TrendingTopicsUnavailable
+
+
+LISTING = {'data': {'children': [
+    {'data': {'title': 'First', 'ups': 10, 'num_comments': 2, 'subreddit': 'news', 'url': 'https://a'}},
+    {'data': {'title': 'Second', 'ups': 5, 'num_comments': 1, 'subreddit': 'tech', 'url': 'https://b'}},
+]}}
+
+
+class StubUpstream:
+    """A local HTTP server standing in for Reddit; tests set its status, body and delay."""
+
+    def __init__(self):
+        self.status, self.body, self.delay, self.requests = 200, LISTING, 0, 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                stub.requests += 1
+                time.sleep(stub.delay)
+                body = json.dumps(stub.body).encode()
+                self.send_response(stub.status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        # A client that timed out has hung up; the late reply's broken pipe is expected.
+        self.server.handle_error = lambda request, address: None
+        self.url = f'http://127.0.0.1:{self.server.server_port}/r/popular.json'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TrendingTopicsServiceTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.upstream = StubUpstream()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.upstream.close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.upstream.status, self.upstream.body, self.upstream.delay = 200, LISTING, 0
+        self.upstream.requests = 0
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(threshold=2, backoff=5, max_backoff=60, clock=self.clock)
+        # stale_ttl == ttl: an expired entry is refetched in the foreground, never in a background thread.
+        self.service = TrendingTopicsService(self.upstream.url, ttl=60, stale_ttl=60, timeout=0.5,
+                                             breaker=self.breaker, clock=self.clock)
+
+    def test_fetches_and_caches(self):
+        topics, age, stale = self.service.get()
+        self.assertEqual([topic['topic'] for topic in topics], ['First', 'Second'])
+        self.assertEqual((age, stale), (0.0, False))
+        self.clock.now += 30
+        self.assertEqual(self.service.get()[1:], (30, False))
+        self.assertEqual(self.upstream.requests, 1)
+
+    def test_timeout(self):
+        self.upstream.delay = 1.5
+        with self.assertRaises(TrendingTopicsUnavailable):
+            self.service.get()
+        self.assertEqual(self.breaker.failures, 1)
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_server_error(self):
+        self.upstream.status = 503
+        with self.assertRaisesMessage(TrendingTopicsUnavailable, '503'):
+            self.service.get()
+        self.assertEqual(self.breaker.failures, 1)
+
+    def test_server_error_serves_last_topics(self):
+        topics = self.service.get()[0]
+        self.upstream.status = 500
+        self.clock.now += 120
+        self.assertEqual(self.service.get(), (topics, 120, True))
+
+    def test_malformed_payload(self):
+        self.upstream.body = {'data': []}
+        with self.assertRaises(TrendingTopicsUnavailable):
+            self.service.get()
+        self.assertEqual(self.breaker.failures, 1)
+
+    def test_breaker_opens_after_threshold(self):
+        self.upstream.status = 500
+        for _ in range(2):
+            with self.assertRaises(TrendingTopicsUnavailable):
+                self.service.get()
+        self.assertEqual(self.breaker.state, 'open')
+        with self.assertRaisesMessage(TrendingTopicsUnavailable, 'retrying in 5s'):
+            self.service.get()
+        self.assertEqual(self.upstream.requests, 2)
+
+    def test_half_open_trial_closes_on_success(self):
+        self.upstream.status = 500
+        for _ in range(2):
+            with self.assertRaises(TrendingTopicsUnavailable):
+                self.service.get()
+        self.clock.now += 5
+        self.assertEqual(self.breaker.state, 'half-open')
+        self.upstream.status = 200
+        self.assertEqual(len(self.service.get()[0]), 2)
+        self.assertEqual(self.breaker.state, 'closed')
+        self.assertEqual(self.upstream.requests, 3)
+
+    def test_half_open_trial_failure_reopens_with_longer_backoff(self):
+        self.upstream.status = 500
+        for _ in range(2):
+            with self.assertRaises(TrendingTopicsUnavailable):
+                self.service.get()
+        self.clock.now += 5
+        with self.assertRaises(TrendingTopicsUnavailable):
+            self.service.get()
+        self.assertEqual(self.upstream.requests, 3)
+        self.assertEqual(self.breaker.state, 'open')
+        self.assertEqual(self.breaker.retry_after(), 10)
+
+    def test_half_open_allows_one_trial(self):
+        self.upstream.status = 500
+        for _ in range(2):
+            with self.assertRaises(TrendingTopicsUnavailable):
+                self.service.get()
+        self.clock.now += 5
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+
+    def test_malformed_payload_releases_half_open_trial(self):
+        self.upstream.status = 500
+        for _ in range(2):
+            with self.assertRaises(TrendingTopicsUnavailable):
+                self.service.get()
+        self.clock.now += 5
+        self.upstream.status, self.upstream.body = 200, {'data': {'children': 'oops'}}
+        with self.assertRaises(TrendingTopicsUnavailable):
+            self.service.get()
+        self.assertEqual(self.breaker.state, 'open')
+        self.clock.now += 10
+        self.upstream.body = LISTING
+        self.assertEqual(len(self.service.get()[0]), 2)
+        self.assertEqual(self.breaker.state, 'closed')
@@ -1,5 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import SocialAPIViewSet
 
 router = DefaultRouter()
@@ -7,4 +8,5 @@ router.register(r'social-api', SocialAPIViewSet, basename='social-api')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('async/social-api/fetch_trending_topics/', async_views.fetch_trending_topics, name='async-social-api-fetch-trending-topics'),
 ]